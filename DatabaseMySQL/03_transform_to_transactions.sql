@@ -16,13 +16,18 @@
 --   - Removes currency symbols and fixes negative amounts
 --
 -- HOW TO USE:
---   Copy and paste into MySQL Workbench or CLI:
+--   Set @reporting_currency below to REPORTING_CURRENCY from .env (rows
+--   without a currency are in that currency, as in pipeline.py), then
+--   copy and paste into MySQL Workbench or CLI:
 --   mysql -u root -p fintrack < 03_transform_to_transactions.sql
 --
 -- ============================================================================
 
 USE fintrack;
 
+-- Same as REPORTING_CURRENCY in .env
+SET @reporting_currency = 'USD';
+
 -- ============================================================================
 -- STEP 1: Move valid rows from staging → transactions (with normalization)
 -- ============================================================================
@@ -57,7 +62,7 @@ SELECT
       , '$', '')
     , ',', '')
   AS DECIMAL(13,2)) AS amount,
-  'USD' AS currency,                          -- Default currency
+  COALESCE(s.currency, @reporting_currency) AS currency,  -- From the CSV, else the reporting currency
   'csv' AS source,                            -- Mark source as CSV
   CONCAT(
     'original_raw={date:', s.transaction_date,
@@ -0,0 +1,109 @@
+-- ============================================================================
+-- FILE: 04_partition_transactions.sql
+-- PURPOSE: Range-partition the transactions table by month and add the
+--          bookkeeping tables used by the archival job (run_04_maintenance.py)
+--
+-- WHAT THIS DOES:
+--   1. Creates maintenance_state (watermarks such as "staging rows already
+--      transformed up to staging_id N")
+--   2. Creates archive_log (one row per archive file written to disk)
+--   3. Converts transactions into a RANGE COLUMNS partitioned table on
+--      transaction_date, starting with a single catch-all partition
+--
+-- WHY PARTITION?
+--   - Queries with a date range (e.g. "October 2025") only read the matching
+--     monthly partitions instead of scanning the whole table
+--   - Old months can be archived and dropped instantly with DROP PARTITION
+--     instead of a slow, row-by-row DELETE
+--
+-- IMPORTANT:
+--   - MySQL does not allow foreign keys on partitioned tables, so the two
+--     foreign keys on transactions are dropped (the indexes stay)
+--   - The partition column must be part of the primary key, so the primary
+--     key becomes (transaction_id, transaction_date)
+--   - This is a ONE-TIME conversion and rewrites the table once. After that,
+--     run_04_maintenance.py splits the catch-all partition into monthly
+--     partitions and only ever touches the newest (empty) partition
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/04_partition_transactions.sql
+--   .\.venv\Scripts\python.exe backend/run_04_maintenance.py
+-- ============================================================================
+
+USE fintrack;
+
+-- ============================================================================
+-- STEP 1: Bookkeeping tables
+-- ============================================================================
+
+-- Key/value watermarks shared by the transform and maintenance scripts
+CREATE TABLE IF NOT EXISTS maintenance_state (
+    state_key VARCHAR(100) PRIMARY KEY,
+    state_value VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Every archive file written to disk, so it can be found and restored later
+CREATE TABLE IF NOT EXISTS archive_log (
+    archive_id INT AUTO_INCREMENT PRIMARY KEY,
+    source_table VARCHAR(100) NOT NULL,
+    archive_key VARCHAR(100) NOT NULL,   -- partition name or staging id range
+    file_path VARCHAR(500) NOT NULL,
+    row_count INT NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    restored_at TIMESTAMP NULL,
+    UNIQUE KEY uq_archive (source_table, archive_key)
+);
+
+-- ============================================================================
+-- STEP 2: Prepare transactions for partitioning
+-- ============================================================================
+
+-- Partition key cannot be NULL inside the primary key: fall back to post_date
+UPDATE transactions
+SET transaction_date = post_date
+WHERE transaction_date IS NULL AND post_date IS NOT NULL;
+
+-- Anything still without a date is logged as an error and removed
+INSERT INTO staging_errors (staging_id, error_message)
+SELECT NULL, CONCAT('transaction ', transaction_id, ' removed before partitioning: missing date')
+FROM transactions
+WHERE transaction_date IS NULL;
+
+DELETE FROM transactions WHERE transaction_date IS NULL;
+
+-- Foreign keys are not supported on partitioned tables
+-- (names are the ones MySQL generated for 01_create_schema.sql)
+ALTER TABLE transactions DROP FOREIGN KEY transactions_ibfk_1;
+ALTER TABLE transactions DROP FOREIGN KEY transactions_ibfk_2;
+
+-- The partition column must be part of every unique key
+ALTER TABLE transactions
+    MODIFY transaction_date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (transaction_id, transaction_date);
+
+-- ============================================================================
+-- STEP 3: Partition by month
+-- ============================================================================
+-- Start with one catch-all partition. run_04_maintenance.py splits it into
+-- monthly partitions (p202501, p202502, ...) covering the data that exists
+-- and keeps a few empty months ahead of today.
+
+ALTER TABLE transactions
+PARTITION BY RANGE COLUMNS (transaction_date) (
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+-- ============================================================================
+-- Verify:
+--   SELECT PARTITION_NAME, TABLE_ROWS
+--   FROM INFORMATION_SCHEMA.PARTITIONS
+--   WHERE TABLE_SCHEMA = 'fintrack' AND TABLE_NAME = 'transactions';
+--
+--   EXPLAIN SELECT * FROM transactions
+--   WHERE transaction_date >= '2025-10-01' AND transaction_date < '2025-11-01';
+--   (the "partitions" column should list only p202510)
+-- ============================================================================
+
+COMMIT;
@@ -0,0 +1,79 @@
+-- ============================================================================
+-- FILE: 05_category_groups.sql
+-- PURPOSE: Map each CSV category to a dashboard group, color and recommended
+--          spending percentage
+--
+-- WHAT THIS DOES:
+--   1. Creates the category_groups table
+--   2. Seeds it with the categories the dashboard already knows about
+--
+-- WHY A TABLE?
+--   - The API loads this once and caches it, then pivots a single grouped
+--     query in Python. Adding a new category (or moving one to another
+--     group) is just an INSERT/UPDATE here - no SQL in api_upload.py changes
+--   - Categories that are not listed fall into the 'miscellaneous' group
+--     with a gray color
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/05_category_groups.sql
+--
+--   After editing the table while the API is running, reload the cache:
+--   curl -X POST http://localhost:8000/analytics/category-groups/reload
+-- ============================================================================
+
+USE fintrack;
+
+CREATE TABLE IF NOT EXISTS category_groups (
+    category_name VARCHAR(100) PRIMARY KEY,     -- exactly as it appears in the CSV
+    group_key VARCHAR(50) NOT NULL,             -- key used in the monthly trend
+    group_order INT NOT NULL DEFAULT 100,       -- order of the group in the trend
+    color VARCHAR(20) NOT NULL DEFAULT '#6b7280',
+    accent_class VARCHAR(50) NOT NULL DEFAULT 'bg-gray-500',
+    recommended_percent DECIMAL(5,2) NOT NULL DEFAULT 0
+);
+
+INSERT INTO category_groups
+    (category_name, group_key, group_order, color, accent_class, recommended_percent)
+VALUES
+    ('Housing',                      'housing',        1,  '#3b82f6', 'bg-blue-600',    30),
+    ('Home',                         'housing',        1,  '#3b82f6', 'bg-blue-600',    30),
+    ('Groceries',                    'food',           2,  '#10b981', 'bg-emerald-500', 10),
+    ('Food & Dining',                'food',           2,  '#10b981', 'bg-green-500',   12),
+    ('Food',                         'food',           2,  '#10b981', 'bg-green-500',   12),
+    ('Restaurants',                  'dining',         3,  '#84cc16', 'bg-lime-500',     5),
+    ('Food & Drink',                 'dining',         3,  '#ef4444', 'bg-red-500',     12),
+    ('Transportation',               'transportation', 4,  '#f97316', 'bg-orange-500',  15),
+    ('Gas',                          'transportation', 4,  '#f59e0b', 'bg-amber-500',    8),
+    ('Gas & Fuel',                   'transportation', 4,  '#f59e0b', 'bg-amber-500',    8),
+    ('Utilities',                    'utilities',      5,  '#eab308', 'bg-yellow-500',  10),
+    ('Bills',                        'utilities',      5,  '#facc15', 'bg-yellow-400',  10),
+    ('Bills & Utilities',            'utilities',      5,  '#eab308', 'bg-yellow-500',  10),
+    ('Insurance',                    'insurance',      6,  '#a855f7', 'bg-purple-500',  10),
+    ('Medical & Healthcare',         'medical',        7,  '#ef4444', 'bg-red-500',      8),
+    ('Healthcare',                   'medical',        7,  '#ef4444', 'bg-red-500',      8),
+    ('Health & Wellness',            'medical',        7,  '#ef4444', 'bg-red-500',      5),
+    ('Personal Care',                'personal',       8,  '#ec4899', 'bg-pink-500',     5),
+    ('Personal',                     'personal',       8,  '#ec4899', 'bg-pink-500',     5),
+    ('Recreation & Entertainment',   'recreation',     9,  '#6366f1', 'bg-indigo-500',   5),
+    ('Recreation and Entertainment', 'recreation',     9,  '#6366f1', 'bg-indigo-500',   5),
+    ('Entertainment',                'recreation',     9,  '#6366f1', 'bg-indigo-500',   5),
+    ('Education',                    'education',      10, '#f97316', 'bg-orange-500',   5),
+    ('Shopping',                     'shopping',       11, '#8b5cf6', 'bg-violet-500',   5),
+    ('General Merchandise',          'shopping',       11, '#8b5cf6', 'bg-violet-500',   5),
+    ('Gifts & Donations',            'shopping',       11, '#f43f5e', 'bg-rose-600',     3),
+    ('Gifts',                        'shopping',       11, '#f43f5e', 'bg-rose-600',     3),
+    ('Travel',                       'miscellaneous',  12, '#0ea5e9', 'bg-sky-600',      5),
+    ('Professional Services',        'miscellaneous',  12, '#475569', 'bg-slate-500',    5),
+    ('Miscellaneous',                'miscellaneous',  12, '#6b7280', 'bg-gray-500',     5)
+ON DUPLICATE KEY UPDATE category_name = category_name;  -- keep any edits you made
+
+-- ============================================================================
+-- Adding a category later:
+--   INSERT INTO category_groups (category_name, group_key, group_order, color, accent_class, recommended_percent)
+--   VALUES ('Pets', 'personal', 8, '#ec4899', 'bg-pink-500', 3);
+--
+-- Adding a whole new group works the same way: use a new group_key and it
+-- shows up as a new series in the monthly trend.
+-- ============================================================================
+
+COMMIT;
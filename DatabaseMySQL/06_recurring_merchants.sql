@@ -0,0 +1,57 @@
+-- ============================================================================
+-- FILE: 06_recurring_merchants.sql
+-- PURPOSE: Per-merchant running statistics for the recurring-charge detector
+--
+-- WHAT THIS DOES:
+--   Creates recurring_merchants: one row per (customer, normalized merchant)
+--   holding the last charge date and running mean/variance of the days
+--   between charges and of the amounts.
+--
+-- WHY RUNNING STATS?
+--   - backend/recurring.py only reads transactions added since its last run
+--     (watermark 'recurring_scanned_through' in maintenance_state) and folds
+--     them into these rows. Millions of old rows are never re-sorted.
+--   - "Is this a subscription?" is then a cheap check on each row: enough
+--     charges, regular interval, stable amount
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/06_recurring_merchants.sql
+--   python backend/recurring.py    (pipeline.py runs it after each transform)
+--   Then open http://localhost:8000/recurring
+--
+--   To rebuild from scratch:
+--   TRUNCATE TABLE recurring_merchants;
+--   DELETE FROM maintenance_state WHERE state_key = 'recurring_scanned_through';
+-- ============================================================================
+
+USE fintrack;
+
+-- Also created by 04_partition_transactions.sql
+CREATE TABLE IF NOT EXISTS maintenance_state (
+    state_key VARCHAR(100) PRIMARY KEY,
+    state_value VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS recurring_merchants (
+    customer_id INT NOT NULL DEFAULT 0,           -- 0 = no customer yet
+    merchant_key VARCHAR(100) NOT NULL,           -- classifier.normalize_merchant()
+    sample_description VARCHAR(500),              -- latest raw description
+    occurrences INT NOT NULL DEFAULT 0,
+    first_date DATE,
+    last_date DATE,
+    last_amount DECIMAL(12, 2),
+    -- Days between consecutive charges (Welford running mean / sum of squares)
+    interval_count INT NOT NULL DEFAULT 0,
+    interval_mean DOUBLE NOT NULL DEFAULT 0,
+    interval_m2 DOUBLE NOT NULL DEFAULT 0,
+    -- Charge amounts (Welford running mean / sum of squares)
+    amount_mean DOUBLE NOT NULL DEFAULT 0,
+    amount_m2 DOUBLE NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (customer_id, merchant_key),
+    INDEX idx_occurrences (occurrences)
+);
+
+COMMIT;
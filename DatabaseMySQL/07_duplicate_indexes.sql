@@ -0,0 +1,24 @@
+-- ============================================================================
+-- FILE: 07_duplicate_indexes.sql
+-- PURPOSE: Indexes used by the near-duplicate checks
+--
+-- WHAT THIS DOES:
+--   1. transactions_staging.amount - /upload loads only the existing rows
+--      whose amount matches a row in the uploaded file
+--   2. transactions (customer_id, amount, transaction_date) - lets
+--      remove_duplicates.py read the table already sorted in blocks of
+--      "same customer, same amount" without a filesort
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/07_duplicate_indexes.sql
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD INDEX idx_staging_amount (amount);
+
+ALTER TABLE transactions
+    ADD INDEX idx_customer_amount_date (customer_id, amount, transaction_date);
+
+COMMIT;
@@ -0,0 +1,31 @@
+-- ============================================================================
+-- FILE: 08_search_index.sql
+-- PURPOSE: Full-text index for /transactions/search
+--
+-- WHAT THIS DOES:
+--   Adds a FULLTEXT index over description and memo in transactions_staging
+--   (the table the dashboard reads). MySQL keeps it up to date on every
+--   INSERT, so uploads are searchable immediately.
+--
+-- WHY NOT ON transactions?
+--   MySQL does not support FULLTEXT indexes on partitioned tables
+--   (see 04_partition_transactions.sql).
+--
+-- NOTES:
+--   - Words shorter than innodb_ft_min_token_size (default 3) are not
+--     indexed. A short word next to a longer one is matched as a word
+--     prefix with LIKE on the rows the index found; the API rejects
+--     queries made only of short words
+--   - Building the index on a large table takes a while, run it off-hours
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/08_search_index.sql
+--   Then: http://localhost:8000/transactions/search?q=netflix
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD FULLTEXT INDEX ft_description_memo (description, memo);
+
+COMMIT;
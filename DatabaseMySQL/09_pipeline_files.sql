@@ -0,0 +1,40 @@
+-- ============================================================================
+-- FILE: 09_pipeline_files.sql
+-- PURPOSE: Checkpoints for the statement import pipeline
+--
+-- WHAT THIS DOES:
+--   Creates pipeline_files: one row per imported statement file, keyed by
+--   the SHA-256 of its contents, recording how far it got:
+--     'loaded'      - its rows are in transactions_staging
+--     'transformed' - the transform has moved them into transactions
+--
+-- WHY?
+--   backend/pipeline.py loads many files in parallel. Each file's rows and
+--   its checkpoint row are committed in one transaction, so after a crash
+--   the next run skips exactly the files that made it and retries the rest.
+--   Keying by content means a renamed copy of a statement is not loaded
+--   twice, while an updated download of the same month is.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/09_pipeline_files.sql
+--   (pipeline.py also creates it on first run)
+--
+--   To import a file again:
+--   DELETE FROM pipeline_files WHERE file_path LIKE '%Chase7561%';
+-- ============================================================================
+
+USE fintrack;
+
+CREATE TABLE IF NOT EXISTS pipeline_files (
+    file_hash CHAR(64) PRIMARY KEY,           -- SHA-256 of the file contents
+    file_path VARCHAR(500) NOT NULL,          -- where it was loaded from
+    stage VARCHAR(20) NOT NULL,               -- 'loaded' or 'transformed'
+    row_count INT NOT NULL DEFAULT 0,
+    load_seconds DOUBLE NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    transformed_at TIMESTAMP NULL,
+
+    INDEX idx_stage (stage)
+);
+
+COMMIT;
@@ -0,0 +1,41 @@
+-- ============================================================================
+-- FILE: 10_upload_sessions.sql
+-- PURPOSE: Resumable chunked uploads for the API
+--
+-- WHAT THIS DOES:
+--   Creates upload_sessions: one row per chunked upload (see
+--   backend/uploads.py), recording how many chunks have been committed and
+--   the running import counts.
+--
+-- WHY?
+--   A large /upload that fails halfway has to be sent again in full. With
+--   sessions the client sends the file in numbered chunks; each chunk's rows
+--   are committed together with chunks_done, so a retry continues at the
+--   first missing chunk. The client's Idempotency-Key is unique, so sending
+--   a finished upload again is a single index lookup and nothing else.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/10_upload_sessions.sql
+--
+--   Old finished sessions can be removed at any time:
+--   DELETE FROM upload_sessions WHERE status = 'complete' AND updated_at < NOW() - INTERVAL 30 DAY;
+-- ============================================================================
+
+USE fintrack;
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    upload_id CHAR(32) PRIMARY KEY,               -- returned to the client
+    idempotency_key VARCHAR(128) NOT NULL UNIQUE, -- chosen by the client
+    file_name VARCHAR(255),
+    header TEXT,                                  -- CSV header line of chunk 0
+    total_chunks INT NOT NULL,
+    chunks_done INT NOT NULL DEFAULT 0,           -- chunks 0..chunks_done-1 are committed
+    status VARCHAR(20) NOT NULL DEFAULT 'open',   -- 'open' or 'complete'
+    inserted_count INT NOT NULL DEFAULT 0,
+    skipped_count INT NOT NULL DEFAULT 0,
+    near_duplicate_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+COMMIT;
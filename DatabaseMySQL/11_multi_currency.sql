@@ -0,0 +1,52 @@
+-- ============================================================================
+-- FILE: 11_multi_currency.sql
+-- PURPOSE: Currencies on transactions and a local table of FX rates
+--
+-- WHAT THIS DOES:
+--   - Adds a currency column (ISO code like 'EUR') to transactions_staging
+--     and transactions. Statements without a Currency column leave it NULL
+--     in staging, which means the reporting currency (REPORTING_CURRENCY in
+--     .env, default USD); the transform fills it in for transactions.
+--     Existing transactions get @reporting_currency below: set it to your
+--     REPORTING_CURRENCY before running the script.
+--   - Creates fx_rates: one rate per (day, currency), stored as units of
+--     that currency per 1 USD. backend/fx.py loads it from rate files and
+--     converts any currency into any other through USD.
+--
+-- WHY A LOCAL TABLE?
+--   The analytics never join rates row by row. The API reads fx_rates once
+--   into a per-day lookup table and converts each currency's amounts in one
+--   batch while it aggregates. Accounts in a single currency skip the
+--   conversion entirely.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/11_multi_currency.sql
+--   .\.venv\Scripts\python.exe backend/fx.py rates/eurofxref-hist.csv --base EUR
+--   Then POST /analytics/category-groups/reload (or restart the API)
+-- ============================================================================
+
+USE fintrack;
+
+-- Same as REPORTING_CURRENCY in .env
+SET @reporting_currency = 'USD';
+
+ALTER TABLE transactions_staging
+    ADD COLUMN currency CHAR(3) NULL;
+
+SET @add_currency = CONCAT(
+    'ALTER TABLE transactions ADD COLUMN currency CHAR(3) NOT NULL DEFAULT ''', @reporting_currency, '''');
+PREPARE add_currency FROM @add_currency;
+EXECUTE add_currency;
+DEALLOCATE PREPARE add_currency;
+
+CREATE TABLE IF NOT EXISTS fx_rates (
+    rate_date DATE NOT NULL,
+    currency CHAR(3) NOT NULL,
+    rate DECIMAL(18, 8) NOT NULL,             -- units of currency per 1 USD
+    source VARCHAR(255),                      -- file it was loaded from
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (rate_date, currency)
+);
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- ============================================================================
+-- FILE: 12_staging_transform_status.sql
+-- PURPOSE: Mark each staging row once it has been transformed
+--
+-- WHAT THIS DOES:
+--   Adds transactions_staging.transformed_at. backend/pipeline.py (transform
+--   stage) picks up every row where it is NULL and sets it in the same
+--   transaction that inserts the row into transactions (or logs it to
+--   staging_errors).
+--
+-- WHY NOT A WATERMARK?
+--   The transform used to remember "everything up to staging_id N is done".
+--   Uploads and the parallel pipeline workers commit in any order, so a row
+--   with a LOWER id can become visible after N was already passed, and it
+--   was never transformed. A per-row flag can't skip anything.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/12_staging_transform_status.sql
+--   (databases created by pipeline.py already have it)
+--   The next pipeline.py run marks every row up to the old
+--   'staging_transformed_through' watermark as transformed and then stops
+--   using the watermark.
+--
+--   Rows the old watermark skipped can't be told apart from transformed
+--   ones automatically. To look for them (staging rows with no matching
+--   transaction):
+--     SELECT s.* FROM transactions_staging s
+--     WHERE NOT EXISTS (
+--         SELECT 1 FROM transactions t
+--         WHERE t.transaction_date = STR_TO_DATE(s.transaction_date, '%m/%d/%Y')
+--         AND t.description = s.description
+--         AND t.amount = CAST(REPLACE(REPLACE(s.amount, '$', ''), ',', '') AS DECIMAL(12, 2))
+--     );
+--   and re-run them with: UPDATE transactions_staging SET transformed_at = NULL WHERE staging_id IN (...);
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD COLUMN transformed_at TIMESTAMP NULL,
+    ADD INDEX idx_staging_untransformed (transformed_at, staging_id);
+
+COMMIT;
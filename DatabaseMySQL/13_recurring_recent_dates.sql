@@ -0,0 +1,29 @@
+-- ============================================================================
+-- FILE: 13_recurring_recent_dates.sql
+-- PURPOSE: Let the recurring-charge detector handle back-filled statements
+--
+-- WHAT THIS DOES:
+--   Adds recurring_merchants.recent_dates: the merchant's latest charge
+--   dates (at most recurring.RECENT_DATES, oldest first, comma-separated
+--   YYYY-MM-DD). When a charge OLDER than the last one arrives (an old
+--   statement uploaded late), backend/recurring.py re-estimates the interval
+--   mean/variance from these dates instead of leaving it unchanged.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/13_recurring_recent_dates.sql
+--   (databases created by pipeline.py already have it)
+--
+--   Existing rows have no dates yet, so this script clears the running
+--   stats; the next pipeline.py or recurring.py run rebuilds them.
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE recurring_merchants
+    ADD COLUMN recent_dates TEXT NULL AFTER amount_m2;
+
+-- Rebuild the stats so every row gets its dates
+TRUNCATE TABLE recurring_merchants;
+DELETE FROM maintenance_state WHERE state_key = 'recurring_scanned_through';
+
+COMMIT;
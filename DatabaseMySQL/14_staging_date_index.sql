@@ -0,0 +1,23 @@
+-- ============================================================================
+-- FILE: 14_staging_date_index.sql
+-- PURPOSE: Index used by /upload to find possible duplicates
+--
+-- WHAT THIS DOES:
+--   Adds an index on transactions_staging.transaction_date. backend/uploads.py
+--   reads only the staging rows dated within near_duplicates.WINDOW_DAYS of
+--   the uploaded file's dates (each day in every spelling a statement uses)
+--   and compares amounts in cents in memory. Looking rows up by the raw
+--   amount text (idx_staging_amount, 07) missed '-5.5' vs '-5.50' and read
+--   every row with a common amount, from any year.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/14_staging_date_index.sql
+--   (databases created by pipeline.py already have it)
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD INDEX idx_staging_transaction_date (transaction_date);
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- ============================================================================
+-- FILE: 15_staging_upload_id.sql
+-- PURPOSE: Remember which chunked upload a staging row came from
+--
+-- WHAT THIS DOES:
+--   Adds transactions_staging.upload_id (upload_sessions.upload_id, NULL for
+--   plain uploads and pipeline loads). The duplicate check of
+--   backend/uploads.py treats the rows of one upload as one statement: two
+--   identical rows are kept, even when they arrive in different chunks.
+--   Without it, every chunk after the first was compared with the earlier
+--   chunks as if they were an older statement.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/15_staging_upload_id.sql
+--   (databases created by pipeline.py already have it)
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD COLUMN upload_id CHAR(32) NULL;
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- ============================================================================
+-- FILE: 16_reporting_currency_default.sql
+-- PURPOSE: Default transactions.currency to REPORTING_CURRENCY, not USD
+--
+-- WHAT THIS DOES:
+--   Earlier versions of 11_multi_currency.sql gave transactions.currency a
+--   fixed DEFAULT 'USD'. The transform always writes
+--   COALESCE(staging currency, REPORTING_CURRENCY), but rows inserted any
+--   other way, and every row that already existed when 11 ran, got USD
+--   even when the account reports in another currency.
+--   This sets the default to @reporting_currency (databases created by
+--   pipeline.py take it from REPORTING_CURRENCY in .env).
+--
+-- HOW TO USE:
+--   Set @reporting_currency below to REPORTING_CURRENCY from .env, then:
+--   mysql -u root -p fintrack < DatabaseMySQL/16_reporting_currency_default.sql
+--   Nothing to do if REPORTING_CURRENCY is USD.
+--
+--   If your REPORTING_CURRENCY is not USD and you ran 11 on a database that
+--   already had transactions, those rows are marked USD. When none of your
+--   statements are really in USD, fix them with:
+--     UPDATE transactions SET currency = @reporting_currency WHERE currency = 'USD';
+-- ============================================================================
+
+USE fintrack;
+
+-- Same as REPORTING_CURRENCY in .env
+SET @reporting_currency = 'USD';
+
+SET @set_default = CONCAT(
+    'ALTER TABLE transactions ALTER COLUMN currency SET DEFAULT ''', @reporting_currency, '''');
+PREPARE set_default FROM @set_default;
+EXECUTE set_default;
+DEALLOCATE PREPARE set_default;
+
+COMMIT;
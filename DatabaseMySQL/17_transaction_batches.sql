@@ -0,0 +1,31 @@
+-- ============================================================================
+-- FILE: 17_transaction_batches.sql
+-- PURPOSE: Remember which statement each transaction came from
+--
+-- WHAT THIS DOES:
+--   - transactions_staging.file_hash: the pipeline_files.file_hash of rows
+--     loaded by backend/pipeline.py (uploads already have upload_id, 15)
+--   - transactions.batch_id: the upload id or file hash of the staging row,
+--     copied by the transform
+--
+--   backend/remove_duplicates.py never matches two rows of the same batch
+--   (one statement may list two identical coffees on purpose). It used to
+--   take the transform run (created_at) as the batch, so two overlapping
+--   statements transformed in the same run were never compared. Rows
+--   transformed before this script keep a NULL batch_id and still fall back
+--   to created_at.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/17_transaction_batches.sql
+--   (databases created by pipeline.py already have it)
+-- ============================================================================
+
+USE fintrack;
+
+ALTER TABLE transactions_staging
+    ADD COLUMN file_hash CHAR(64) NULL;
+
+ALTER TABLE transactions
+    ADD COLUMN batch_id VARCHAR(64) NULL;
+
+COMMIT;
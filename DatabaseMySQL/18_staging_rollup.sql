@@ -0,0 +1,41 @@
+-- ============================================================================
+-- FILE: 18_staging_rollup.sql
+-- PURPOSE: Keep the totals of archived staging rows
+--
+-- WHAT THIS DOES:
+--   backend/run_04_maintenance.py moves transformed staging rows older than
+--   its staging retention (default 365 days) into
+--   archive/transactions_staging_<first>_<last>.csv.gz. In the same
+--   transaction that deletes them it writes their totals here, one row per
+--   (post_date, category, type, currency) of the archive file.
+--
+--   /analytics/monthly and /analytics/daily (MonthlyRollup, daily_totals and
+--   the column store in backend/analytics.py / column_store.py) add these
+--   rows to the staging rows, so archiving never changes a total.
+--   /transactions and search only list the rows still in staging.
+--
+--   Restoring an archive with run_04_maintenance.py --restore puts the rows
+--   back and deletes that archive's rows here, again in one transaction.
+--
+-- HOW TO USE:
+--   mysql -u root -p fintrack < DatabaseMySQL/18_staging_rollup.sql
+--   (databases created by pipeline.py already have it)
+--   run_04_maintenance.py only archives staging once this table exists.
+-- ============================================================================
+
+USE fintrack;
+
+CREATE TABLE IF NOT EXISTS staging_rollup (
+    rollup_id INT AUTO_INCREMENT PRIMARY KEY,
+    archive_key VARCHAR(100) NOT NULL,
+    post_date VARCHAR(50) NULL,
+    category VARCHAR(100) NULL,
+    type VARCHAR(50) NULL,
+    currency CHAR(3) NULL,
+    total DECIMAL(14, 2) NULL,
+    abs_total DECIMAL(14, 2) NULL,
+    row_count INT NOT NULL,
+    INDEX idx_rollup_archive_key (archive_key)
+);
+
+COMMIT;
@@ -0,0 +1,501 @@
+"""
+analytics.py - Monthly analytics from a single grouped query
+
+WHAT THIS DOES:
+  /analytics/monthly used to run four separate scans of transactions_staging
+  (summary, categories, income vs expenses, trend) and hard-coded the
+  category groups in SQL. Now:
+  - MONTHLY_ROLLUP_SQL reads the table grouped by (month, category, type)
+  - MonthlyRollup keeps those groups in memory (MonthlyTotals) and, on
+    every request, only reads staging rows added since the previous request
+    (watermark.py, so rows that commit late are still picked up). The
+    column store keeps its own MonthlyTotals, updated as rows are appended
+  - Staging rows archived by run_04_maintenance.py are kept as totals in
+    staging_rollup (DatabaseMySQL/18_staging_rollup.sql); MonthlyRollup,
+    daily_totals and the column store add them to the staging rows
+  - Groups in another currency are converted to REPORTING_CURRENCY with that
+    day's rate (fx.py) before they are merged, one batch per currency
+  - Categories are grouped case-insensitively ("groceries" and "Groceries"
+    are one category), the same way however the rows were batched; see
+    CategoryNames
+  - The grouped rows are pivoted with NumPy into the four dashboard sections
+  - Month-over-month deltas, daily averages and moving averages come from
+    prefix sums kept by windows.WindowedMetrics
+  - Category -> group/color/recommended % comes from the category_groups
+    table (DatabaseMySQL/05_category_groups.sql), loaded once and cached.
+    While that table is missing or empty the built-in groups are used
+    (BUILTIN_CATEGORY_GROUPS, the same rows the script seeds)
+
+  The grouped result has at most months x categories x types rows, so the
+  Python side stays tiny no matter how many transactions there are.
+
+  The cache lives in the API process. Rows deleted from staging by hand
+  stay in it until the API restarts or POST /analytics/category-groups/reload
+  is called.
+"""
+
+import datetime
+import threading
+
+import numpy as np
+
+from db import REPLICA, REPORTING_CURRENCY, role_of, table_exists
+from fx import convert_rows
+from watermark import StagingWatermark
+from windows import TOTAL, WINDOWS, WindowedMetrics
+
+EXPENSE_TYPES = ('expense', 'sale', 'debit')
+INCOME_TYPES = ('income', 'credit', 'payment')
+
+DEFAULT_GROUP = 'miscellaneous'
+DEFAULT_STYLE = {'color': '#6b7280', 'accentClass': 'bg-gray-500', 'recommended': 0}
+
+# Number of months returned in the trend and income vs expenses charts
+TREND_MONTHS = 12
+
+# Everything else is derived from these groups. Only staging rows that were
+# not read before are scanned ({window} is a watermark.Window condition).
+# Rows in another currency are also grouped by day (rate_date), so
+# fx.convert_rows() can convert each group with that day's rate;
+# reporting-currency rows stay one group per month. Categories are grouped
+# by their exact spelling (utf8mb4_bin) and merged case-insensitively in
+# Python, so a fresh read and incremental reads give the same groups.
+MONTHLY_ROLLUP_SQL = """
+    SELECT
+        DATE_FORMAT(STR_TO_DATE(post_date, '%%m/%%d/%%Y'), '%%Y-%%m') as month_key,
+        COALESCE(category, 'Uncategorized') COLLATE utf8mb4_bin as category,
+        LOWER(type) as type,
+        COALESCE(UPPER(currency), %(reporting)s) as currency_code,
+        CASE WHEN COALESCE(UPPER(currency), %(reporting)s) = %(reporting)s THEN NULL
+             ELSE STR_TO_DATE(post_date, '%%m/%%d/%%Y') END as rate_date,
+        SUM(CAST(amount AS DECIMAL(12,2))) as total,
+        SUM(ABS(CAST(amount AS DECIMAL(12,2)))) as abs_total,
+        COUNT(*) as count,
+        MIN(STR_TO_DATE(post_date, '%%m/%%d/%%Y')) as first_day
+    FROM transactions_staging
+    WHERE post_date IS NOT NULL AND post_date != ''
+    AND {window}
+    GROUP BY month_key, category, type, currency_code, rate_date
+"""
+
+# Expenses per post_date for /analytics/daily, per currency (see above)
+DAILY_SQL = """
+    SELECT
+        post_date as date,
+        COALESCE(UPPER(currency), %(reporting)s) as currency_code,
+        MIN(STR_TO_DATE(post_date, '%%m/%%d/%%Y')) as rate_date,
+        SUM(CAST(amount AS DECIMAL(12,2))) as total,
+        COUNT(*) as transactions
+    FROM transactions_staging
+    WHERE post_date IS NOT NULL AND post_date != ''
+    AND LOWER(type) IN ('expense', 'sale', 'debit')
+    GROUP BY post_date, currency_code
+    ORDER BY post_date DESC
+"""
+DAILY_COLUMNS = ('date', 'total', 'transactions')
+
+# MONTHLY_ROLLUP_SQL and DAILY_SQL over the totals of archived staging rows
+# (staging_rollup keeps them per post_date, category, LOWER(type) and
+# UPPER(currency)). Read once when a cache starts over: archiving moves rows
+# that were already read, and a restore takes them out again.
+MONTHLY_ARCHIVED_SQL = """
+    SELECT
+        DATE_FORMAT(STR_TO_DATE(post_date, '%%m/%%d/%%Y'), '%%Y-%%m') as month_key,
+        COALESCE(category, 'Uncategorized') COLLATE utf8mb4_bin as category,
+        type,
+        COALESCE(currency, %(reporting)s) as currency_code,
+        CASE WHEN COALESCE(currency, %(reporting)s) = %(reporting)s THEN NULL
+             ELSE STR_TO_DATE(post_date, '%%m/%%d/%%Y') END as rate_date,
+        SUM(total) as total,
+        SUM(abs_total) as abs_total,
+        SUM(row_count) as count,
+        MIN(STR_TO_DATE(post_date, '%%m/%%d/%%Y')) as first_day
+    FROM staging_rollup
+    WHERE post_date IS NOT NULL AND post_date != ''
+    GROUP BY month_key, category, type, currency_code, rate_date
+"""
+
+DAILY_ARCHIVED_SQL = """
+    SELECT
+        post_date as date,
+        COALESCE(currency, %(reporting)s) as currency_code,
+        MIN(STR_TO_DATE(post_date, '%%m/%%d/%%Y')) as rate_date,
+        SUM(total) as total,
+        SUM(row_count) as transactions
+    FROM staging_rollup
+    WHERE post_date IS NOT NULL AND post_date != ''
+    AND type IN ('expense', 'sale', 'debit')
+    GROUP BY post_date, currency_code
+"""
+
+# The groups 05_category_groups.sql seeds, used while that table is
+# missing or empty: (category_name, group_key, group_order, color, accent_class, recommended_percent)
+BUILTIN_CATEGORY_GROUPS = (
+    ('Housing', 'housing', 1, '#3b82f6', 'bg-blue-600', 30),
+    ('Home', 'housing', 1, '#3b82f6', 'bg-blue-600', 30),
+    ('Groceries', 'food', 2, '#10b981', 'bg-emerald-500', 10),
+    ('Food & Dining', 'food', 2, '#10b981', 'bg-green-500', 12),
+    ('Food', 'food', 2, '#10b981', 'bg-green-500', 12),
+    ('Restaurants', 'dining', 3, '#84cc16', 'bg-lime-500', 5),
+    ('Food & Drink', 'dining', 3, '#ef4444', 'bg-red-500', 12),
+    ('Transportation', 'transportation', 4, '#f97316', 'bg-orange-500', 15),
+    ('Gas', 'transportation', 4, '#f59e0b', 'bg-amber-500', 8),
+    ('Gas & Fuel', 'transportation', 4, '#f59e0b', 'bg-amber-500', 8),
+    ('Utilities', 'utilities', 5, '#eab308', 'bg-yellow-500', 10),
+    ('Bills', 'utilities', 5, '#facc15', 'bg-yellow-400', 10),
+    ('Bills & Utilities', 'utilities', 5, '#eab308', 'bg-yellow-500', 10),
+    ('Insurance', 'insurance', 6, '#a855f7', 'bg-purple-500', 10),
+    ('Medical & Healthcare', 'medical', 7, '#ef4444', 'bg-red-500', 8),
+    ('Healthcare', 'medical', 7, '#ef4444', 'bg-red-500', 8),
+    ('Health & Wellness', 'medical', 7, '#ef4444', 'bg-red-500', 5),
+    ('Personal Care', 'personal', 8, '#ec4899', 'bg-pink-500', 5),
+    ('Personal', 'personal', 8, '#ec4899', 'bg-pink-500', 5),
+    ('Recreation & Entertainment', 'recreation', 9, '#6366f1', 'bg-indigo-500', 5),
+    ('Recreation and Entertainment', 'recreation', 9, '#6366f1', 'bg-indigo-500', 5),
+    ('Entertainment', 'recreation', 9, '#6366f1', 'bg-indigo-500', 5),
+    ('Education', 'education', 10, '#f97316', 'bg-orange-500', 5),
+    ('Shopping', 'shopping', 11, '#8b5cf6', 'bg-violet-500', 5),
+    ('General Merchandise', 'shopping', 11, '#8b5cf6', 'bg-violet-500', 5),
+    ('Gifts & Donations', 'shopping', 11, '#f43f5e', 'bg-rose-600', 3),
+    ('Gifts', 'shopping', 11, '#f43f5e', 'bg-rose-600', 3),
+    ('Travel', 'miscellaneous', 12, '#0ea5e9', 'bg-sky-600', 5),
+    ('Professional Services', 'miscellaneous', 12, '#475569', 'bg-slate-500', 5),
+    ('Miscellaneous', 'miscellaneous', 12, '#6b7280', 'bg-gray-500', 5),
+)
+CATEGORY_GROUP_COLUMNS = ('category_name', 'group_key', 'group_order', 'color', 'accent_class', 'recommended_percent')
+
+# Cached contents of category_groups (see load_category_groups)
+_category_groups = None
+
+
+def load_category_groups(cursor, refresh=False):
+    """Return the category -> group mapping, reading the table only once.
+
+    Result:
+      {
+        'categories': {'Groceries': {'group': 'food', 'color': ..., 'accentClass': ..., 'recommended': 10}, ...},
+        'groups': ['housing', 'food', ..., 'miscellaneous']   # trend order
+      }
+    """
+    global _category_groups
+    if _category_groups is not None and not refresh:
+        return _category_groups
+
+    rows = []
+    if table_exists(cursor, 'category_groups'):
+        cursor.execute("""
+            SELECT category_name, group_key, group_order, color, accent_class, recommended_percent
+            FROM category_groups
+            ORDER BY group_order, group_key
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        print("Category groups warning: category_groups is missing or empty, using the built-in groups "
+              "(run DatabaseMySQL/05_category_groups.sql)")
+        rows = sorted((dict(zip(CATEGORY_GROUP_COLUMNS, row)) for row in BUILTIN_CATEGORY_GROUPS),
+                      key=lambda row: (row['group_order'], row['group_key']))
+
+    categories = {}
+    groups = []
+    for row in rows:
+        categories[row['category_name']] = {
+            'group': row['group_key'],
+            'color': row['color'],
+            'accentClass': row['accent_class'],
+            'recommended': float(row['recommended_percent']),
+        }
+        if row['group_key'] not in groups:
+            groups.append(row['group_key'])
+
+    # Unknown categories always have somewhere to go
+    if DEFAULT_GROUP in groups:
+        groups.remove(DEFAULT_GROUP)
+    groups.append(DEFAULT_GROUP)
+
+    _category_groups = {'categories': categories, 'groups': groups}
+    return _category_groups
+
+
+class CategoryNames:
+    """Case-insensitive category keys and the name each one is shown with
+
+    Every spelling seen is reduced to one key; the group is shown with the
+    smallest spelling, so the name doesn't depend on which batch came first.
+    """
+
+    def __init__(self):
+        self.names = {}     # key -> name shown
+
+    def key(self, name):
+        key = name.lower()
+        shown = self.names.get(key)
+        if shown is None or name < shown:
+            self.names[key] = name
+        return key
+
+    def name(self, key):
+        return self.names.get(key, key)
+
+    def label(self, snapshot):
+        """WindowedMetrics.snapshot() keyed by key -> keyed by name"""
+        snapshot['averages'] = {
+            series if series == TOTAL else self.name(series): values
+            for series, values in snapshot['averages'].items()
+        }
+        return snapshot
+
+
+class MonthlyTotals:
+    """(month, category, type) totals and their windowed metrics, merged
+    from grouped rows in the shape of MONTHLY_ROLLUP_SQL (already converted
+    to REPORTING_CURRENCY). Rows of any granularity can be merged: a
+    finer group (a day, a currency) just adds to its month."""
+
+    def __init__(self):
+        self.groups = {}        # (month_key, category key, type) -> [total, abs_total, count]
+        self.categories = CategoryNames()
+        self.windows = WindowedMetrics()
+
+    def merge(self, row):
+        category = self.categories.key(row['category'])
+        key = (row['month_key'], category, row['type'])
+        total = float(row['total'] or 0)
+        values = self.groups.get(key)
+        if values is None:
+            values = self.groups[key] = [0.0, 0.0, 0]
+        values[0] += total
+        values[1] += float(row['abs_total'] or 0)
+        values[2] += row['count']
+        if row['month_key'] and type_kind(row['type']) == 1:
+            self.windows.add(row['month_key'], category, total, row['first_day'])
+
+    def result(self):
+        """(rows, window snapshot) for build_monthly_analytics()"""
+        rows = [
+            {'month_key': month_key, 'category': self.categories.name(category), 'type': trans_type,
+             'total': values[0], 'abs_total': values[1], 'count': values[2]}
+            for (month_key, category, trans_type), values in self.groups.items()
+        ]
+        return rows, self.categories.label(self.windows.snapshot())
+
+
+class MonthlyRollup:
+    """MonthlyTotals kept up to date from new staging rows"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.totals = MonthlyTotals()
+        self.watermark = StagingWatermark()
+        self.archived_read = False
+
+    def refresh(self, cursor):
+        """Read new staging rows and return (rows, window snapshot)"""
+        with self.lock:
+            window = self.watermark.window(cursor)
+            if window.max_id < self.watermark.through:
+                if role_of(cursor) == REPLICA:
+                    # A replica that hasn't caught up with an earlier primary read
+                    return self.totals.result()
+                # Table was truncated and reloaded, start over
+                self.reset()
+                window = self.watermark.window(cursor)
+
+            if not self.archived_read:
+                for row in archived_monthly(cursor):
+                    self.totals.merge(row)
+                self.archived_read = True
+            if window.condition:
+                cursor.execute(MONTHLY_ROLLUP_SQL.format(window=window.condition),
+                               {'reporting': REPORTING_CURRENCY, **window.params})
+                for row in convert_rows(cursor, cursor.fetchall(), ('total', 'abs_total')):
+                    self.totals.merge(row)
+            self.watermark.advance(window)
+
+            return self.totals.result()
+
+
+# Shared by all requests in this process
+monthly_rollup = MonthlyRollup()
+
+
+def archived_monthly(cursor):
+    """MONTHLY_ARCHIVED_SQL rows, converted to REPORTING_CURRENCY ([] without staging_rollup)"""
+    if not table_exists(cursor, 'staging_rollup'):
+        return []
+    cursor.execute(MONTHLY_ARCHIVED_SQL, {'reporting': REPORTING_CURRENCY})
+    return convert_rows(cursor, cursor.fetchall(), ('total', 'abs_total'))
+
+
+def archived_daily(cursor):
+    """{post_date: [total, count]} of archived expenses, in REPORTING_CURRENCY"""
+    days = {}
+    if not table_exists(cursor, 'staging_rollup'):
+        return days
+    cursor.execute(DAILY_ARCHIVED_SQL, {'reporting': REPORTING_CURRENCY})
+    for row in convert_rows(cursor, cursor.fetchall(), ('total',)):
+        values = days.setdefault(row['date'], [0.0, 0])
+        values[0] += float(row['total'] or 0)
+        values[1] += int(row['transactions'])
+    return days
+
+
+def latest_days(days, archived, limit):
+    """DAILY_COLUMNS rows of the latest `limit` post dates of
+    {post_date: [total, count]} plus the archived totals (archived_daily)"""
+    days = {date: list(values) for date, values in days.items()}
+    for date, (total, count) in archived.items():
+        values = days.setdefault(date, [0.0, 0])
+        values[0] += total
+        values[1] += count
+    # ORDER BY post_date DESC (the text, as DAILY_SQL sorts it)
+    latest = sorted(days.items(), reverse=True)[:limit]
+    return [(date, abs(total), count) for date, (total, count) in latest]
+
+
+def daily_totals(cursor, limit=30):
+    """(columns, rows) for /analytics/daily: expense totals of the latest
+    `limit` post dates, in the reporting currency"""
+    cursor.execute(DAILY_SQL, {'reporting': REPORTING_CURRENCY})
+    days = {}
+    for row in convert_rows(cursor, cursor.fetchall(), ('total',)):
+        values = days.setdefault(row['date'], [0.0, 0])
+        values[0] += float(row['total'] or 0)
+        values[1] += row['transactions']
+    return DAILY_COLUMNS, latest_days(days, archived_daily(cursor), limit)
+
+
+def type_kind(trans_type):
+    """1 = expense, 2 = income, 0 = anything else (transfers, adjustments...)"""
+    if trans_type in EXPENSE_TYPES:
+        return 1
+    if trans_type in INCOME_TYPES:
+        return 2
+    return 0
+
+
+def month_label(month_key):
+    """'2025-10' -> 'Oct'"""
+    return datetime.date(int(month_key[:4]), int(month_key[5:7]), 1).strftime('%b')
+
+
+def moving_averages(series_averages):
+    """{3: x, 6: y, 12: z} -> {'average3Months': x, 'average6Months': y, 'average12Months': z}"""
+    series_averages = series_averages or {}
+    return {f'average{size}Months': float(series_averages.get(size, 0.0)) for size in WINDOWS}
+
+
+def build_monthly_analytics(rows, category_groups, windows=None):
+    """Pivot MONTHLY_ROLLUP_SQL rows into the /analytics/monthly response
+
+    windows is a WindowedMetrics.snapshot() for the same rows; without it
+    the month-over-month fields are returned as zeros.
+    """
+    windows = windows or WindowedMetrics().snapshot()
+    averages = windows['averages']
+    # category_groups is matched case-insensitively, like the grouping
+    categories = {name.lower(): style for name, style in category_groups['categories'].items()}
+    group_keys = category_groups['groups']
+
+    # Dimension lookups (rows with an unparseable date have month_key None)
+    month_keys = sorted({row['month_key'] for row in rows if row['month_key']})
+    month_index = {key: i for i, key in enumerate(month_keys)}
+    category_names = sorted({row['category'] for row in rows})
+    category_index = {name: i for i, name in enumerate(category_names)}
+    group_index = {key: i for i, key in enumerate(group_keys)}
+    category_group = np.array(
+        [group_index[categories.get(name.lower(), {}).get('group', DEFAULT_GROUP)] for name in category_names],
+        dtype=np.intp
+    )
+
+    # Column arrays, one entry per grouped row
+    n = len(rows)
+    month = np.fromiter((month_index.get(row['month_key'], -1) for row in rows), dtype=np.intp, count=n)
+    category = np.fromiter((category_index[row['category']] for row in rows), dtype=np.intp, count=n)
+    kind = np.fromiter((type_kind(row['type']) for row in rows), dtype=np.int8, count=n)
+    total = np.fromiter((float(row['total'] or 0) for row in rows), dtype=np.float64, count=n)
+    abs_total = np.fromiter((float(row['abs_total'] or 0) for row in rows), dtype=np.float64, count=n)
+    count = np.fromiter((row['count'] for row in rows), dtype=np.int64, count=n)
+
+    is_expense = kind == 1
+    is_income = kind == 2
+    num_months = len(month_keys)
+    num_categories = len(category_names)
+    num_groups = len(group_keys)
+
+    # ---- Summary -----------------------------------------------------------
+    expense_total = float(abs(total[is_expense].sum()))
+
+    # ---- Category breakdown (expenses, sorted by amount) --------------------
+    category_amount = np.abs(np.bincount(category[is_expense], weights=total[is_expense], minlength=num_categories))
+    category_count = np.bincount(category[is_expense], weights=count[is_expense], minlength=num_categories)
+    divisor = expense_total or 1
+    category_breakdown = []
+    for i in np.argsort(-category_amount, kind='stable'):
+        if category_count[i] == 0:
+            continue
+        name = category_names[i]
+        style = categories.get(name.lower(), DEFAULT_STYLE)
+        amount = float(category_amount[i])
+        recommended_percent = style['recommended']
+        category_breakdown.append({
+            'category': name,
+            'amount': amount,
+            'percent': (amount / divisor) * 100,
+            'color': style['color'],
+            'accentClass': style['accentClass'],
+            'recommended': recommended_percent,
+            'recommendedAmount': (divisor * recommended_percent / 100) if recommended_percent > 0 else 0,
+            **moving_averages(averages.get(name))
+        })
+
+    # ---- Trend: expenses per month and per group ----------------------------
+    dated = month >= 0
+    expense_dated = is_expense & dated
+    trend_total = np.abs(np.bincount(month[expense_dated], weights=total[expense_dated], minlength=num_months))
+    trend_groups = np.abs(np.bincount(
+        month[expense_dated] * num_groups + category_group[category[expense_dated]],
+        weights=total[expense_dated],
+        minlength=num_months * num_groups
+    ).reshape(num_months, num_groups))
+    trend_has_rows = np.bincount(month[expense_dated], minlength=num_months) > 0
+
+    trend = []
+    for i in np.flatnonzero(trend_has_rows)[:TREND_MONTHS]:
+        point = {'month': month_label(month_keys[i]), 'total': float(trend_total[i])}
+        for j, key in enumerate(group_keys):
+            point[key] = float(trend_groups[i, j])
+        trend.append(point)
+
+    # ---- Income vs expenses per month ---------------------------------------
+    income_dated = is_income & dated
+    income = np.bincount(month[income_dated], weights=abs_total[income_dated], minlength=num_months)
+    expenses = np.bincount(month[expense_dated], weights=abs_total[expense_dated], minlength=num_months)
+    income_vs_expenses = [
+        {'month': month_label(month_keys[i]), 'income': float(income[i]), 'expenses': float(expenses[i])}
+        for i in range(min(num_months, TREND_MONTHS))
+    ]
+
+    top = category_breakdown[0] if category_breakdown else None
+    return {
+        "summary": {
+            "totalSpending": float(expense_total),
+            "dailyAverage": windows['dailyAverage'],
+            "thisMonthTotal": windows['thisMonthTotal'],
+            "lastMonthTotal": windows['lastMonthTotal'],
+            "differenceAmount": windows['differenceAmount'],
+            "differencePercent": windows['differencePercent'],
+            "dailyAverageChange": windows['dailyAverageChange'],
+            **moving_averages(averages.get(TOTAL)),
+            "topCategory": {
+                "name": top['category'] if top else "None",
+                "amount": top['amount'] if top else 0,
+                "percent": top['percent'] if top else 0
+            }
+        },
+        "categoryBreakdown": category_breakdown,
+        "trend": trend,
+        "incomeVsExpenses": income_vs_expenses
+    }
@@ -1,200 +1,286 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import datetime
+import time
+
+from fastapi import FastAPI, File, Header, Query, UploadFile, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import pymysql
-import csv
-import io
-import os
-from dotenv import load_dotenv
+from pymysql.cursors import DictCursor
 
-# Load environment variables from .env file
-load_dotenv()
+from analytics import build_monthly_analytics, daily_totals, load_category_groups, monthly_rollup
+from column_store import column_store
+from db import CORS_ORIGINS, REPLICA_HOST, REPORTING_CURRENCY, connection, replica_monitor, use_replica
+from fx import rate_cache
+from recurring import get_recurring
+from search import MAX_PAGE_SIZE, search_transactions
+from serialization import FORMAT_OBJECTS, columns_payload, fast_json_response, rows_payload
+from statements import parse_text
+from uploads import (
+    ChunkOutOfOrder, get_session, import_rows, is_done, open_session, result_message, save_chunk, session_payload
+)
 
 app = FastAPI()
 
-# Allow frontend to connect
+# Allow frontend to connect; it must send fetch(..., {credentials: 'include'})
+# so the fintrack_last_write cookie comes back (see LAST_WRITE_COOKIE)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# MySQL connection settings
-MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
-MYSQL_USER = os.getenv("MYSQL_USER", "root")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
-MYSQL_DB = os.getenv("MYSQL_DB", "fintrack")
-
-# Category color mapping with recommended spending percentages
-CATEGORY_COLORS = {
-    'Housing': {'color': '#3b82f6', 'accentClass': 'bg-blue-600', 'recommended': 30},
-    'Home': {'color': '#3b82f6', 'accentClass': 'bg-blue-600', 'recommended': 30},
-    'Transportation': {'color': '#f97316', 'accentClass': 'bg-orange-500', 'recommended': 15},
-    'Food': {'color': '#10b981', 'accentClass': 'bg-green-500', 'recommended': 12},
-    'Food & Dining': {'color': '#10b981', 'accentClass': 'bg-green-500', 'recommended': 12},
-    'Food & Drink': {'color': '#ef4444', 'accentClass': 'bg-red-500', 'recommended': 12},
-    'Groceries': {'color': '#10b981', 'accentClass': 'bg-emerald-500', 'recommended': 10},
-    'Restaurants': {'color': '#84cc16', 'accentClass': 'bg-lime-500', 'recommended': 5},
-    'Utilities': {'color': '#eab308', 'accentClass': 'bg-yellow-500', 'recommended': 10},
-    'Bills & Utilities': {'color': '#eab308', 'accentClass': 'bg-yellow-500', 'recommended': 10},
-    'Insurance': {'color': '#a855f7', 'accentClass': 'bg-purple-500', 'recommended': 10},
-    'Medical & Healthcare': {'color': '#ef4444', 'accentClass': 'bg-red-500', 'recommended': 8},
-    'Healthcare': {'color': '#ef4444', 'accentClass': 'bg-red-500', 'recommended': 8},
-    'Health & Wellness': {'color': '#ef4444', 'accentClass': 'bg-red-500', 'recommended': 5},
-    'Personal': {'color': '#ec4899', 'accentClass': 'bg-pink-500', 'recommended': 5},
-    'Personal Care': {'color': '#ec4899', 'accentClass': 'bg-pink-500', 'recommended': 5},
-    'Recreation and Entertainment': {'color': '#6366f1', 'accentClass': 'bg-indigo-500', 'recommended': 5},
-    'Entertainment': {'color': '#6366f1', 'accentClass': 'bg-indigo-500', 'recommended': 5},
-    'Shopping': {'color': '#8b5cf6', 'accentClass': 'bg-violet-500', 'recommended': 5},
-    'General Merchandise': {'color': '#8b5cf6', 'accentClass': 'bg-violet-500', 'recommended': 5},
-    'Education': {'color': '#f97316', 'accentClass': 'bg-orange-500', 'recommended': 5},
-    'Travel': {'color': '#0ea5e9', 'accentClass': 'bg-sky-600', 'recommended': 5},
-    'Bills': {'color': '#facc15', 'accentClass': 'bg-yellow-400', 'recommended': 10},
-    'Gas': {'color': '#f59e0b', 'accentClass': 'bg-amber-500', 'recommended': 8},
-    'Gas & Fuel': {'color': '#f59e0b', 'accentClass': 'bg-amber-500', 'recommended': 8},
-    'Professional Services': {'color': '#475569', 'accentClass': 'bg-slate-500', 'recommended': 5},
-    'Gifts & Donations': {'color': '#f43f5e', 'accentClass': 'bg-rose-600', 'recommended': 3},
-    'Gifts': {'color': '#f43f5e', 'accentClass': 'bg-rose-600', 'recommended': 3},
-    'Miscellaneous': {'color': '#6b7280', 'accentClass': 'bg-gray-500', 'recommended': 5},
-}
+# MySQL connection settings and the connection pool live in db.py
+
+# When this client last wrote; its reads stay on the primary until the
+# replica has caught up (read-your-writes, see db.connection)
+LAST_WRITE_COOKIE = "fintrack_last_write"
+LAST_WRITE_MAX_AGE = 3600       # seconds
+
+
+def note_write(response):
+    response.set_cookie(LAST_WRITE_COOKIE, f"{time.time():.3f}", max_age=LAST_WRITE_MAX_AGE)
+
+
+def append_to_column_store():
+    """Load just-committed staging rows into the column store (customers
+    that are loaded already), so dashboard reads don't have to"""
+    if not column_store.enabled:
+        return
+    try:
+        with connection(decimal_as_float=True) as conn:
+            with conn.cursor(DictCursor) as cursor:
+                column_store.refresh(cursor)
+    except Exception as e:
+        # The next dashboard read picks the rows up instead
+        print(f"Column store warning: {e}")
+
+
+def last_write_of(request):
+    try:
+        return float(request.cookies.get(LAST_WRITE_COOKIE))
+    except (TypeError, ValueError):
+        return None
+
+
+def read_connection(request):
+    """Connection for the dashboard reads: the replica when it is fresh
+    enough for this client, else the primary"""
+    return connection(decimal_as_float=True, read_only=True, last_write=last_write_of(request))
+
 
 @app.post("/upload")
-async def upload_csv(file: UploadFile = File(...)):
-    """Upload and process a CSV file of transactions"""
+async def upload_csv(response: Response, file: UploadFile = File(...), idempotency_key: str = Header(None)):
+    """Upload and process a CSV file of transactions
+
+    With an Idempotency-Key header, sending the same upload again returns
+    the first result instead of importing it again. Large files can be sent
+    in pieces with /upload/sessions instead.
+    """
     try:
-        # Read file content
-        contents = await file.read()
-        decoded_content = contents.decode('utf-8')
-        
-        # Parse CSV
-        reader = csv.DictReader(io.StringIO(decoded_content))
-        
-        # Connect to database
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            db=MYSQL_DB,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        
-        inserted_count = 0
-        skipped_count = 0
-        with conn.cursor() as cursor:
-            for row in reader:
-                # Extract transaction data
-                transaction_date = row.get('transaction_date') or row.get('Transaction Date') or row.get('date') or row.get('Date')
-                post_date = row.get('post_date') or row.get('Post Date') or row.get('date') or row.get('Date')
-                description = row.get('description') or row.get('Description')
-                category = row.get('category') or row.get('Category')
-                trans_type = row.get('type') or row.get('Type') or 'expense'
-                amount = row.get('amount') or row.get('Amount') or '0'
-                memo = row.get('memo') or row.get('Memo') or ''
-                
-                # Check for duplicate based on transaction_date, description, and amount
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM transactions_staging 
-                    WHERE transaction_date = %s 
-                    AND description = %s 
-                    AND amount = %s
-                """, (transaction_date, description, amount))
-                
-                result = cursor.fetchone()
-                if result['count'] > 0:
-                    # Skip this transaction as it already exists
-                    skipped_count += 1
-                    continue
-                
-                # Insert transaction into staging table with correct column names
-                cursor.execute("""
-                    INSERT INTO transactions_staging 
-                    (transaction_date, post_date, description, category, type, amount, memo) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (transaction_date, post_date, description, category, trans_type, amount, memo))
-                inserted_count += 1
+        with connection() as conn:
+            if idempotency_key:
+                # A one-chunk session; a repeat is answered from its row
+                session = open_session(conn, idempotency_key, 1, file.filename)
+                if not is_done(session, 0):
+                    contents = await file.read()
+                    session = save_chunk(conn, session, 0, contents.decode('utf-8-sig'))
+                    note_write(response)
+                    append_to_column_store()
+                return session_payload(session)
+
+            # Read file content
+            contents = await file.read()
+            decoded_content = contents.decode('utf-8-sig')
+
+            # Parse CSV
+            parsed_rows = parse_text(decoded_content)
+
+            counts = import_rows(conn, parsed_rows)
             conn.commit()
-        conn.close()
-        
-        # Build message based on results
-        message = f"CSV uploaded successfully. {inserted_count} transactions imported."
-        if skipped_count > 0:
-            message += f" {skipped_count} duplicate(s) skipped."
-        
+            note_write(response)
+            append_to_column_store()
+
         return {
             "success": True, 
-            "message": message
+            "message": result_message(*counts)
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
         print(f"Upload error: {error_detail}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/upload/sessions")
+def create_upload_session(total_chunks: int, file_name: str = None, idempotency_key: str = Header(...)):
+    """Start (or look up) a chunked upload, see uploads.py
+
+    Returns uploadId and nextChunk: 0 for a new upload, the first missing
+    chunk when resuming, and complete=true if it already finished.
+    """
+    if total_chunks < 1:
+        raise HTTPException(status_code=400, detail="total_chunks must be at least 1")
+    try:
+        with connection() as conn:
+            session = open_session(conn, idempotency_key, total_chunks, file_name)
+        return session_payload(session)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_detail = f"{str(e)}\n{traceback.format_exc()}"
+        print(f"Create upload session error: {error_detail}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/upload/sessions/{upload_id}")
+def get_upload_session(upload_id: str):
+    """Progress of a chunked upload (nextChunk is where to resume)"""
+    with connection() as conn:
+        with conn.cursor(DictCursor) as cursor:
+            session = get_session(cursor, upload_id=upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown upload {upload_id}")
+    return session_payload(session)
+
+@app.put("/upload/sessions/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request, response: Response):
+    """Import one chunk (raw CSV text in the request body)
+
+    Chunks must arrive in order; a chunk that was already committed is
+    acknowledged without being read again.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor(DictCursor) as cursor:
+                session = get_session(cursor, upload_id=upload_id)
+            if session is None:
+                raise HTTPException(status_code=404, detail=f"Unknown upload {upload_id}")
+            if not is_done(session, index):
+                body = await request.body()
+                session = save_chunk(conn, session, index, body.decode('utf-8-sig'))
+                note_write(response)
+                append_to_column_store()
+        return session_payload(session)
+    except HTTPException:
+        raise
+    except ChunkOutOfOrder as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "nextChunk": e.next_chunk})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_detail = f"{str(e)}\n{traceback.format_exc()}"
+        print(f"Upload chunk error: {error_detail}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/transactions")
-def get_transactions():
-    """Get all transactions from the database"""
+def get_transactions(request: Request, format: str = FORMAT_OBJECTS, start: datetime.date = None,
+                     end: datetime.date = None, category: str = None, trans_type: str = Query(None, alias="type")):
+    """Get all transactions from the database
+
+    format=columns returns {"columns": [...], "rows": [[...]]} instead of a
+    list of objects, which is much smaller for large accounts.
+    start / end (YYYY-MM-DD, inclusive), category and type narrow the list.
+    Amounts are in each transaction's own currency.
+    """
     try:
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            db=MYSQL_DB,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    staging_id as id,
-                    description as name,
-                    description,
-                    category as merchant,
-                    category,
-                    CAST(amount AS DECIMAL(12,2)) as amount,
-                    post_date as date,
-                    type
-                FROM transactions_staging
-                ORDER BY STR_TO_DATE(post_date, '%m/%d/%Y') DESC, staging_id DESC
-            """)
-            transactions = cursor.fetchall()
-        conn.close()
-        return transactions
+        with read_connection(request) as conn:
+            snapshot = None
+            if column_store.enabled:
+                with conn.cursor(DictCursor) as cursor:
+                    snapshot = column_store.snapshot(cursor)
+            if snapshot is not None:
+                columns, transactions = snapshot.transactions(start, end, category, trans_type)
+                return fast_json_response(request, columns_payload(columns, transactions, format))
+
+            filters = []
+            params = []
+            if start is not None:
+                filters.append("STR_TO_DATE(post_date, '%%m/%%d/%%Y') >= %s")
+                params.append(start)
+            if end is not None:
+                filters.append("STR_TO_DATE(post_date, '%%m/%%d/%%Y') <= %s")
+                params.append(end)
+            if category is not None:
+                filters.append("LOWER(category) = %s")
+                params.append(category.lower())
+            if trans_type is not None:
+                filters.append("LOWER(type) = %s")
+                params.append(trans_type.lower())
+            where = ("WHERE " + " AND ".join(filters)) if filters else ""
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT 
+                        staging_id as id,
+                        description as name,
+                        description,
+                        category as merchant,
+                        category,
+                        CAST(amount AS DECIMAL(12,2)) as amount,
+                        COALESCE(currency, %s) as currency,
+                        post_date as date,
+                        type
+                    FROM transactions_staging
+                    {where}
+                    ORDER BY STR_TO_DATE(post_date, '%%m/%%d/%%Y') DESC, staging_id DESC
+                """, [REPORTING_CURRENCY] + params)
+                transactions = cursor.fetchall()
+                payload = rows_payload(cursor, transactions, format)
+        return fast_json_response(request, payload)
     except Exception as e:
         import traceback
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
         print(f"Get transactions error: {error_detail}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/transactions/search")
+def search(request: Request, q: str, page: int = 1, page_size: int = 50):
+    """Search transactions by description and memo
+
+    All words must match, each as a prefix ("whole foo" finds
+    "WHOLE FOODS MARKET"). Best matches first. At least one word needs
+    3 or more characters (400 otherwise). Amounts are in each
+    transaction's own currency.
+    """
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    try:
+        with read_connection(request) as conn:
+            with conn.cursor(DictCursor) as cursor:
+                total, results = search_transactions(cursor, q, page, page_size)
+        return fast_json_response(request, {
+            "query": q,
+            "page": page,
+            "pageSize": page_size,
+            "total": total,
+            "results": results
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_detail = f"{str(e)}\n{traceback.format_exc()}"
+        print(f"Search transactions error: {error_detail}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/analytics/daily")
-def get_daily_analytics():
+def get_daily_analytics(request: Request, format: str = FORMAT_OBJECTS):
     """Get daily spending analytics"""
     try:
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            db=MYSQL_DB,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    post_date as date,
-                    ABS(SUM(CAST(amount AS DECIMAL(12,2)))) as total,
-                    COUNT(*) as transactions
-                FROM transactions_staging
-                WHERE post_date IS NOT NULL AND post_date != ''
-                AND LOWER(type) IN ('expense', 'sale', 'debit')
-                GROUP BY post_date
-                ORDER BY post_date DESC
-                LIMIT 30
-            """)
-            daily_data = cursor.fetchall()
-        conn.close()
-        return daily_data
+        with read_connection(request) as conn:
+            snapshot = None
+            if column_store.enabled:
+                with conn.cursor(DictCursor) as cursor:
+                    snapshot = column_store.snapshot(cursor)
+            if snapshot is not None:
+                columns, daily_data = snapshot.daily()
+                return fast_json_response(request, columns_payload(columns, daily_data, format))
+
+            with conn.cursor(DictCursor) as cursor:
+                columns, daily_data = daily_totals(cursor)
+                payload = columns_payload(columns, daily_data, format)
+        return fast_json_response(request, payload)
     except Exception as e:
         import traceback
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
@@ -202,155 +288,80 @@ def get_daily_analytics():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/analytics/monthly")
-def get_monthly_analytics():
+def get_monthly_analytics(request: Request):
     """Get monthly analytics including summary, trends, and category breakdown"""
     try:
-        conn = pymysql.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            db=MYSQL_DB,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        with conn.cursor() as cursor:
-            # Get total spending
-            cursor.execute("""
-                SELECT 
-                    ABS(SUM(CAST(amount AS DECIMAL(12,2)))) as totalSpending,
-                    ABS(AVG(CAST(amount AS DECIMAL(12,2)))) as dailyAverage,
-                    COUNT(*) as transactionCount
-                FROM transactions_staging
-                WHERE post_date IS NOT NULL AND post_date != ''
-                AND LOWER(type) IN ('expense', 'sale', 'debit')
-            """)
-            summary = cursor.fetchone()
-            
-            # Get category breakdown
-            cursor.execute("""
-                SELECT 
-                    COALESCE(category, 'Uncategorized') as category,
-                    ABS(SUM(CAST(amount AS DECIMAL(12,2)))) as amount,
-                    COUNT(*) as count
-                FROM transactions_staging
-                WHERE post_date IS NOT NULL AND post_date != ''
-                AND LOWER(type) IN ('expense', 'sale', 'debit')
-                GROUP BY category
-                ORDER BY amount DESC
-            """)
-            categories = cursor.fetchall()
-            
-            # Calculate percentages
-            total = float(summary['totalSpending'] or 1)
-            category_breakdown = []
-            for cat in categories:
-                cat_name = cat['category']
-                color_info = CATEGORY_COLORS.get(cat_name, {'color': '#6b7280', 'accentClass': 'bg-gray-500', 'recommended': 0})
-                amount = float(cat['amount'])
-                recommended_percent = color_info.get('recommended', 0)
-                recommended_amount = (total * recommended_percent / 100) if recommended_percent > 0 else 0
-                
-                category_breakdown.append({
-                    'category': cat_name,
-                    'amount': amount,
-                    'percent': (amount / total) * 100,
-                    'color': color_info['color'],
-                    'accentClass': color_info['accentClass'],
-                    'recommended': recommended_percent,
-                    'recommendedAmount': recommended_amount
-                })
-            
-            # Get income vs expenses by month
-            cursor.execute("""
-                SELECT 
-                    DATE_FORMAT(STR_TO_DATE(post_date, '%m/%d/%Y'), '%b') as month,
-                    DATE_FORMAT(STR_TO_DATE(post_date, '%m/%d/%Y'), '%Y-%m') as month_key,
-                    SUM(CASE WHEN LOWER(type) IN ('income', 'credit', 'payment') THEN ABS(CAST(amount AS DECIMAL(12,2))) ELSE 0 END) as income,
-                    SUM(CASE WHEN LOWER(type) IN ('expense', 'sale', 'debit') THEN ABS(CAST(amount AS DECIMAL(12,2))) ELSE 0 END) as expenses
-                FROM transactions_staging
-                WHERE post_date IS NOT NULL AND post_date != ''
-                GROUP BY month_key, month
-                ORDER BY month_key ASC
-                LIMIT 12
-            """)
-            income_vs_expenses_data = cursor.fetchall()
-            
-            income_vs_expenses = []
-            for row in income_vs_expenses_data:
-                income_vs_expenses.append({
-                    'month': row['month'],
-                    'income': float(row['income']),
-                    'expenses': float(row['expenses'])
-                })
-            
-            # Get monthly trend data with category breakdown
-            cursor.execute("""
-                SELECT 
-                    DATE_FORMAT(STR_TO_DATE(post_date, '%m/%d/%Y'), '%b') as month,
-                    DATE_FORMAT(STR_TO_DATE(post_date, '%m/%d/%Y'), '%Y-%m') as month_key,
-                    ABS(SUM(CAST(amount AS DECIMAL(12,2)))) as total,
-                    ABS(SUM(CASE WHEN category IN ('Housing', 'Home') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as housing,
-                    ABS(SUM(CASE WHEN category IN ('Groceries', 'Food & Dining', 'Food') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as food,
-                    ABS(SUM(CASE WHEN category IN ('Restaurants', 'Food & Drink') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as dining,
-                    ABS(SUM(CASE WHEN category IN ('Transportation', 'Gas', 'Gas & Fuel') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as transportation,
-                    ABS(SUM(CASE WHEN category IN ('Utilities', 'Bills', 'Bills & Utilities') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as utilities,
-                    ABS(SUM(CASE WHEN category = 'Insurance' THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as insurance,
-                    ABS(SUM(CASE WHEN category IN ('Medical & Healthcare', 'Healthcare', 'Health & Wellness') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as medical,
-                    ABS(SUM(CASE WHEN category IN ('Personal Care', 'Personal') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as personal,
-                    ABS(SUM(CASE WHEN category IN ('Recreation & Entertainment', 'Recreation and Entertainment', 'Entertainment') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as recreation,
-                    ABS(SUM(CASE WHEN category = 'Education' THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as education,
-                    ABS(SUM(CASE WHEN category IN ('Shopping', 'General Merchandise', 'Gifts & Donations', 'Gifts') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as shopping,
-                    ABS(SUM(CASE WHEN category NOT IN ('Housing', 'Home', 'Food & Dining', 'Food', 'Groceries', 'Restaurants', 'Food & Drink', 'Transportation', 'Gas', 'Gas & Fuel', 'Utilities', 'Bills', 'Bills & Utilities', 'Insurance', 'Medical & Healthcare', 'Healthcare', 'Health & Wellness', 'Personal Care', 'Personal', 'Recreation & Entertainment', 'Recreation and Entertainment', 'Entertainment', 'Education', 'Shopping', 'General Merchandise', 'Gifts & Donations', 'Gifts') THEN CAST(amount AS DECIMAL(12,2)) ELSE 0 END)) as miscellaneous
-                FROM transactions_staging
-                WHERE post_date IS NOT NULL AND post_date != ''
-                AND LOWER(type) IN ('expense', 'sale', 'debit')
-                GROUP BY month_key, month
-                ORDER BY month_key ASC
-                LIMIT 12
-            """)
-            trend_data = cursor.fetchall()
-            
-            trend = []
-            for row in trend_data:
-                trend.append({
-                    'month': row['month'],
-                    'total': float(row['total']),
-                    'housing': float(row['housing'] or 0),
-                    'food': float(row['food'] or 0),
-                    'dining': float(row['dining'] or 0),
-                    'transportation': float(row['transportation'] or 0),
-                    'utilities': float(row['utilities'] or 0),
-                    'insurance': float(row['insurance'] or 0),
-                    'medical': float(row['medical'] or 0),
-                    'personal': float(row['personal'] or 0),
-                    'recreation': float(row['recreation'] or 0),
-                    'education': float(row['education'] or 0),
-                    'shopping': float(row['shopping'] or 0),
-                    'miscellaneous': float(row['miscellaneous'] or 0)
-                })
-            
-        conn.close()
-        
+        with read_connection(request) as conn:
+            with conn.cursor(DictCursor) as cursor:
+                # Category groups are cached after the first request
+                category_groups = load_category_groups(cursor)
+
+                # Grouped by (month, category, type); only rows added since the
+                # last request are read, the rest is kept in the process
+                snapshot = column_store.snapshot(cursor) if column_store.enabled else None
+                if snapshot is not None:
+                    rows, windows = snapshot.monthly()
+                else:
+                    rows, windows = monthly_rollup.refresh(cursor)
+
+        return fast_json_response(request, build_monthly_analytics(rows, category_groups, windows))
+    except Exception as e:
+        import traceback
+        error_detail = f"{str(e)}\n{traceback.format_exc()}"
+        print(f"Get monthly analytics error: {error_detail}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/recurring")
+def get_recurring_charges(request: Request, customer_id: int = None, include_inactive: bool = False):
+    """Get recurring payments (subscriptions, rent, insurance, paychecks)
+
+    Reads the per-merchant stats that pipeline.py (or recurring.py) keeps
+    up to date after each transform.
+    """
+    try:
+        with read_connection(request) as conn:
+            with conn.cursor(DictCursor) as cursor:
+                recurring = get_recurring(cursor, customer_id, include_inactive)
+        return fast_json_response(request, recurring)
+    except Exception as e:
+        import traceback
+        error_detail = f"{str(e)}\n{traceback.format_exc()}"
+        print(f"Get recurring error: {error_detail}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analytics/category-groups/reload")
+def reload_category_groups():
+    """Re-read the category_groups table after it was edited
+
+    Also drops the cached monthly rollup, in-memory columns and FX rates so
+    the next request rebuilds them.
+    """
+    try:
+        with connection() as conn:
+            with conn.cursor(DictCursor) as cursor:
+                category_groups = load_category_groups(cursor, refresh=True)
+        with monthly_rollup.lock:
+            monthly_rollup.reset()
+        column_store.clear()
+        rate_cache.clear()
         return {
-            "summary": {
-                "totalSpending": float(summary['totalSpending'] or 0),
-                "dailyAverage": float(summary['dailyAverage'] or 0),
-                "lastMonthTotal": 0,
-                "differenceAmount": 0,
-                "differencePercent": 0,
-                "dailyAverageChange": 0,
-                "topCategory": {
-                    "name": category_breakdown[0]['category'] if category_breakdown else "None",
-                    "amount": category_breakdown[0]['amount'] if category_breakdown else 0,
-                    "percent": category_breakdown[0]['percent'] if category_breakdown else 0
-                }
-            },
-            "categoryBreakdown": category_breakdown,
-            "trend": trend,
-            "incomeVsExpenses": income_vs_expenses
+            "success": True,
+            "categories": len(category_groups['categories']),
+            "groups": category_groups['groups']
         }
     except Exception as e:
         import traceback
         error_detail = f"{str(e)}\n{traceback.format_exc()}"
-        print(f"Get monthly analytics error: {error_detail}")
+        print(f"Reload category groups error: {error_detail}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/database/status")
+def database_status(request: Request):
+    """Where this client's dashboard reads go right now (primary or replica)
+    and how far behind the replica is"""
+    lag = replica_monitor.status()[0] if REPLICA_HOST else None
+    return {
+        "replica": REPLICA_HOST or None,
+        "replicaLagSeconds": lag,
+        "readsFrom": "replica" if use_replica(last_write_of(request)) else "primary"
+    }
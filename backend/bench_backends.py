@@ -0,0 +1,199 @@
+"""
+bench_backends.py - API timings on MySQL vs the embedded DuckDB backend
+
+WHAT THIS DOES:
+  Loads the same synthetic transactions_staging rows into a scratch DuckDB
+  file and (with --mysql) a scratch MySQL database, then times the API
+  endpoints against each backend through FastAPI's TestClient:
+  - GET  /transactions?format=columns   (full table read)
+  - GET  /analytics/daily               (filtered GROUP BY)
+  - GET  /analytics/monthly             (cold: the rollup / column store re-load everything)
+  - GET  /transactions/search?q=...     (FULLTEXT on MySQL, scan on DuckDB)
+  - POST /upload                        (1,000 new rows incl. duplicate check)
+
+  Your real database is never touched: MySQL runs use the fintrack_bench
+  database, which is dropped at the end.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/bench_backends.py                  (DuckDB only)
+  .\.venv\Scripts\python.exe backend/bench_backends.py --mysql          (both)
+  .\.venv\Scripts\python.exe backend/bench_backends.py --rows 1000000 --mysql
+
+EXPECTED OUTPUT:
+  One line per endpoint with the median milliseconds per backend.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Point the MySQL side at a scratch database before db.py reads the settings
+BENCH_DB = "fintrack_bench"
+os.environ["MYSQL_DB"] = BENCH_DB
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import analytics  # noqa: E402
+import api_upload  # noqa: E402
+import db  # noqa: E402
+import embedded  # noqa: E402
+from column_store import column_store  # noqa: E402
+from models import Base, CategoryGroup, TransactionStaging  # noqa: E402
+
+RUNS = 5
+UPLOAD_ROWS = 1000
+LOAD_BATCH = 50000
+
+COLUMNS = ("transaction_date", "post_date", "description", "category", "type", "amount", "memo")
+MERCHANTS = ["AMAZON MKTPLACE PMTS", "STARBUCKS STORE 1234", "SHELL OIL 5744", "NETFLIX.COM",
+             "WHOLEFDS MKT 10234", "UBER *TRIP", "COMCAST CABLE", "TRADER JOE S #552",
+             "WHOLE FOODS MARKET", "SPOTIFY USA", "CVS/PHARMACY #02231", "CHIPOTLE 1187"]
+CATEGORIES = ["Shopping", "Food & Drink", "Gas", "Entertainment", "Groceries", "Travel", "Bills & Utilities"]
+
+
+def make_rows(count, seed=42, year=2025):
+    """Staging rows as /upload stores them (text columns)"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        month, day = rng.randint(1, 12), rng.randint(1, 28)
+        sale = rng.random() < 0.9
+        rows.append((
+            f"{month:02d}/{day:02d}/{year}",
+            f"{month:02d}/{min(day + 1, 28):02d}/{year}",
+            rng.choice(MERCHANTS),
+            rng.choice(CATEGORIES),
+            "Sale" if sale else "Payment",
+            f"{-rng.uniform(1, 500) if sale else rng.uniform(100, 3000):.2f}",
+            "",
+        ))
+    return rows
+
+
+def load(conn, rows):
+    for start in range(0, len(rows), LOAD_BATCH):
+        db.bulk_insert(conn, TransactionStaging.__table__,
+                       [dict(zip(COLUMNS, row)) for row in rows[start:start + LOAD_BATCH]])
+    conn.commit()
+
+
+def setup_duckdb(path, rows):
+    db.DB_BACKEND = "duckdb"
+    db.DUCKDB_PATH = path
+    with db.connection() as conn:
+        embedded.create_schema(conn)     # seeds category_groups
+        load(conn, rows)
+
+
+def setup_mysql(rows):
+    db.DB_BACKEND = "mysql"
+    server = db.server_connection()
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DB}")
+        cursor.execute(f"CREATE DATABASE {BENCH_DB}")
+    server.close()
+    Base.metadata.create_all(db.get_engine(), tables=[TransactionStaging.__table__, CategoryGroup.__table__])
+    with db.connection() as conn:
+        embedded.seed_category_groups(conn)
+        load(conn, rows)
+
+
+def drop_mysql():
+    db.dispose_engines()
+    server = db.server_connection()
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DB}")
+    server.close()
+
+
+def upload_csv(seed):
+    lines = [",".join(f'"{v}"' for v in ("Transaction Date", "Post Date", "Description", "Category",
+                                          "Type", "Amount", "Memo"))]
+    lines += [",".join(f'"{v}"' for v in row) for row in make_rows(UPLOAD_ROWS, seed=seed, year=2026)]
+    return "\n".join(lines) + "\n"
+
+
+def median_ms(fn, runs=RUNS):
+    fn()  # warm-up (connections, caches)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def cold_monthly(client):
+    with analytics.monthly_rollup.lock:
+        analytics.monthly_rollup.reset()
+    column_store.clear()
+    return client.get("/analytics/monthly")
+
+
+def run_cases(client):
+    uploads = itertools.count(1000)
+    cases = [
+        ("GET /transactions?format=columns", lambda: client.get("/transactions?format=columns")),
+        ("GET /analytics/daily", lambda: client.get("/analytics/daily")),
+        ("GET /analytics/monthly (cold)", lambda: cold_monthly(client)),
+        ("GET /transactions/search", lambda: client.get("/transactions/search?q=whole foods")),
+        (f"POST /upload ({UPLOAD_ROWS:,} rows)",
+         lambda: client.post("/upload", files={"file": ("bench.csv", upload_csv(next(uploads)))})),
+    ]
+    results = {}
+    for name, fn in cases:
+        response = fn()
+        if response.status_code != 200:
+            raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+        results[name] = median_ms(fn)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the API on MySQL and embedded DuckDB")
+    parser.add_argument("--rows", type=int, default=200_000, help="synthetic staging rows")
+    parser.add_argument("--mysql", action="store_true", help=f"also run against MySQL ({BENCH_DB} database)")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"BACKEND BENCHMARK: {args.rows:,} staging rows, median of {RUNS}")
+    print("=" * 78)
+
+    rows = make_rows(args.rows)
+    client = TestClient(api_upload.app)
+    timings = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        setup_duckdb(os.path.join(tmp, "bench.duckdb"), rows)
+        print(f"✓ DuckDB loaded in {time.perf_counter() - started:.1f}s")
+        timings["duckdb"] = run_cases(client)
+        db.dispose_engines()
+
+    if args.mysql:
+        try:
+            started = time.perf_counter()
+            setup_mysql(rows)
+            print(f"✓ MySQL loaded in {time.perf_counter() - started:.1f}s")
+            timings["mysql"] = run_cases(client)
+        finally:
+            drop_mysql()
+
+    backends = list(timings)
+    print(f"\n{'endpoint':<36}" + "".join(f"{name + ' ms':>14}" for name in backends)
+          + (f"{'speedup':>10}" if len(backends) == 2 else ""))
+    print("-" * 78)
+    for case in timings["duckdb"]:
+        line = f"{case:<36}" + "".join(f"{timings[name][case]:>14.1f}" for name in backends)
+        if len(backends) == 2:
+            line += f"{timings['mysql'][case] / timings['duckdb'][case]:>9.1f}x"
+        print(line)
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+bench_serialization.py - Bytes and CPU time per 100k-row /transactions response
+
+WHAT THIS DOES:
+  Builds 100,000 synthetic rows shaped like the /transactions query and
+  compares:
+  - default:  DictCursor rows (Decimal amounts) -> jsonable_encoder -> json
+              (what FastAPI does when an endpoint returns a list of dicts)
+  - objects:  float amounts from FAST_CONVERSIONS -> serialization.dumps
+  - columns:  same, in the compact {"columns", "rows"} format
+  Each payload is also measured after gzip and brotli (if installed).
+
+  No database is needed.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/bench_serialization.py
+  .\.venv\Scripts\python.exe backend/bench_serialization.py 250000
+
+EXPECTED OUTPUT:
+  A table with one line per format/encoding: response bytes and CPU
+  milliseconds (best of 3 runs) for encoding + compression.
+"""
+
+import decimal
+import json
+import random
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+import serialization
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+RUNS = 3
+
+COLUMNS = ["id", "name", "description", "merchant", "category", "amount", "date", "type"]
+MERCHANTS = ["AMAZON MKTPLACE PMTS", "STARBUCKS STORE 1234", "SHELL OIL 5744", "NETFLIX.COM",
+             "WHOLEFDS MKT 10234", "UBER *TRIP", "COMCAST CABLE", "TRADER JOE S #552"]
+CATEGORIES = ["Shopping", "Food & Drink", "Gas", "Entertainment", "Groceries", "Travel", "Bills & Utilities"]
+
+
+def make_rows(count):
+    """Tuples as returned by the tuple cursor with FAST_CONVERSIONS"""
+    rng = random.Random(42)
+    rows = []
+    for i in range(count):
+        description = rng.choice(MERCHANTS)
+        category = rng.choice(CATEGORIES)
+        rows.append((
+            count - i,
+            description,
+            description,
+            category,
+            category,
+            round(-rng.uniform(1, 500), 2),
+            f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2025",
+            "Sale",
+        ))
+    return rows
+
+
+def cpu_ms(fn):
+    best = None
+    for _ in range(RUNS):
+        start = time.process_time()
+        result = fn()
+        elapsed = (time.process_time() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def default_encode(dict_rows):
+    # Same steps as fastapi's serialize_response + JSONResponse.render
+    encoded = jsonable_encoder(dict_rows)
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FakeCursor:
+    description = [(name,) for name in COLUMNS]
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print(f"SERIALIZATION BENCHMARK: {ROWS:,} rows, best of {RUNS}")
+    print(f"  orjson: {'yes' if serialization.orjson else 'no'}   brotli: {'yes' if serialization.brotli else 'no'}")
+    print("=" * 70)
+
+    tuple_rows = make_rows(ROWS)
+    # What DictCursor returns without FAST_CONVERSIONS
+    decimal_dicts = [
+        dict(zip(COLUMNS, row[:5] + (decimal.Decimal(f"{row[5]:.2f}"),) + row[6:]))
+        for row in tuple_rows
+    ]
+
+    cases = [
+        ("default", lambda: default_encode(decimal_dicts)),
+        ("objects", lambda: serialization.dumps(serialization.rows_payload(FakeCursor, tuple_rows))),
+        ("columns", lambda: serialization.dumps(
+            serialization.rows_payload(FakeCursor, tuple_rows, serialization.FORMAT_COLUMNS))),
+    ]
+    encodings = ["identity", "gzip"] + (["br"] if serialization.brotli else [])
+
+    print(f"{'format':<10} {'encoding':<10} {'bytes':>14} {'encode ms':>10} {'compress ms':>12} {'total ms':>10}")
+    print("-" * 70)
+    for name, encode in cases:
+        body, encode_ms = cpu_ms(encode)
+        for encoding in encodings:
+            if encoding == "identity":
+                compressed, compress_ms = body, 0.0
+            else:
+                compressed, compress_ms = cpu_ms(lambda: serialization.compress(body, encoding))
+            print(f"{name:<10} {encoding:<10} {len(compressed):>14,} {encode_ms:>10.1f} "
+                  f"{compress_ms:>12.1f} {encode_ms + compress_ms:>10.1f}")
+    print("=" * 70)
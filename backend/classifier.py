@@ -33,3 +33,21 @@ def ai_classify_openai(description, openai_client, categories):
     # parse response -> category
     # return category, confidence
     raise NotImplementedError("Add your OpenAI call here following your api client")
+
+# Store numbers, card suffixes, processor prefixes ("SQ *", "TST*") and
+# punctuation vary between statements for the same merchant
+MERCHANT_PREFIXES = ("sq *", "sq*", "tst*", "tst *", "pp*", "paypal *", "sp ", "dd *")
+MERCHANT_NOISE = re.compile(r"[#*]?\d[\d\-/.]*|[^a-z&' ]+")
+
+def normalize_merchant(description, max_tokens=3):
+    """'NETFLIX.COM 866-579-7172 CA' -> 'netflix com'"""
+    s = normalize_text(description or "").strip()
+    for prefix in MERCHANT_PREFIXES:
+        if s.startswith(prefix):
+            s = s[len(prefix):]
+            break
+    tokens = [t for t in MERCHANT_NOISE.sub(" ", s).split() if len(t) > 1]
+    # Trailing two-letter state code ("... CA")
+    if len(tokens) > 1 and len(tokens[-1]) == 2:
+        tokens.pop()
+    return " ".join(tokens[:max_tokens])
@@ -0,0 +1,458 @@
+"""
+column_store.py - In-memory columnar copy of the transactions for the dashboard
+
+WHAT THIS DOES:
+  Keeps the rows the dashboard reads in the API process as NumPy columns,
+  so /transactions, /analytics/daily and /analytics/monthly are answered
+  with array reductions instead of a query over the whole table:
+  - one int per row for staging id, date (days since 1970, NO_DATE when
+    post_date is empty or not MM/DD/YYYY), amount in cents, and dictionary
+    codes for category, type, currency, description and the raw post_date
+    text (each distinct string is stored once)
+  - sums are in REPORTING_CURRENCY: rows in other currencies are converted
+    one currency at a time with fx.py's per-day rates, which costs nothing
+    when the account has a single currency
+  - loaded on first access, then each request only reads rows added since
+    the previous one (one MAX(staging_id) lookup when nothing changed;
+    rows that commit late are still picked up, see watermark.py)
+  - one set of columns per customer, dropped least-recently-used first
+    when they outgrow COLUMN_STORE_MB (db.py; 0 turns the store off and
+    the endpoints query the database as before). A customer that doesn't
+    fit on its own is not kept at all: snapshot() returns None and the
+    endpoints query the database for it.
+  - NULL and '' stay different, as in SQL: only NULL is 'Uncategorized',
+    and a filter never matches NULL
+
+  /analytics/monthly comes from totals the columns keep as rows are
+  appended (analytics.MonthlyTotals, the same merge MonthlyRollup uses):
+  each batch of new rows is grouped once, so a request only reads them.
+  Uploads append their rows right after they commit (refresh()).
+  Staging rows archived by run_04_maintenance.py are not rows here any
+  more: their totals (staging_rollup) are read once when a customer's
+  columns are loaded and added to the daily and monthly results.
+
+  transactions_staging has no customer column yet, so all of its rows
+  belong to customer 0 (the same "no customer yet" id recurring_merchants
+  uses). Until it has one, the per-customer LRU only ever holds that one
+  set of columns: COLUMN_STORE_MB decides whether it is kept at all.
+
+  Reads never block uploads: a request works on a snapshot of the columns
+  (NumPy views up to the current length), and new rows are only ever
+  written past that length. Rows deleted from staging by hand stay in
+  memory until the API restarts or POST /analytics/category-groups/reload
+  is called.
+"""
+
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from analytics import EXPENSE_TYPES, MonthlyTotals, archived_daily, archived_monthly, latest_days
+from db import COLUMN_STORE_MB, REPLICA, REPORTING_CURRENCY, role_of
+from fx import EPOCH_ORDINAL, NO_DATE, convert_rows, rate_cache
+from watermark import StagingWatermark
+
+# staging rows are not assigned to customers yet
+DEFAULT_CUSTOMER = 0
+
+# Rows fetched per round trip while loading
+FETCH_SIZE = 50000
+
+# Rough per-string overhead of a Python str in a dictionary (for the budget)
+STRING_OVERHEAD = 64
+
+TRANSACTION_COLUMNS = ('id', 'name', 'description', 'merchant', 'category', 'amount', 'currency', 'date', 'type')
+DAILY_COLUMNS = ('date', 'total', 'transactions')
+
+LOAD_SQL = """
+    SELECT staging_id, post_date, description, category, type, currency,
+           CAST(amount AS DECIMAL(12,2)) as amount
+    FROM transactions_staging
+    WHERE {window}
+    ORDER BY staging_id
+"""
+
+
+def lower(value):
+    """LOWER() of SQL: NULL stays NULL"""
+    return None if value is None else value.lower()
+
+
+def parse_post_date(text):
+    """'MM/DD/YYYY' -> days since 1970 (NO_DATE if it doesn't parse), like STR_TO_DATE"""
+    try:
+        return datetime.datetime.strptime(text, '%m/%d/%Y').toordinal() - EPOCH_ORDINAL
+    except (TypeError, ValueError):
+        return NO_DATE
+
+
+class Dictionary:
+    """Distinct strings <-> int codes (append-only)"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.nbytes = 0
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self.nbytes += STRING_OVERHEAD + len(value or '')
+        return code
+
+    def lookup(self, count):
+        """Object array of the first `count` values, for fancy indexing"""
+        values = np.empty(count, dtype=object)
+        values[:] = self.values[:count]
+        return values
+
+
+class Column:
+    """Growable NumPy array; capacity doubles so appends are amortized O(1)"""
+
+    def __init__(self, dtype):
+        self.data = np.empty(1024, dtype=dtype)
+        self.length = 0
+
+    def extend(self, values):
+        end = self.length + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+        self.data[self.length:end] = values
+        self.length = end
+
+    def view(self, length):
+        return self.data[:length]
+
+
+class Snapshot:
+    """Consistent, read-only view of one customer's columns"""
+
+    def __init__(self, columns, rates=None):
+        n = self.length = columns.length
+        self.rates = rates      # fx.RateTable, needed if any row is in another currency
+        self.staging_id = columns.staging_id.view(n)
+        self.days = columns.days.view(n)
+        self.cents = columns.cents.view(n)
+        self.category = columns.category.view(n)
+        self.type = columns.type.view(n)
+        self.currency = columns.currency.view(n)
+        self.description = columns.description.view(n)
+        self.post_date = columns.post_date.view(n)
+        # Dictionaries only grow, so their current lengths match these rows
+        self.dictionaries = {
+            name: (dictionary, len(dictionary.values))
+            for name, dictionary in columns.dictionaries.items()
+        }
+        self.post_date_days = np.array(columns.post_date_days[:self.dictionaries['post_date'][1]], dtype=np.int32)
+        # Kept up to date by the store; may already include rows appended after this snapshot
+        self.monthly_totals = columns.monthly
+        self.monthly_lock = columns.monthly_lock
+        self.archived_daily = columns.archived_daily
+
+    def values(self, name):
+        dictionary, count = self.dictionaries[name]
+        return dictionary.values[:count]
+
+    def reporting_cents(self):
+        """Amounts in cents of REPORTING_CURRENCY, converted one currency at a time"""
+        currencies = [(name or REPORTING_CURRENCY).upper() for name in self.values('currency')]
+        foreign = [code for code, name in enumerate(currencies) if name != REPORTING_CURRENCY]
+        if not foreign:
+            return self.cents
+        cents = self.cents.astype(np.float64)
+        for code in foreign:
+            rows = np.flatnonzero(self.currency == code)
+            cents[rows] *= self.rates.factors(currencies[code], self.days[rows])
+        return cents
+
+    # ------------------------------------------------------------------ masks
+
+    def _type_mask(self, wanted):
+        """Rows whose LOWER(type) is in wanted"""
+        matches = np.array([lower(value) in wanted for value in self.values('type')], dtype=bool)
+        return matches[self.type]
+
+    def _has_post_date(self):
+        present = np.array([bool(value) for value in self.values('post_date')], dtype=bool)
+        return present[self.post_date]
+
+    # ---------------------------------------------------------------- queries
+
+    def transactions(self, start=None, end=None, category=None, trans_type=None):
+        """Rows of GET /transactions (newest first), optionally filtered
+
+        start / end are inclusive datetime.date bounds on post_date.
+        """
+        mask = np.ones(self.length, dtype=bool)
+        if start is not None:
+            mask &= self.days >= start.toordinal() - EPOCH_ORDINAL
+        if end is not None:
+            mask &= (self.days <= end.toordinal() - EPOCH_ORDINAL) & (self.days != NO_DATE)
+        if category is not None:
+            wanted = category.lower()
+            matches = np.array([lower(value) == wanted for value in self.values('category')], dtype=bool)
+            mask &= matches[self.category]
+        if trans_type is not None:
+            mask &= self._type_mask((trans_type.lower(),))
+
+        rows = np.flatnonzero(mask)
+        # ORDER BY post_date DESC, staging_id DESC (undated rows last)
+        rows = rows[np.lexsort((self.staging_id[rows], self.days[rows]))[::-1]]
+
+        descriptions = self._decode('description', rows).tolist()
+        categories = self._decode('category', rows).tolist()
+        currencies = [name or REPORTING_CURRENCY for name in self.values('currency')]
+        columns = (
+            self.staging_id[rows].tolist(),
+            descriptions,
+            descriptions,
+            categories,
+            categories,
+            (self.cents[rows] / 100).tolist(),
+            [currencies[code] for code in self.currency[rows].tolist()],
+            self._decode('post_date', rows).tolist(),
+            self._decode('type', rows).tolist(),
+        )
+        return TRANSACTION_COLUMNS, list(zip(*columns))
+
+    def daily(self, limit=30):
+        """Rows of GET /analytics/daily: expenses per post_date, latest 30"""
+        mask = self._has_post_date() & self._type_mask(EXPENSE_TYPES)
+        codes = self.post_date[mask]
+        count = len(self.values('post_date'))
+        totals = np.bincount(codes, weights=self.reporting_cents()[mask], minlength=count)
+        counts = np.bincount(codes, minlength=count)
+
+        post_dates = self.values('post_date')
+        days = {post_dates[code]: (float(totals[code]) / 100, int(counts[code]))
+                for code in np.flatnonzero(counts).tolist()}
+        return DAILY_COLUMNS, latest_days(days, self.archived_daily, limit)
+
+    def monthly(self):
+        """(rows, window snapshot) in the shape of MonthlyRollup.refresh(),
+        from the totals the columns keep as rows are appended"""
+        with self.monthly_lock:
+            return self.monthly_totals.result()
+
+    def _decode(self, name, rows):
+        dictionary, count = self.dictionaries[name]
+        return dictionary.lookup(count)[getattr(self, name)[rows]]
+
+
+class CustomerColumns:
+    """All dashboard rows of one customer, as columns"""
+
+    def __init__(self):
+        self.length = 0
+        self.watermark = StagingWatermark()     # which staging rows are loaded
+        self.staging_id = Column(np.int64)
+        self.days = Column(np.int32)
+        self.cents = Column(np.int64)
+        self.category = Column(np.int32)
+        self.type = Column(np.int32)
+        self.currency = Column(np.int32)
+        self.description = Column(np.int32)
+        self.post_date = Column(np.int32)
+        self.dictionaries = {
+            name: Dictionary() for name in ('category', 'type', 'currency', 'description', 'post_date')
+        }
+        # days per post_date code, so each distinct string is parsed once
+        self.post_date_days = []
+        # /analytics/monthly totals: appended rows are grouped by append()
+        # and added (in REPORTING_CURRENCY) by merge_monthly()
+        self.monthly = MonthlyTotals()
+        self.monthly_lock = threading.Lock()
+        self.unmerged = []
+        # Totals of archived staging rows (analytics.archived_daily), None until loaded
+        self.archived_daily = None
+
+    def load_archived(self, cursor):
+        """Read the totals of archived staging rows, once (DictCursor, for FX rates)"""
+        self.archived_daily = archived_daily(cursor)
+        rows = archived_monthly(cursor)
+        with self.monthly_lock:
+            for row in rows:
+                self.monthly.merge(row)
+
+    def has_foreign_currency(self):
+        return any((name or REPORTING_CURRENCY).upper() != REPORTING_CURRENCY
+                   for name in self.dictionaries['currency'].values)
+
+    @property
+    def nbytes(self):
+        arrays = (self.staging_id, self.days, self.cents, self.category, self.type, self.currency,
+                  self.description, self.post_date)
+        return (sum(column.data.nbytes for column in arrays)
+                + sum(dictionary.nbytes for dictionary in self.dictionaries.values()))
+
+    def append(self, rows):
+        """Add DictCursor rows of LOAD_SQL"""
+        if not rows:
+            return
+        encode = {name: dictionary.encode for name, dictionary in self.dictionaries.items()}
+        post_dates = np.fromiter((encode['post_date'](row['post_date']) for row in rows), dtype=np.int32,
+                                 count=len(rows))
+        values = self.dictionaries['post_date'].values
+        while len(self.post_date_days) < len(values):
+            self.post_date_days.append(parse_post_date(values[len(self.post_date_days)]))
+
+        days = np.array(self.post_date_days, dtype=np.int32)[post_dates]
+        cents = np.rint(np.array([row['amount'] or 0.0 for row in rows], dtype=np.float64) * 100)
+        codes = {name: np.fromiter((encode[name](row[name]) for row in rows), dtype=np.int32, count=len(rows))
+                 for name in ('category', 'type', 'currency')}
+
+        self.staging_id.extend([row['staging_id'] for row in rows])
+        self.days.extend(days)
+        self.cents.extend(cents)
+        self.category.extend(codes['category'])
+        self.type.extend(codes['type'])
+        self.currency.extend(codes['currency'])
+        self.description.extend([encode['description'](row['description']) for row in rows])
+        self.post_date.extend(post_dates)
+        self._group_monthly(post_dates, days, cents, codes)
+        # Publish the new length last; snapshots taken meanwhile see the old rows
+        self.length += len(rows)
+
+    def _group_monthly(self, post_dates, days, cents, codes):
+        """Group a batch of new rows like MONTHLY_ROLLUP_SQL: by month,
+        category, LOWER(type) and currency, and by day for other currencies
+        (so fx.convert_rows() can use that day's rate)"""
+        present = np.array([bool(value) for value in self.dictionaries['post_date'].values], dtype=bool)
+        rows = np.flatnonzero(present[post_dates])      # WHERE post_date != ''
+        if not len(rows):
+            return
+        days = days[rows].astype(np.int64)
+        dated = days != NO_DATE
+        months = np.full(len(rows), -1, dtype=np.int64)
+        months[dated] = days[dated].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+        currencies = [(name or REPORTING_CURRENCY).upper() for name in self.dictionaries['currency'].values]
+        currency = codes['currency'][rows]
+        foreign = np.array([name != REPORTING_CURRENCY for name in currencies], dtype=bool)[currency]
+        rate_days = np.where(foreign & dated, days, NO_DATE)
+        type_names = sorted({lower(value) for value in self.dictionaries['type'].values}, key=lambda name: name or '')
+        type_index = {name: i for i, name in enumerate(type_names)}
+        lower_type = np.array([type_index[lower(value)] for value in self.dictionaries['type'].values],
+                              dtype=np.int64)[codes['type'][rows]]
+
+        keys = np.stack([months, codes['category'][rows], lower_type, currency, rate_days])
+        groups, inverse = np.unique(keys, axis=1, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        cents = cents[rows]
+        totals = np.bincount(inverse, weights=cents) / 100
+        abs_totals = np.bincount(inverse, weights=np.abs(cents)) / 100
+        counts = np.bincount(inverse)
+        first_days = np.full(groups.shape[1], np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_days, inverse, np.where(dated, days, np.iinfo(np.int64).max))
+
+        categories = self.dictionaries['category'].values
+        for (month, category, trans_type, currency_code, rate_day), total, abs_total, count, first_day in zip(
+                groups.T.tolist(), totals.tolist(), abs_totals.tolist(), counts.tolist(), first_days.tolist()):
+            self.unmerged.append({
+                'month_key': None if month < 0 else f"{1970 + month // 12:04d}-{month % 12 + 1:02d}",
+                'category': 'Uncategorized' if categories[category] is None else categories[category],
+                'type': type_names[trans_type],
+                'currency_code': currencies[currency_code],
+                'rate_date': None if rate_day == NO_DATE else datetime.date.fromordinal(EPOCH_ORDINAL + rate_day),
+                'total': total,
+                'abs_total': abs_total,
+                'count': count,
+                'first_day': (None if first_day == np.iinfo(np.int64).max
+                              else datetime.date.fromordinal(EPOCH_ORDINAL + first_day)),
+            })
+
+    def merge_monthly(self, cursor):
+        """Add the groups of appended rows to the monthly totals (DictCursor, for FX rates)"""
+        if not self.unmerged:
+            return
+        rows, self.unmerged = self.unmerged, []
+        convert_rows(cursor, rows, ('total', 'abs_total'))
+        with self.monthly_lock:
+            for row in rows:
+                self.monthly.merge(row)
+
+
+class ColumnStore:
+    """Per-customer CustomerColumns with an LRU memory budget"""
+
+    def __init__(self, budget_mb=COLUMN_STORE_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.customers = OrderedDict()      # customer_id -> CustomerColumns, oldest use first
+        self.oversized = set()              # customers that don't fit in the budget alone
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    def clear(self):
+        with self.lock:
+            self.customers.clear()
+            self.oversized.clear()
+
+    def snapshot(self, cursor, customer_id=DEFAULT_CUSTOMER):
+        """Bring the customer's columns up to date and return a Snapshot
+
+        Returns None if the customer's rows don't fit in the budget; the
+        caller queries the database instead. cursor must be a DictCursor of
+        a decimal_as_float connection.
+        """
+        with self.lock:
+            if customer_id in self.oversized:
+                return None
+            columns = self.customers.get(customer_id)
+            if columns is None:
+                columns = self.customers[customer_id] = CustomerColumns()
+            window = columns.watermark.window(cursor)
+            if window.max_id < columns.watermark.through and role_of(cursor) != REPLICA:
+                # The table was truncated and reloaded (a replica that is
+                # behind an earlier primary read just has nothing new)
+                columns = self.customers[customer_id] = CustomerColumns()
+                window = columns.watermark.window(cursor)
+
+            if columns.archived_daily is None:
+                columns.load_archived(cursor)
+            if window.condition:
+                cursor.execute(LOAD_SQL.format(window=window.condition), window.params)
+                while True:
+                    rows = cursor.fetchmany(FETCH_SIZE)
+                    if not rows:
+                        break
+                    columns.append(rows)
+                    if columns.nbytes > self.budget:
+                        del self.customers[customer_id]
+                        self.oversized.add(customer_id)
+                        print(f"Column store: customer {customer_id} needs more than COLUMN_STORE_MB, "
+                              f"reading it from the database")
+                        return None
+                columns.merge_monthly(cursor)
+            columns.watermark.advance(window)
+
+            self.customers.move_to_end(customer_id)
+            self._evict()
+            rates = rate_cache.get(cursor) if columns.has_foreign_currency() else None
+            return Snapshot(columns, rates)
+
+    def refresh(self, cursor, customer_id=DEFAULT_CUSTOMER):
+        """Append new rows for a customer that is loaded already (after an
+        upload); a customer that isn't stays unloaded until it is read"""
+        if customer_id in self.customers:
+            self.snapshot(cursor, customer_id)
+
+    def _evict(self):
+        """Drop cold customers until the store fits (the newest fits on its own, see snapshot)"""
+        total = sum(columns.nbytes for columns in self.customers.values())
+        while total > self.budget and len(self.customers) > 1:
+            _, columns = self.customers.popitem(last=False)
+            total -= columns.nbytes
+
+
+# Shared by all requests in this process
+column_store = ColumnStore()
@@ -0,0 +1,371 @@
+"""
+db.py - Shared data-access layer for the API and the scripts
+
+WHAT THIS DOES:
+  - Reads the MySQL settings once (environment / .env file):
+      MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB,
+      MYSQL_POOL_SIZE, MYSQL_MAX_OVERFLOW
+  - MYSQL_REPLICA_HOST (optional) is a read replica of that server; see
+    "Read replica" below
+  - REPORTING_CURRENCY is the currency the analytics add up in (fx.py)
+  - COLUMN_STORE_MB is the memory budget of the API's in-memory columns
+    (column_store.py)
+  - CORS_ORIGINS lists the browser origins (the dashboard) that may call
+    the API with cookies
+  - FINTRACK_BACKEND=duckdb switches connection() to the embedded DuckDB
+    file at DUCKDB_PATH (see embedded.py), no MySQL server needed
+  - Keeps one pooled SQLAlchemy engine per process, so requests reuse open
+    connections instead of reconnecting every time
+  - connection() hands out a pooled pymysql connection for cursor-style code
+    (cursor.execute / fetchall), returned to the pool on exit
+  - bulk_insert() / bulk_upsert() build the INSERT with SQLAlchemy Core from
+    the models in models.py, compile it ONCE per (table, columns, options),
+    and send rows in multi-row VALUES batches through the same connection,
+    so they share the caller's transaction
+
+  Anything that speeds up batching or pooling here applies to every endpoint
+  and script at once.
+
+READ REPLICA:
+  connection(read_only=True) is what the dashboard reads use. With
+  MYSQL_REPLICA_HOST set it connects to the replica instead of the primary,
+  unless:
+  - the replica is more than MYSQL_REPLICA_MAX_LAG seconds behind, its
+    replication threads are stopped, or it can't be reached (checked at
+    most every LAG_CHECK_INTERVAL seconds, not per request)
+  - last_write says the caller wrote something the replica may not have
+    applied yet (read-your-writes; the API keeps it in a cookie)
+  Everything else, including every write, goes to the primary. Without a
+  replica, or with FINTRACK_BACKEND=duckdb, read_only changes nothing.
+
+HOW TO USE:
+  from db import connection, bulk_insert
+  from models import TransactionStaging
+
+  with connection() as conn:
+      bulk_insert(conn, TransactionStaging.__table__, rows)
+      conn.commit()
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pymysql
+from dotenv import load_dotenv
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import conversions
+from pymysql.cursors import DictCursor
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import URL
+
+# Load environment variables from .env file
+load_dotenv()
+
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
+MYSQL_USER = os.getenv("MYSQL_USER", "root")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
+MYSQL_DB = os.getenv("MYSQL_DB", "fintrack")
+
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("MYSQL_MAX_OVERFLOW", "10"))
+POOL_RECYCLE = 3600          # seconds; stay under MySQL's wait_timeout
+
+# Optional read replica for the analytics reads; user and password default
+# to the primary's
+REPLICA_HOST = os.getenv("MYSQL_REPLICA_HOST", "")
+REPLICA_PORT = int(os.getenv("MYSQL_REPLICA_PORT", str(MYSQL_PORT)))
+REPLICA_USER = os.getenv("MYSQL_REPLICA_USER", MYSQL_USER)
+REPLICA_PASSWORD = os.getenv("MYSQL_REPLICA_PASSWORD", MYSQL_PASSWORD)
+REPLICA_MAX_LAG = float(os.getenv("MYSQL_REPLICA_MAX_LAG", "5"))    # seconds
+LAG_CHECK_INTERVAL = 2.0     # seconds between replica status checks
+REPLICA_CONNECT_TIMEOUT = 2  # seconds; a dead replica must not stall reads for long
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+# "mysql" (default) or "duckdb" (embedded, see embedded.py)
+DB_BACKEND = os.getenv("FINTRACK_BACKEND", "mysql").lower()
+DUCKDB_PATH = os.getenv("DUCKDB_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fintrack.duckdb"
+)
+
+# Memory for the API's in-process columnar copy of the data (column_store.py);
+# 0 turns it off and the dashboard endpoints query the database every time
+COLUMN_STORE_MB = int(os.getenv("COLUMN_STORE_MB", "256"))
+
+# Currency the analytics are reported in; rows without a currency are in it too
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "USD").upper()
+
+# Origins allowed to call the API from a browser, comma-separated. The
+# read-your-writes cookie needs credentialed requests, which can't use "*"
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
+    if origin.strip()
+]
+
+# Rows per multi-row INSERT
+BULK_BATCH_SIZE = 1000
+
+# pymysql converters that decode DECIMAL columns straight to float
+# (used by the API, where values go to JSON anyway)
+FAST_CONVERSIONS = conversions.copy()
+FAST_CONVERSIONS[FIELD_TYPE.DECIMAL] = float
+FAST_CONVERSIONS[FIELD_TYPE.NEWDECIMAL] = float
+
+# One engine per option set, created on first use in this process
+_engines = {}
+
+
+def database_url(database=MYSQL_DB, role=PRIMARY):
+    if role == REPLICA:
+        username, password, host, port = REPLICA_USER, REPLICA_PASSWORD, REPLICA_HOST, REPLICA_PORT
+    else:
+        username, password, host, port = MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT
+    return URL.create(
+        "mysql+pymysql",
+        username=username,
+        password=password,
+        host=host,
+        port=port,
+        database=database,
+        query={"charset": "utf8mb4"},
+    )
+
+
+def get_engine(decimal_as_float=False, role=PRIMARY):
+    """The shared, pooled engine.
+
+    decimal_as_float=True gives connections that return DECIMAL as float
+    (a separate pool, since converters are fixed per connection).
+    role=REPLICA is the read replica's pool (needs MYSQL_REPLICA_HOST).
+    """
+    engine = _engines.get((decimal_as_float, role))
+    if engine is None:
+        connect_args = {"conv": FAST_CONVERSIONS} if decimal_as_float else {}
+        if role == REPLICA:
+            connect_args["connect_timeout"] = REPLICA_CONNECT_TIMEOUT
+        engine = _engines[(decimal_as_float, role)] = create_engine(
+            database_url(role=role),
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+
+        @event.listens_for(engine, "connect")
+        def tag_role(dbapi_connection, connection_record):
+            # role_of() reads this back from a connection or cursor
+            dbapi_connection.fintrack_role = role
+    return engine
+
+
+def dispose_engines():
+    """Drop pooled connections (call in a child process after fork)"""
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+    if DB_BACKEND == "duckdb":
+        import embedded
+        embedded.close_databases()
+
+
+def dialect_of(conn_or_cursor):
+    """'mysql' or 'duckdb', for the few queries that differ between them"""
+    return getattr(conn_or_cursor, "dialect", "mysql")
+
+
+def role_of(conn_or_cursor):
+    """PRIMARY or REPLICA: which server a connection (or its cursor) reads from"""
+    target = getattr(conn_or_cursor, "connection", conn_or_cursor)
+    return getattr(target, "fintrack_role", PRIMARY)
+
+
+def table_exists(cursor, table):
+    """Whether a table exists, checked without querying it (on DuckDB a
+    failed query aborts the whole transaction)"""
+    schema = "main" if dialect_of(cursor) == "duckdb" else MYSQL_DB
+    cursor.execute("""
+        SELECT COUNT(*) as found FROM information_schema.tables
+        WHERE table_schema = %s AND table_name = %s
+    """, (schema, table))
+    row = cursor.fetchone()
+    return bool(row["found"] if isinstance(row, dict) else row[0])
+
+
+class ReplicaMonitor:
+    """How far behind the replica is, re-checked every LAG_CHECK_INTERVAL"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = None      # time.monotonic() of the last check
+        self.lag = None             # seconds behind; None = don't read from it
+        self.caught_up_to = 0.0     # time.time() before which every write is on the replica
+        self.problem = None         # last warning printed, so an outage is logged once
+
+    def status(self):
+        """(lag, caught_up_to); lag is None while the replica is unusable"""
+        with self.lock:
+            if self.checked_at is None or time.monotonic() - self.checked_at >= LAG_CHECK_INTERVAL:
+                checked_wall = time.time()
+                self.lag, problem = self._check()
+                if problem is not None and problem != self.problem:
+                    print(f"Replica warning: {problem}, reading from the primary")
+                self.problem = problem
+                self.checked_at = time.monotonic()
+                # Seconds_Behind_Source counts whole seconds, so allow one more
+                self.caught_up_to = checked_wall - self.lag - 1 if self.lag is not None else 0.0
+            return self.lag, self.caught_up_to
+
+    def mark_down(self):
+        """The replica failed a connection; use the primary until the next check"""
+        with self.lock:
+            self.lag = None
+            self.checked_at = time.monotonic()
+
+    def _check(self):
+        try:
+            conn = get_engine(role=REPLICA).raw_connection()
+            try:
+                with conn.cursor(DictCursor) as cursor:
+                    try:
+                        cursor.execute("SHOW REPLICA STATUS")
+                    except pymysql.err.ProgrammingError:
+                        cursor.execute("SHOW SLAVE STATUS")     # MySQL before 8.0.22
+                    status = cursor.fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            return None, f"status check failed ({e})"
+
+        if status is None:
+            return None, f"{REPLICA_HOST}:{REPLICA_PORT} is not replicating"
+        io_running = status.get("Replica_IO_Running", status.get("Slave_IO_Running"))
+        sql_running = status.get("Replica_SQL_Running", status.get("Slave_SQL_Running"))
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        if io_running != "Yes" or sql_running != "Yes" or lag is None:
+            return None, "replication is stopped"
+        if lag > REPLICA_MAX_LAG:
+            return float(lag), f"{lag}s behind"
+        return float(lag), None
+
+
+# Shared by all requests in this process
+replica_monitor = ReplicaMonitor()
+
+
+def use_replica(last_write=None):
+    """True if a read-only request may go to the replica.
+
+    last_write: time.time() of the caller's most recent write, if known.
+    """
+    if not REPLICA_HOST or DB_BACKEND == "duckdb":
+        return False
+    lag, caught_up_to = replica_monitor.status()
+    if lag is None or lag > REPLICA_MAX_LAG:
+        return False
+    return last_write is None or last_write < caught_up_to
+
+
+@contextmanager
+def connection(decimal_as_float=False, read_only=False, last_write=None):
+    """A pooled pymysql connection (or an embedded DuckDB one, depending on
+    FINTRACK_BACKEND); uncommitted work is rolled back on return
+
+    read_only=True may hand out a replica connection (see READ REPLICA
+    above); last_write is the caller's last write time for read-your-writes.
+    """
+    conn = None
+    if DB_BACKEND == "duckdb":
+        import embedded
+        conn = embedded.connect(DUCKDB_PATH, decimal_as_float)
+    elif read_only and use_replica(last_write):
+        try:
+            conn = get_engine(decimal_as_float, REPLICA).raw_connection()
+        except Exception as e:
+            print(f"Replica warning: connect failed, reading from the primary ({e})")
+            replica_monitor.mark_down()
+    if conn is None:
+        conn = get_engine(decimal_as_float).raw_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def server_connection():
+    """Unpooled connection without a default database (for CREATE DATABASE)"""
+    return pymysql.connect(
+        host=MYSQL_HOST,
+        port=MYSQL_PORT,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        charset='utf8mb4'
+    )
+
+
+# ============================================================================
+# Bulk writes through SQLAlchemy Core
+# ============================================================================
+
+@lru_cache(maxsize=128)
+def _compiled_insert(table, columns, ignore=False, update_columns=None):
+    """Compile INSERT [IGNORE] ... VALUES (...) [ON DUPLICATE KEY UPDATE ...] once.
+
+    The SQL uses named %(column)s parameters, so dict rows are passed as-is;
+    pymysql's executemany rewrites it into multi-row VALUES batches.
+    """
+    stmt = mysql_insert(table)
+    if ignore:
+        stmt = stmt.prefix_with("IGNORE")
+    if update_columns:
+        stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in update_columns})
+    return str(stmt.compile(dialect=get_engine().dialect, column_keys=list(columns)))
+
+
+def _execute_bulk(conn, table, rows, batch_size, ignore=False, update_columns=None):
+    rows = list(rows)
+    if not rows:
+        return 0
+    columns = tuple(rows[0].keys())
+    if dialect_of(conn) == "duckdb":
+        import embedded
+        return embedded.insert_columns(conn, table.name, columns, [tuple(row.values()) for row in rows],
+                                       ignore, update_columns)
+    sql = _compiled_insert(table, columns, ignore, update_columns)
+    affected = 0
+    with conn.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            affected += cursor.executemany(sql, rows[start:start + batch_size])
+    return affected
+
+
+def bulk_insert(conn, table, rows, batch_size=BULK_BATCH_SIZE, ignore=False):
+    """Insert dict rows (all with the same keys) in multi-row batches.
+
+    ignore=True uses INSERT IGNORE (rows whose key already exists are skipped).
+    Returns the rows inserted. Does not commit.
+    """
+    return _execute_bulk(conn, table, rows, batch_size, ignore=ignore)
+
+
+def bulk_upsert(conn, table, rows, update_columns=None, batch_size=BULK_BATCH_SIZE):
+    """INSERT ... ON DUPLICATE KEY UPDATE for dict rows.
+
+    update_columns defaults to every non-primary-key column in the rows.
+    Returns the affected row count: 1 per inserted row, plus per existing
+    row 1 on DuckDB, 2 on MySQL (0 if nothing changed). Does not commit.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    if update_columns is None:
+        keys = {c.name for c in table.primary_key.columns}
+        update_columns = [name for name in rows[0].keys() if name not in keys]
+    return _execute_bulk(conn, table, rows, batch_size, update_columns=tuple(update_columns))
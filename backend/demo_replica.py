@@ -0,0 +1,205 @@
+"""
+demo_replica.py - Show read-your-writes and the lag fallback on a real replica
+
+WHAT THIS DOES:
+  Needs two MySQL servers: MYSQL_HOST and a replica of it set up as in
+  "Read Replica" of MYSQL_SETUP_GUIDE.md (MYSQL_REPLICA_HOST / _PORT in
+  .env). The replica user must be allowed to run STOP/START REPLICA and
+  CHANGE REPLICATION SOURCE (REPLICATION_SLAVE_ADMIN), because the demo
+  delays replication on purpose with SOURCE_DELAY.
+
+  Your real database is never touched: everything runs in the
+  fintrack_replica_demo database, which is dropped at the end. The column
+  store is turned off so every read really goes to the server it is routed to.
+
+  Through FastAPI's TestClient it checks:
+  1. READ-YOUR-WRITES: with replication a little behind (but within
+     MYSQL_REPLICA_MAX_LAG), a client that uploads a row sees it in
+     /transactions right away (its fintrack_last_write cookie keeps it on
+     the primary), while a client without the cookie reads from the
+     replica, which doesn't have the row yet. Both end up on the replica
+     once it has caught up.
+  2. LAG FALLBACK: with replication further behind than
+     MYSQL_REPLICA_MAX_LAG, every client reads from the primary.
+  3. STOPPED REPLICATION: after STOP REPLICA SQL_THREAD every client reads
+     from the primary; after START REPLICA SQL_THREAD the replica is used again.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/demo_replica.py
+
+EXPECTED OUTPUT:
+  One ✓ line per check (✗ and exit code 1 if one fails). Takes about half a
+  minute with the default MYSQL_REPLICA_MAX_LAG of 5 seconds.
+"""
+
+import os
+import sys
+import time
+import uuid
+
+# Point db.py at a scratch database and skip the column store before it reads the settings
+DEMO_DB = "fintrack_replica_demo"
+os.environ["MYSQL_DB"] = DEMO_DB
+os.environ["FINTRACK_BACKEND"] = "mysql"
+os.environ["COLUMN_STORE_MB"] = "0"
+
+import pymysql  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api_upload  # noqa: E402
+import db  # noqa: E402
+import pipeline  # noqa: E402
+
+failures = 0
+
+
+def check(label, ok):
+    global failures
+    print(f"  {'✓' if ok else '✗'} {label}")
+    if not ok:
+        failures += 1
+
+
+def wait_for(condition, timeout):
+    """True once condition() holds, False if it didn't within timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.5)
+    return condition()
+
+
+def replica_admin(statement, before_8_0_22):
+    """Run an admin statement on the replica (older spelling as a fallback)"""
+    conn = pymysql.connect(host=db.REPLICA_HOST, port=db.REPLICA_PORT, user=db.REPLICA_USER,
+                           password=db.REPLICA_PASSWORD, autocommit=True)
+    try:
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute(statement)
+            except pymysql.err.ProgrammingError:
+                cursor.execute(before_8_0_22)
+    finally:
+        conn.close()
+
+
+def stop_sql_thread():
+    replica_admin("STOP REPLICA SQL_THREAD", "STOP SLAVE SQL_THREAD")
+
+
+def start_sql_thread():
+    replica_admin("START REPLICA SQL_THREAD", "START SLAVE SQL_THREAD")
+
+
+def set_delay(seconds):
+    """Apply changes on the replica `seconds` after they were made on the primary"""
+    stop_sql_thread()
+    replica_admin(f"CHANGE REPLICATION SOURCE TO SOURCE_DELAY = {int(seconds)}",
+                  f"CHANGE MASTER TO MASTER_DELAY = {int(seconds)}")
+    start_sql_thread()
+
+
+def reads_from(client):
+    return client.get("/database/status").json()["readsFrom"]
+
+
+def upload(client):
+    """Upload one transaction with a unique description and return it"""
+    marker = f"DEMO {uuid.uuid4().hex[:12]}"
+    csv = ("Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n"
+           f"01/02/2026,01/02/2026,{marker},Demo,Sale,-1.00,\n")
+    response = client.post("/upload", files={"file": ("demo.csv", csv)})
+    response.raise_for_status()
+    return marker
+
+
+def sees(client, marker):
+    return any(row["description"] == marker for row in client.get("/transactions").json())
+
+
+def on_replica(table):
+    conn = pymysql.connect(host=db.REPLICA_HOST, port=db.REPLICA_PORT, user=db.REPLICA_USER,
+                           password=db.REPLICA_PASSWORD)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SHOW TABLES FROM {DEMO_DB} LIKE %s", (table,))
+            return cursor.fetchone() is not None
+    except pymysql.err.OperationalError:
+        return False    # the database hasn't reached the replica yet
+    finally:
+        conn.close()
+
+
+def demo_read_your_writes():
+    print("\n1. Read-your-writes")
+    delay = max(1, int(db.REPLICA_MAX_LAG // 2))
+    set_delay(delay)
+    check("the replica is used while it is idle",
+          wait_for(lambda: reads_from(TestClient(api_upload.app)) == "replica", 10))
+
+    writer = TestClient(api_upload.app)
+    reader = TestClient(api_upload.app)
+    marker = upload(writer)
+    check("the uploading client reads from the primary", reads_from(writer) == "primary")
+    check("... and sees its new row at once", sees(writer, marker))
+    check("a client without the cookie reads from the replica", reads_from(reader) == "replica")
+    check(f"... which doesn't have the row yet ({delay}s replication delay)", not sees(reader, marker))
+    check("the row reaches the replica", wait_for(lambda: sees(reader, marker), delay + 10))
+    check("the uploading client goes back to the replica once it caught up",
+          wait_for(lambda: reads_from(writer) == "replica", delay + db.LAG_CHECK_INTERVAL + 10))
+
+
+def demo_lag_fallback():
+    print("\n2. Lag fallback")
+    delay = int(db.REPLICA_MAX_LAG * 2) + 2
+    set_delay(delay)
+    upload(TestClient(api_upload.app))
+    reader = TestClient(api_upload.app)
+    check(f"reads go to the primary once the replica is more than {db.REPLICA_MAX_LAG:g}s behind",
+          wait_for(lambda: reads_from(reader) == "primary", delay + db.LAG_CHECK_INTERVAL + 5))
+    set_delay(0)
+    check("... and back to the replica when it has caught up",
+          wait_for(lambda: reads_from(reader) == "replica", db.LAG_CHECK_INTERVAL + 10))
+
+
+def demo_stopped_replication():
+    print("\n3. Stopped replication")
+    reader = TestClient(api_upload.app)
+    stop_sql_thread()
+    check("reads go to the primary while replication is stopped",
+          wait_for(lambda: reads_from(reader) == "primary", db.LAG_CHECK_INTERVAL + 5))
+    start_sql_thread()
+    check("... and back to the replica when it runs again",
+          wait_for(lambda: reads_from(reader) == "replica", db.LAG_CHECK_INTERVAL + 10))
+
+
+def main():
+    if not db.REPLICA_HOST:
+        print("✗ MYSQL_REPLICA_HOST is not set; see \"Read Replica\" in MYSQL_SETUP_GUIDE.md")
+        return 1
+
+    print(f"Primary {db.MYSQL_HOST}:{db.MYSQL_PORT}, replica {db.REPLICA_HOST}:{db.REPLICA_PORT}, "
+          f"max lag {db.REPLICA_MAX_LAG:g}s, database {DEMO_DB}")
+    pipeline.create_schema()
+    try:
+        if not wait_for(lambda: on_replica("transactions_staging"), 30):
+            print(f"✗ {DEMO_DB} did not reach the replica; is it replicating from {db.MYSQL_HOST}?")
+            return 1
+        demo_read_your_writes()
+        demo_lag_fallback()
+        demo_stopped_replication()
+    finally:
+        set_delay(0)
+        db.dispose_engines()
+        server = db.server_connection()
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {DEMO_DB}")
+        server.close()
+
+    print(f"\n{'✓ All checks passed' if failures == 0 else f'✗ {failures} check(s) failed'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+embedded.py - Embedded DuckDB backend (no MySQL server needed)
+
+WHAT THIS DOES:
+  Lets the API and the scripts run against a single DuckDB file instead of
+  MySQL, so single-user installs and benchmarks need no database server at
+  all. DuckDB is a columnar engine, which suits the analytics endpoints
+  (they scan and group the whole staging table); how it compares with
+  MySQL on your data is what bench_backends.py --mysql measures.
+
+  - create_schema() builds the tables from the models in models.py and
+    fills a new category_groups table from
+    DatabaseMySQL/05_category_groups.sql
+  - connect() returns a connection that behaves like the pymysql
+    connections the rest of the code uses: conn.cursor(DictCursor),
+    %s / %(name)s parameters, commit() / rollback(), cursor.rowcount
+  - translate() rewrites the few MySQL-only bits of SQL the code uses:
+      INSERT IGNORE             -> INSERT OR IGNORE
+      ON DUPLICATE KEY UPDATE   -> ON CONFLICT DO UPDATE SET ... EXCLUDED
+      CAST(...)                 -> TRY_CAST(...) (MySQL casts never fail)
+      AS DECIMAL(p, s)          -> AS DOUBLE on decimal_as_float connections
+    and STR_TO_DATE / DATE_FORMAT are defined as DuckDB macros
+  Code that needs something DuckDB can't emulate (FULLTEXT search,
+  partitions) checks db.dialect_of(cursor) == 'duckdb'.
+
+  Enable it with FINTRACK_BACKEND=duckdb (see db.py); copy an existing
+  MySQL database over with sync_embedded.py.
+"""
+
+import csv
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+
+import duckdb
+from sqlalchemy.dialects import postgresql
+
+from models import Base
+
+DIALECT = "duckdb"
+
+# Seed rows for category_groups (the same ones a MySQL install gets)
+CATEGORY_GROUPS_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "DatabaseMySQL", "05_category_groups.sql")
+
+# MySQL functions used by the API, as DuckDB macros (same format codes)
+MYSQL_MACROS = (
+    "CREATE MACRO IF NOT EXISTS str_to_date(s, f) AS CAST(try_strptime(s, f) AS DATE)",
+    "CREATE MACRO IF NOT EXISTS date_format(d, f) AS strftime(d, f)",
+)
+
+PARAM = re.compile(r"%\((\w+)\)s|%s|%%")
+ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\s+(.*)$", re.IGNORECASE | re.DOTALL)
+ASSIGNMENT = re.compile(r"(\w+)\s*=\s*(?:VALUES\((\w+)\)|(\w+))\s*(?:,|$)")
+INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE)
+CAST = re.compile(r"(?<![\w.])CAST\(", re.IGNORECASE)
+DECIMAL_CAST = re.compile(r"\bAS\s+DECIMAL\s*\(\s*\d+\s*,\s*\d+\s*\)", re.IGNORECASE)
+# DuckDB compares strings byte for byte already
+BINARY_COLLATE = re.compile(r"\s+COLLATE\s+utf8mb4_bin\b", re.IGNORECASE)
+DML = ("INSERT", "UPDATE", "DELETE")
+# How NULL is written in the CSV batches of insert_columns
+NULL = "\\N"
+
+# One database instance per file per process; connections are cursors of it
+_databases = {}
+_lock = threading.Lock()
+
+
+def _on_conflict(match):
+    assignments = []
+    no_op = True
+    for column, values_of, other in ASSIGNMENT.findall(match.group(1).strip().rstrip(";")):
+        if values_of:
+            assignments.append(f"{column} = EXCLUDED.{values_of}")
+            no_op = False
+        elif other != column:
+            assignments.append(f"{column} = {other}")
+            no_op = False
+    # "ON DUPLICATE KEY UPDATE x = x" is MySQL's way of ignoring the row
+    if no_op:
+        return "ON CONFLICT DO NOTHING"
+    return "ON CONFLICT DO UPDATE SET " + ", ".join(assignments)
+
+
+@lru_cache(maxsize=512)
+def translate(sql, has_params, decimal_as_float=False):
+    """MySQL/pymysql SQL -> DuckDB SQL (cached, the same statements repeat)
+
+    decimal_as_float turns CAST(... AS DECIMAL(p, s)) into DOUBLE, so DuckDB
+    hands back floats instead of building Decimal objects first.
+    """
+    sql = INSERT_IGNORE.sub("INSERT OR IGNORE", sql)
+    sql = ON_DUPLICATE.sub(_on_conflict, sql)
+    sql = CAST.sub("TRY_CAST(", sql)
+    sql = BINARY_COLLATE.sub("", sql)
+    if decimal_as_float:
+        sql = DECIMAL_CAST.sub("AS DOUBLE", sql)
+    if has_params:
+        # pymysql only %-formats the query when parameters are passed
+        sql = PARAM.sub(lambda m: f"${m.group(1)}" if m.group(1) else ("?" if m.group(0) == "%s" else "%"), sql)
+    return sql
+
+
+class EmbeddedCursor:
+    """DB-API cursor with pymysql's behaviour (tuple or dict rows)"""
+
+    dialect = DIALECT
+
+    def __init__(self, connection, dict_rows=False):
+        self.connection = connection
+        self.dict_rows = dict_rows
+        self.description = None
+        self.rowcount = -1
+        self._cursor = connection._conn.cursor()
+        self._columns = None
+        self._decimal_columns = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+    def _params(self, args):
+        if isinstance(args, dict):
+            return args
+        return list(args)
+
+    def _after_execute(self, sql):
+        description = self._cursor.description
+        if sql.lstrip()[:6].upper() in DML and description and description[0][0] == "Count":
+            self.rowcount = self._cursor.fetchone()[0]
+            self.description = None
+            self._columns = None
+            return self.rowcount
+        self.description = description
+        self.rowcount = -1
+        self._columns = [d[0] for d in description] if description else None
+        self._decimal_columns = ()
+        if description and self.connection.decimal_as_float:
+            self._decimal_columns = tuple(
+                i for i, d in enumerate(description) if str(d[1]).startswith("DECIMAL")
+            )
+        return self.rowcount
+
+    def execute(self, sql, args=None):
+        query = translate(sql, args is not None, self.connection.decimal_as_float)
+        if args is None:
+            self._cursor.execute(query)
+        else:
+            self._cursor.execute(query, self._params(args))
+        return self._after_execute(query)
+
+    def executemany(self, sql, seq_of_args):
+        """Run sql for every parameter set; rowcount is the number of sets"""
+        seq_of_args = [self._params(args) for args in seq_of_args]
+        if not seq_of_args:
+            return 0
+        self._cursor.executemany(translate(sql, True), seq_of_args)
+        self.description = None
+        self.rowcount = len(seq_of_args)
+        return self.rowcount
+
+    def _convert(self, rows):
+        if self._decimal_columns:
+            indexes = self._decimal_columns
+            rows = [
+                tuple(float(v) if i in indexes and v is not None else v for i, v in enumerate(row))
+                for row in rows
+            ]
+        if self.dict_rows:
+            columns = self._columns
+            rows = [dict(zip(columns, row)) for row in rows]
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._convert([row])[0]
+
+    def fetchmany(self, size=1):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+
+class EmbeddedConnection:
+    """pymysql-style connection: every statement runs in a transaction
+    that lasts until commit() or rollback(), like autocommit=False"""
+
+    dialect = DIALECT
+
+    def __init__(self, database, decimal_as_float=False):
+        self._conn = database.cursor()
+        self.decimal_as_float = decimal_as_float
+        self._conn.begin()
+
+    def cursor(self, cursorclass=None):
+        dict_rows = cursorclass is not None and "Dict" in cursorclass.__name__
+        return EmbeddedCursor(self, dict_rows)
+
+    def commit(self):
+        self._conn.commit()
+        self._conn.begin()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._conn.begin()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.rollback()
+            finally:
+                self._conn.close()
+                self._conn = None
+
+
+def open_database(path):
+    """The shared DuckDB instance for path (opened once per process)"""
+    with _lock:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = duckdb.connect(path)
+            for macro in MYSQL_MACROS:
+                database.execute(macro)
+        return database
+
+
+def close_databases():
+    """Close every open database (call in a child process after fork)"""
+    with _lock:
+        for database in _databases.values():
+            database.close()
+        _databases.clear()
+
+
+def connect(path, decimal_as_float=False):
+    return EmbeddedConnection(open_database(path), decimal_as_float)
+
+
+# ============================================================================
+# Schema
+# ============================================================================
+
+def _column_ddl(table, column):
+    parts = [column.name, column.type.compile(dialect=postgresql.dialect())]
+    if column is table.autoincrement_column:
+        parts.append(f"DEFAULT nextval('seq_{table.name}')")
+    elif column.server_default is not None:
+        default = str(column.server_default.arg.text)
+        # DuckDB has no ON UPDATE; the timestamp keeps its insert time
+        parts.append("DEFAULT " + re.sub(r"\s+ON UPDATE .*$", "", default, flags=re.IGNORECASE))
+    if not column.nullable and not column.primary_key:
+        parts.append("NOT NULL")
+    if column.unique:
+        parts.append("UNIQUE")
+    return " ".join(parts)
+
+
+def schema_ddl(start_ids=None):
+    """CREATE statements for every model table.
+
+    Only primary keys and unique constraints are kept: DuckDB scans columns
+    instead of using secondary indexes, and foreign keys would only slow
+    down loading. start_ids maps table name -> first auto-increment id.
+    """
+    start_ids = start_ids or {}
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if table.autoincrement_column is not None:
+            statements.append(
+                f"CREATE SEQUENCE IF NOT EXISTS seq_{table.name} START {start_ids.get(table.name, 1)}"
+            )
+        definitions = [_column_ddl(table, column) for column in table.columns]
+        definitions.append(f"PRIMARY KEY ({', '.join(c.name for c in table.primary_key.columns)})")
+        for index in table.indexes:
+            if index.unique:
+                definitions.append(f"UNIQUE ({', '.join(c.name for c in index.columns)})")
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {table.name} (\n    " + ",\n    ".join(definitions) + "\n)"
+        )
+    return statements
+
+
+def seed_category_groups(conn):
+    """Run the seed INSERT of 05_category_groups.sql"""
+    with open(CATEGORY_GROUPS_SQL, 'r', encoding='utf-8') as f:
+        match = re.search(r"^INSERT INTO category_groups.*?;", f.read(), re.MULTILINE | re.DOTALL)
+    with conn.cursor() as cursor:
+        cursor.execute(match.group(0).rstrip(";"))
+
+
+def create_schema(conn, start_ids=None, seed=True):
+    """Create missing tables, and add columns that models.py gained since an
+    existing file was created (e.g. currency). A category_groups table that
+    is created here is seeded unless seed=False. Does not commit."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT table_name FROM information_schema.tables")
+        existing_tables = {row[0] for row in cursor.fetchall()}
+        for statement in schema_ddl(start_ids):
+            cursor.execute(statement)
+        cursor.execute("SELECT table_name, column_name FROM information_schema.columns")
+        existing = set(cursor.fetchall())
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if (table.name, column.name) not in existing:
+                    # DuckDB can't add constraints with a column: type and default only
+                    ddl = _column_ddl(table, column).replace(" NOT NULL", "").replace(" UNIQUE", "")
+                    cursor.execute(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+    if seed and "category_groups" not in existing_tables:
+        seed_category_groups(conn)
+
+
+def insert_columns(conn, table, columns, rows, ignore=False, update_columns=None):
+    """Insert rows (tuples in column order) with one INSERT ... SELECT.
+
+    The batch goes through a temporary CSV file that DuckDB reads with its
+    parallel CSV reader: several times faster than executemany (one bind
+    per row) or scanning Python objects. ignore / update_columns work like
+    db.bulk_insert / db.bulk_upsert. Does not commit.
+    """
+    if not rows:
+        return 0
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([NULL if value is None else value for value in row] for row in rows)
+    try:
+        sql = (f"INSERT {'OR IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) "
+               f"SELECT * FROM read_csv(?, header = false, all_varchar = true, nullstr = '{NULL}', "
+               f"quote = '\"', escape = '\"', new_line = '\\r\\n')")
+        if update_columns:
+            sql += " ON CONFLICT DO UPDATE SET " + ", ".join(f"{name} = EXCLUDED.{name}" for name in update_columns)
+        # DuckDB reports the rows actually written (not the ignored ones)
+        inserted = conn._conn.execute(sql, [f.name]).fetchone()[0]
+    finally:
+        os.remove(f.name)
+    return inserted
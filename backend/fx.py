@@ -0,0 +1,266 @@
+"""
+fx.py - Exchange rates: load rate files, convert amounts in batches
+
+WHAT THIS DOES:
+  Keeps the analytics right when an account holds more than one currency
+  (transactions_staging.currency, DatabaseMySQL/11_multi_currency.sql):
+  - main() loads rate files into fx_rates, one row per (day, currency),
+    stored as units of that currency per 1 USD so any two currencies can
+    be converted through USD. Two layouts are read:
+        date,currency,rate[,base]     one rate per line
+        Date,USD,JPY,GBP,...          one day per line (the ECB's eurofxref-hist.csv)
+    Rates are quoted against --base (or the base column) and re-based to
+    USD with that day's USD rate.
+  - rate_cache reads fx_rates once per API process into a dense per-day
+    table (weekends and holidays carry the last known rate forward), so
+    finding the rate for a day is an array index, not a query
+  - RateTable.factors() converts a whole batch of one currency at once;
+    analytics group rows by currency and call it once per currency, after
+    aggregating. Rows already in the reporting currency are never touched,
+    so single-currency accounts pay nothing.
+
+  A currency with no rates at all is left unconverted (with a warning in
+  the API log) rather than failing the dashboard.
+
+HOW TO RUN:
+  .\\.venv\\Scripts\\python.exe backend/fx.py rates/eurofxref-hist.csv --base EUR
+  .\\.venv\\Scripts\\python.exe backend/fx.py "rates/*.csv"
+
+  Then POST /analytics/category-groups/reload (or restart the API) so the
+  API picks up the new rates.
+"""
+
+import argparse
+import csv
+import datetime
+import glob
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from db import REPORTING_CURRENCY, bulk_upsert, connection
+from models import FxRate
+
+# Every stored rate is "units of currency per 1 PIVOT"
+PIVOT = "USD"
+
+# Day numbers (days since 1970) are how the analytics pass dates around
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+NO_DATE = np.iinfo(np.int32).min
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+# Rates per bulk_upsert batch
+LOAD_BATCH = 5000
+
+
+def day_number(value):
+    """date -> days since 1970 (NO_DATE for None)"""
+    return NO_DATE if value is None else value.toordinal() - EPOCH_ORDINAL
+
+
+def parse_date(text):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_rate(text):
+    """'1.0823' -> 1.0823; blanks and 'N/A' (ECB holidays) -> None"""
+    try:
+        rate = float(text)
+    except (TypeError, ValueError):
+        return None
+    return rate if rate > 0 else None
+
+
+# ============================================================================
+# Rate files
+# ============================================================================
+
+def read_rates_file(path, base=PIVOT):
+    """Rate file -> {base: {date: {currency: units per 1 base}}}"""
+    quotes = defaultdict(lambda: defaultdict(dict))
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        columns = [name.lower() for name in header]
+        if "currency" in columns and "rate" in columns:
+            date_col, currency_col, rate_col = columns.index("date"), columns.index("currency"), columns.index("rate")
+            base_col = columns.index("base") if "base" in columns else None
+            for row in reader:
+                if not row:
+                    continue
+                day, rate = parse_date(row[date_col]), parse_rate(row[rate_col])
+                if day is None or rate is None:
+                    continue
+                row_base = row[base_col].strip().upper() if base_col is not None else base
+                quotes[row_base][day][row[currency_col].strip().upper()] = rate
+        else:
+            currencies = [name.upper() for name in header[1:]]
+            for row in reader:
+                day = parse_date(row[0]) if row else None
+                if day is None:
+                    continue
+                for currency, value in zip(currencies, row[1:]):
+                    rate = parse_rate(value)
+                    if currency and rate is not None:
+                        quotes[base][day][currency] = rate
+    return quotes
+
+
+def to_pivot(quotes):
+    """{base: {date: {currency: per base}}} -> ([(date, currency, per PIVOT)], days skipped)
+
+    A day is skipped if its quotes don't include PIVOT (nothing to re-base with).
+    """
+    rates = []
+    skipped = 0
+    for base, by_day in quotes.items():
+        for day, day_rates in by_day.items():
+            day_rates = {**day_rates, base: 1.0}
+            pivot = day_rates.get(PIVOT)
+            if not pivot:
+                skipped += 1
+                continue
+            rates.extend((day, currency, rate / pivot) for currency, rate in day_rates.items())
+    return rates, skipped
+
+
+def load_rates(conn, path, base=PIVOT):
+    """Upsert one rate file into fx_rates. Does not commit. Returns (rates, days skipped)."""
+    rates, skipped = to_pivot(read_rates_file(path, base))
+    source = os.path.basename(path)[-255:]
+    rows = [
+        {"rate_date": day, "currency": currency, "rate": round(rate, 8), "source": source}
+        for day, currency, rate in rates
+    ]
+    for start in range(0, len(rows), LOAD_BATCH):
+        bulk_upsert(conn, FxRate.__table__, rows[start:start + LOAD_BATCH], update_columns=["rate", "source"])
+    return len(rows), skipped
+
+
+# ============================================================================
+# Conversion
+# ============================================================================
+
+class RateTable:
+    """fx_rates as one dense 'units per USD' array per currency, indexed by day"""
+
+    def __init__(self, rows):
+        """rows: (rate_date, currency, rate) sorted by currency, rate_date"""
+        by_currency = defaultdict(lambda: ([], []))
+        for rate_date, currency, rate in rows:
+            days, rates = by_currency[currency]
+            days.append(day_number(rate_date))
+            rates.append(float(rate))
+
+        all_days = [days[0] for days, _ in by_currency.values()] + [days[-1] for days, _ in by_currency.values()]
+        self.first_day = min(all_days, default=0)
+        self.span = max(all_days, default=0) - self.first_day + 1
+        calendar = np.arange(self.first_day, self.first_day + self.span)
+        self.per_pivot = {}
+        for currency, (days, rates) in by_currency.items():
+            # Last rate on or before each day; days before the first rate use the first one
+            index = np.maximum(np.searchsorted(np.array(days), calendar, side="right") - 1, 0)
+            self.per_pivot[currency] = np.array(rates)[index]
+        self.per_pivot.setdefault(PIVOT, np.ones(self.span))
+        self._warned = set()
+
+    def factors(self, currency, days, target=REPORTING_CURRENCY):
+        """Multipliers that turn amounts in currency on days (array of day
+        numbers) into target. Undated rows use the latest rate."""
+        days = np.asarray(days, dtype=np.int64)
+        if currency == target:
+            return np.ones(len(days))
+        source, dest = self.per_pivot.get(currency), self.per_pivot.get(target)
+        if source is None or dest is None:
+            missing = currency if source is None else target
+            if missing not in self._warned:
+                self._warned.add(missing)
+                print(f"FX warning: no rates for {missing}, amounts in {currency} are not converted")
+            return np.ones(len(days))
+        index = np.clip(days - self.first_day, 0, self.span - 1)
+        index[days == NO_DATE] = self.span - 1
+        return dest[index] / source[index]
+
+
+class RateCache:
+    """The RateTable of this process, read from fx_rates on first use"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = None
+
+    def get(self, cursor):
+        """cursor must be a DictCursor"""
+        with self.lock:
+            if self.table is None:
+                cursor.execute("SELECT rate_date, currency, rate FROM fx_rates ORDER BY currency, rate_date")
+                self.table = RateTable((row['rate_date'], row['currency'], row['rate']) for row in cursor.fetchall())
+            return self.table
+
+    def clear(self):
+        with self.lock:
+            self.table = None
+
+
+# Shared by all requests in this process
+rate_cache = RateCache()
+
+
+def convert_rows(cursor, rows, fields, target=REPORTING_CURRENCY):
+    """Convert grouped rows in place, one batch per currency.
+
+    Each row has 'currency_code' and 'rate_date' (a date, or None); fields
+    are the summed amounts to convert. Rows already in target are skipped.
+    """
+    by_currency = defaultdict(list)
+    for row in rows:
+        if row['currency_code'] != target:
+            by_currency[row['currency_code']].append(row)
+    if not by_currency:
+        return rows
+    table = rate_cache.get(cursor)
+    for currency, group in by_currency.items():
+        days = np.fromiter((day_number(row['rate_date']) for row in group), dtype=np.int64, count=len(group))
+        for row, factor in zip(group, table.factors(currency, days, target).tolist()):
+            for field in fields:
+                row[field] = float(row[field] or 0) * factor
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load exchange-rate files into fx_rates")
+    parser.add_argument("paths", nargs="+", help="rate CSV files or glob patterns")
+    parser.add_argument("--base", default=PIVOT,
+                        help=f"currency the rates are quoted against, if the file has no base column (default {PIVOT})")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FX RATES -> fx_rates")
+    print("=" * 70)
+
+    paths = sorted({path for pattern in args.paths for path in (glob.glob(pattern) or [pattern])})
+    with connection() as conn:
+        for path in paths:
+            try:
+                loaded, skipped = load_rates(conn, path, args.base.upper())
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"✗ {path}: {e}")
+                continue
+            print(f"✓ {os.path.basename(path)}: {loaded} rates"
+                  + (f" ({skipped} day(s) without a {PIVOT} rate skipped)" if skipped else ""))
+
+    print("\nReload the API (POST /analytics/category-groups/reload) to use the new rates")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,235 @@
 # models.py
-import uuid
+# SQLAlchemy models for the fintrack database. These mirror the tables created
+# by DatabaseMySQL/01_create_schema.sql (plus the columns/tables added by the
+# later numbered scripts), so they can be used for Core bulk statements in
+# db.py and for Base.metadata.create_all() in pipeline.py (schema stage).
 from sqlalchemy import (
-    Column, String, Integer, Date, DECIMAL, Text, Enum, CHAR, TIMESTAMP, func
+    CHAR, Column, String, Integer, Date, DECIMAL, Double, TIMESTAMP, Text, ForeignKey, Index, text
 )
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import declarative_base, relationship
+
+from db import REPORTING_CURRENCY
 
 Base = declarative_base()
 
-def gen_uuid():
-    return str(uuid.uuid4())
 
-import uuid
-from sqlalchemy import (
-    Column, String, Integer, Date, DECIMAL, Text, Enum, CHAR, TIMESTAMP, func
-)
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+class Category(Base):
+    __tablename__ = "categories"
+    category_id = Column(Integer, primary_key=True, autoincrement=True)
+    category_name = Column(String(100), nullable=False, unique=True)
+    description = Column(String(255))
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
 
-Base = declarative_base()
+    transactions = relationship("Transaction", back_populates="category")
 
-def gen_uuid():
-    return str(uuid.uuid4())
 
 class Customer(Base):
     __tablename__ = "customers"
-    id = Column(CHAR(36), primary_key=True, default=gen_uuid)
-    first_name = Column(String(100), nullable=False)
-    last_name = Column(String(100), nullable=False)
-    email = Column(String(255), nullable=False, unique=True)
-    phone_number = Column(String(30))
-    username = Column(String(100), nullable=False, unique=True)
-    password_hash = Column(String(255), nullable=False)
-    customer_identification = Column(String(100))
-    total_spending = Column(DECIMAL(13,2), default=0.00)
-    rough_monthly_income = Column(DECIMAL(13,2))
-    created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
-
-    transactions = relationship("Transaction", back_populates="customer", cascade="all,delete")
+    customer_id = Column(Integer, primary_key=True, autoincrement=True)
+    account_number = Column(String(50), unique=True)
+    account_type = Column(String(50))
+    holder_name = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    # added by 02_update_customers_table.sql
+    username = Column(String(100), unique=True)
+    password = Column(String(100))
+    email = Column(String(255))
 
-class Category(Base):
-    __tablename__ = "categories"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(100), nullable=False, unique=True)
-    description = Column(String(255))
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    transactions = relationship("Transaction", back_populates="customer")
+
+
+class TransactionStaging(Base):
+    """Raw CSV rows, every column kept as text"""
+    __tablename__ = "transactions_staging"
+    staging_id = Column(Integer, primary_key=True, autoincrement=True)
+    transaction_date = Column(String(50))
+    post_date = Column(String(50))
+    description = Column(String(500))
+    category = Column(String(100))
+    type = Column(String(50))
+    amount = Column(String(50))
+    memo = Column(String(255))
+    loaded_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    currency = Column(CHAR(3))              # 11_multi_currency.sql; NULL = reporting currency
+    transformed_at = Column(TIMESTAMP, nullable=True)   # 12_staging_transform_status.sql
+    upload_id = Column(CHAR(32))            # 15_staging_upload_id.sql; upload of the row
+    file_hash = Column(CHAR(64))            # 17_transaction_batches.sql; pipeline file of the row
+
+    __table_args__ = (
+        Index("idx_staging_amount", "amount"),                                      # 07
+        Index("ft_description_memo", "description", "memo", mysql_prefix="FULLTEXT"),  # 08
+        Index("idx_staging_untransformed", "transformed_at", "staging_id"),         # 12
+        Index("idx_staging_transaction_date", "transaction_date"),                 # 14
+    )
 
-    transactions = relationship("Transaction", back_populates="category")
 
 class Transaction(Base):
+    """Cleaned transactions.
+
+    After 04_partition_transactions.sql the primary key in MySQL becomes
+    (transaction_id, transaction_date) and the foreign keys are dropped;
+    transaction_id stays unique, so the ORM identity is unchanged.
+    """
     __tablename__ = "transactions"
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    customer_id = Column(CHAR(36), nullable=False)
-    date_of_purchase = Column(Date, nullable=False)
-    item_description = Column(String(500))
-    category_id = Column(Integer)
-    amount = Column(DECIMAL(13,2), nullable=False)
-    currency = Column(String(3), default="USD")
-    source = Column(String(100))
-    parsed_raw = Column(Text)
-    category_source = Column(Enum('rule','ai','manual', name='category_src_enum'), default='rule')
-    ai_confidence = Column(DECIMAL(4,3))
-    created_at = Column(TIMESTAMP, server_default=func.now())
-
-    # relationships
-    customer = relationship("Customer", back_populates="transactions", foreign_keys=[customer_id])
-    category = relationship("Category", back_populates="transactions", foreign_keys=[category_id])
+    transaction_id = Column(Integer, primary_key=True, autoincrement=True)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"))
+    category_id = Column(Integer, ForeignKey("categories.category_id"))
+    transaction_date = Column(Date)
+    post_date = Column(Date)
+    description = Column(String(500))
+    amount = Column(DECIMAL(12, 2))
+    transaction_type = Column(String(50))
+    memo = Column(String(255))
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    currency = Column(CHAR(3), nullable=False, server_default=text(f"'{REPORTING_CURRENCY}'"))  # 11, 16
+    batch_id = Column(String(64))           # 17; upload id or file hash of the staging row
+
+    customer = relationship("Customer", back_populates="transactions")
+    category = relationship("Category", back_populates="transactions")
+
+    __table_args__ = (
+        Index("idx_transaction_date", "transaction_date"),
+        Index("idx_category_id", "category_id"),
+        Index("idx_customer_id", "customer_id"),
+        Index("idx_customer_amount_date", "customer_id", "amount", "transaction_date"),  # 07
+    )
+
+
+class StagingError(Base):
+    __tablename__ = "staging_errors"
+    error_id = Column(Integer, primary_key=True, autoincrement=True)
+    staging_id = Column(Integer, ForeignKey("transactions_staging.staging_id"))
+    error_message = Column(String(500))
+    error_date = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+
+
+# ---- 04_partition_transactions.sql ------------------------------------------
+
+class MaintenanceState(Base):
+    """Watermarks shared by the transform, maintenance and detector jobs"""
+    __tablename__ = "maintenance_state"
+    state_key = Column(String(100), primary_key=True)
+    state_value = Column(String(255))
+    updated_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+
+
+class ArchiveLog(Base):
+    __tablename__ = "archive_log"
+    archive_id = Column(Integer, primary_key=True, autoincrement=True)
+    source_table = Column(String(100), nullable=False)
+    archive_key = Column(String(100), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    archived_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    restored_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        Index("uq_archive", "source_table", "archive_key", unique=True),
+    )
+
+
+# ---- 05_category_groups.sql -------------------------------------------------
+
+class CategoryGroup(Base):
+    __tablename__ = "category_groups"
+    category_name = Column(String(100), primary_key=True)
+    group_key = Column(String(50), nullable=False)
+    group_order = Column(Integer, nullable=False, server_default=text("100"))
+    color = Column(String(20), nullable=False, server_default=text("'#6b7280'"))
+    accent_class = Column(String(50), nullable=False, server_default=text("'bg-gray-500'"))
+    recommended_percent = Column(DECIMAL(5, 2), nullable=False, server_default=text("0"))
+
+
+# ---- 06_recurring_merchants.sql ---------------------------------------------
+
+class RecurringMerchant(Base):
+    __tablename__ = "recurring_merchants"
+    customer_id = Column(Integer, primary_key=True, server_default=text("0"))
+    merchant_key = Column(String(100), primary_key=True)
+    sample_description = Column(String(500))
+    occurrences = Column(Integer, nullable=False, server_default=text("0"))
+    first_date = Column(Date)
+    last_date = Column(Date)
+    last_amount = Column(DECIMAL(12, 2))
+    interval_count = Column(Integer, nullable=False, server_default=text("0"))
+    interval_mean = Column(Double, nullable=False, server_default=text("0"))
+    interval_m2 = Column(Double, nullable=False, server_default=text("0"))
+    amount_mean = Column(Double, nullable=False, server_default=text("0"))
+    amount_m2 = Column(Double, nullable=False, server_default=text("0"))
+    recent_dates = Column(Text)     # 13_recurring_recent_dates.sql
+    updated_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+
+    __table_args__ = (
+        Index("idx_occurrences", "occurrences"),
+    )
+
+
+# ---- 09_pipeline_files.sql --------------------------------------------------
+
+class PipelineFile(Base):
+    """Per-file checkpoint of pipeline.py"""
+    __tablename__ = "pipeline_files"
+    file_hash = Column(CHAR(64), primary_key=True)
+    file_path = Column(String(500), nullable=False)
+    stage = Column(String(20), nullable=False)
+    row_count = Column(Integer, nullable=False, server_default=text("0"))
+    load_seconds = Column(Double, nullable=False, server_default=text("0"))
+    loaded_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    transformed_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        Index("idx_stage", "stage"),
+    )
+
+
+# ---- 10_upload_sessions.sql -------------------------------------------------
+
+class UploadSession(Base):
+    """Chunked upload state of uploads.py"""
+    __tablename__ = "upload_sessions"
+    upload_id = Column(CHAR(32), primary_key=True)
+    idempotency_key = Column(String(128), nullable=False, unique=True)
+    file_name = Column(String(255))
+    header = Column(Text)
+    total_chunks = Column(Integer, nullable=False)
+    chunks_done = Column(Integer, nullable=False, server_default=text("0"))
+    status = Column(String(20), nullable=False, server_default=text("'open'"))
+    inserted_count = Column(Integer, nullable=False, server_default=text("0"))
+    skipped_count = Column(Integer, nullable=False, server_default=text("0"))
+    near_duplicate_count = Column(Integer, nullable=False, server_default=text("0"))
+    created_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+    updated_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"))
+
+
+# ---- 11_multi_currency.sql --------------------------------------------------
+
+class FxRate(Base):
+    """Units of currency per 1 USD on rate_date (see fx.py)"""
+    __tablename__ = "fx_rates"
+    rate_date = Column(Date, primary_key=True)
+    currency = Column(CHAR(3), primary_key=True)
+    rate = Column(DECIMAL(18, 8), nullable=False)
+    source = Column(String(255))
+    loaded_at = Column(TIMESTAMP, server_default=text("CURRENT_TIMESTAMP"))
+
+
+# ---- 18_staging_rollup.sql --------------------------------------------------
+
+class StagingRollup(Base):
+    """Totals of staging rows archived by run_04_maintenance.py, one row per
+    (post_date, category, type, currency) of an archive file, so the
+    dashboards keep counting them"""
+    __tablename__ = "staging_rollup"
+    rollup_id = Column(Integer, primary_key=True, autoincrement=True)
+    archive_key = Column(String(100), nullable=False)   # archive_log.archive_key
+    post_date = Column(String(50))
+    category = Column(String(100))
+    type = Column(String(50))               # LOWER(type)
+    currency = Column(CHAR(3))              # UPPER(currency); NULL = reporting currency
+    total = Column(DECIMAL(14, 2))
+    abs_total = Column(DECIMAL(14, 2))
+    row_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_rollup_archive_key", "archive_key"),
+    )
@@ -0,0 +1,192 @@
+"""
+near_duplicates.py - Near-duplicate detection for overlapping statement downloads
+
+WHAT THIS DOES:
+  The same charge often shows up twice when statements overlap: once while
+  pending and once posted, with a slightly different description
+  ("SQ *BLUE BOTTLE" vs "BLUE BOTTLE COFFEE 0231") or a date that moved
+  between the transaction date and the post date. Exact matching misses
+  those, and comparing every pair with difflib is O(n^2).
+
+  Instead:
+  - BLOCK: only rows with the same customer and the same amount (in cents)
+    are ever compared, and only if their dates are within WINDOW_DAYS
+  - SIGNATURE: the rows must share a date - the same transaction date, the
+    same post date, or one's transaction date is the other's post date
+    (pending -> posted). A repeat purchase a few days later shares none.
+  - COMPARE: descriptions become sets of character 3-gram shingles of the
+    normalized merchant text; similarity is the Jaccard index of the sets
+  - Rows loaded in the same batch (same upload / same pipeline file,
+    transactions.batch_id) are never duplicates of each other, because one
+    statement lists two $5.50 coffees on the same day as two rows on purpose
+
+  DuplicateIndex keeps candidates in memory for one upload.
+  find_duplicates_sorted() streams rows sorted by (customer, amount, date)
+  and keeps only the current date window, so it scales to millions of rows.
+"""
+
+import datetime
+import re
+from collections import defaultdict, deque, namedtuple
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from classifier import normalize_merchant
+
+WINDOW_DAYS = 4              # pending -> posted usually moves 1-3 days
+SIMILARITY_THRESHOLD = 0.6   # Jaccard index of description shingles
+SHINGLE_SIZE = 3
+
+# dates: ordinals of the transaction date and post date (either may be missing)
+# batch: rows from the same upload/run share a batch and are never fuzzy-matched
+Record = namedtuple('Record', 'id batch customer_id amount_cents dates description')
+
+
+@lru_cache(maxsize=100000)
+def shingles(description, size=SHINGLE_SIZE):
+    """Character n-grams of the normalized merchant text
+
+    Only computed for rows that share a block with another row, and cached
+    because the same merchant text repeats all over a statement.
+    """
+    text = normalize_merchant(description, max_tokens=8)
+    if len(text) <= size:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def parse_date(value):
+    """'10/27/2025', '2025-10-27' or a date -> date, None if unparseable"""
+    if value is None or isinstance(value, datetime.date):
+        return value
+    value = value.strip()
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def date_spellings(date):
+    """Ways a statement writes date that parse_date / STR_TO_DATE read back"""
+    m, d, y = date.month, date.day, date.year
+    return {f"{m:02d}/{d:02d}/{y}", f"{m}/{d}/{y}", f"{m:02d}/{d}/{y}", f"{m}/{d:02d}/{y}", date.isoformat()}
+
+
+def parse_amount_cents(value):
+    """'$1,234.56', '(100)' or a Decimal -> integer cents (same rules as 03_transform)"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        return int(round(Decimal(value) * 100))
+    text = value.strip()
+    if text.startswith('('):
+        text = '-' + text.strip('()')
+    text = re.sub(r'[$,\s]', '', text)
+    try:
+        return int(round(Decimal(text) * 100))
+    except InvalidOperation:
+        return None
+
+
+def make_record(record_id, batch, customer_id, amount, transaction_date, post_date, description):
+    dates = tuple(d.toordinal() for d in (parse_date(transaction_date), parse_date(post_date)) if d)
+    return Record(record_id, batch, customer_id or 0, parse_amount_cents(amount), dates, description or '')
+
+
+# transactions in the order find_duplicates_sorted() needs, one transaction_record() per row
+TRANSACTION_SCAN_SQL = """
+    SELECT transaction_id, batch_id, created_at, customer_id, amount,
+           transaction_date, post_date, description
+    FROM transactions
+    ORDER BY customer_id, amount, transaction_date, transaction_id
+"""
+
+
+def transaction_record(transaction_id, batch_id, created_at, customer_id, amount, transaction_date, post_date,
+                       description):
+    """Record of a transactions row. Its batch is the upload or pipeline file
+    it came from; rows transformed before 17_transaction_batches.sql fall
+    back to their transform run (created_at)."""
+    return make_record(transaction_id, batch_id or created_at, customer_id, amount, transaction_date, post_date,
+                       description)
+
+
+def date_distance(a, b):
+    """Smallest gap in days between any date of a and any date of b"""
+    if not a.dates or not b.dates:
+        return None
+    return min(abs(x - y) for x in a.dates for y in b.dates)
+
+
+def similarity(a, b, threshold=SIMILARITY_THRESHOLD):
+    """Score in [0, 1] if b duplicates a, else None. Assumes the same block."""
+    if a.batch is not None and a.batch == b.batch:
+        return None
+    # No shared date: a separate purchase, however alike
+    if date_distance(a, b) != 0:
+        return None
+    if a.dates == b.dates and a.description == b.description:
+        return 1.0
+    score = jaccard(shingles(a.description), shingles(b.description))
+    return score if score >= threshold else None
+
+
+class DuplicateIndex:
+    """In-memory candidates blocked by (customer, amount)"""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.blocks = defaultdict(list)
+
+    def add(self, record):
+        self.blocks[(record.customer_id, record.amount_cents)].append(record)
+
+    def match(self, record):
+        """Best (existing record, score) that record duplicates, or None"""
+        best = None
+        for candidate in self.blocks.get((record.customer_id, record.amount_cents), ()):
+            score = similarity(candidate, record, self.threshold)
+            if score is not None and (best is None or score > best[1]):
+                best = (candidate, score)
+                if score == 1.0:
+                    break
+        return best
+
+
+def find_duplicates_sorted(records, window_days=WINDOW_DAYS, threshold=SIMILARITY_THRESHOLD):
+    """Yield (kept, duplicate, score) from records sorted by (customer, amount, first date).
+
+    Only the records of the current block that are still inside the date
+    window are kept in memory.
+    """
+    block = None
+    window = deque()
+    for record in records:
+        key = (record.customer_id, record.amount_cents)
+        if key != block:
+            block = key
+            window.clear()
+        if not record.dates:
+            continue
+        # Everything older than the window can never match again
+        while window and record.dates[0] - window[0].dates[0] > window_days:
+            window.popleft()
+
+        best = None
+        for candidate in window:
+            score = similarity(candidate, record, threshold)
+            if score is not None and (best is None or score > best[1]):
+                best = (candidate, score)
+        if best:
+            yield best[0], record, best[1]
+        else:
+            window.append(record)
@@ -0,0 +1,449 @@
+"""
+pipeline.py - Resumable, parallel statement import
+
+WHAT THIS DOES:
+  One command for what used to be run_01_create_schema.py,
+  run_02_load_csv.py and run_03_transform.py, for any number of files:
+  1. schema     creates the database and every table of models.py that
+                is missing, and seeds a new category_groups table from
+                DatabaseMySQL/05_category_groups.sql
+  2. load       parses the CSV statements in a process pool and inserts
+                each file's rows into transactions_staging
+  3. transform  moves new staging rows into transactions (dates parsed,
+                amounts cleaned), in chunks; rows whose date or amount
+                doesn't parse go to staging_errors instead. Then folds the
+                new transactions into the recurring-charge stats
+                (recurring.py) if recurring_merchants exists
+
+  Every step checkpoints, so a crash or Ctrl+C loses at most one file or one
+  chunk and the next run picks up where this one stopped:
+  - each file's rows are committed together with its row in pipeline_files
+    (keyed by the SHA-256 of the contents), so a file is never loaded twice
+    or half-loaded; re-running with the same files only loads new ones
+  - the transform marks each staging row (transformed_at,
+    DatabaseMySQL/12_staging_transform_status.sql) in the same transaction
+    that inserts it, so rows committed out of id order by parallel loads or
+    uploads are never skipped
+
+  Overlapping statements are loaded as-is; run remove_duplicates.py after
+  importing downloads that cover the same dates.
+
+  On the embedded DuckDB backend (FINTRACK_BACKEND=duckdb) only one process
+  may write the file, so the workers just parse and this process inserts.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/pipeline.py statements/
+  .\.venv\Scripts\python.exe backend/pipeline.py "statements/Chase*.CSV" --workers 4
+  .\.venv\Scripts\python.exe backend/pipeline.py --stages transform      (only transform new staging rows)
+  .\.venv\Scripts\python.exe backend/pipeline.py --status                 (list imported files)
+
+EXPECTED OUTPUT:
+  ✓ Chase7561_Activity20250101_20251031.CSV: 233 rows
+  ...
+  A timing table with one line per stage.
+"""
+
+import argparse
+import datetime
+import glob
+import hashlib
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from pymysql.cursors import DictCursor
+
+import db
+from models import Base, PipelineFile, StagingError, TransactionStaging
+from statements import as_dicts, parse_file
+
+STAGES = ("schema", "load", "transform")
+
+# Watermark of older versions of the transform (see adopt_watermark)
+TRANSFORMED_KEY = "staging_transformed_through"
+# Staging rows per transform transaction
+TRANSFORM_CHUNK = 10000
+# What CAST(... AS DECIMAL(12, 2)) accepts once '$' and ',' are removed
+AMOUNT_PATTERN = re.compile(r"^\s*[-+]?(\d{1,10}(\.\d*)?|\.\d+)\s*$")
+
+# Rows without a currency are in the reporting currency (see fx.py)
+TRANSFORM_SQL = """
+    INSERT INTO transactions (transaction_date, post_date, description, amount, currency, transaction_type, memo,
+                              batch_id)
+    SELECT
+        STR_TO_DATE(TRIM(transaction_date), '%%m/%%d/%%Y') as transaction_date,
+        STR_TO_DATE(NULLIF(TRIM(post_date), ''), '%%m/%%d/%%Y') as post_date,
+        description,
+        CAST(REPLACE(REPLACE(amount, '$', ''), ',', '') AS DECIMAL(12, 2)) as amount,
+        COALESCE(currency, %s) as currency,
+        type as transaction_type,
+        memo,
+        COALESCE(upload_id, file_hash) as batch_id
+    FROM transactions_staging
+    WHERE staging_id IN ({ids})
+"""
+
+
+# ============================================================================
+# Files and checkpoints
+# ============================================================================
+
+def find_files(patterns):
+    """Directories (their *.csv files), globs and file names -> sorted paths"""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found.update(os.path.join(pattern, name) for name in os.listdir(pattern)
+                         if name.lower().endswith(".csv"))
+        else:
+            found.update(glob.glob(pattern))
+    return sorted(os.path.abspath(path) for path in found if os.path.isfile(path))
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def loaded_hashes(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT file_hash FROM pipeline_files")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def save_file(conn, path, digest, rows, seconds):
+    """Insert a file's rows and its checkpoint in one transaction"""
+    rows = as_dicts(rows)
+    for row in rows:
+        row["file_hash"] = digest
+    db.bulk_insert(conn, TransactionStaging.__table__, rows)
+    db.bulk_insert(conn, PipelineFile.__table__, [{
+        "file_hash": digest,
+        "file_path": path[-500:],
+        "stage": "loaded",
+        "row_count": len(rows),
+        "load_seconds": round(seconds, 3),
+    }])
+    conn.commit()
+
+
+def parses_as_date(text):
+    try:
+        datetime.datetime.strptime(text.strip(), '%m/%d/%Y')
+        return True
+    except ValueError:
+        return False
+
+
+def transform_problem(transaction_date, post_date, amount):
+    """Why a staging row can't go into transactions, or None if it can.
+
+    Checked here because MySQL rejects the whole INSERT ... SELECT (strict
+    mode) when one row has a date or amount it can't convert, and
+    transactions.transaction_date is NOT NULL (04_partition_transactions.sql).
+    """
+    if not (transaction_date or '').strip():
+        return "missing date"
+    if not parses_as_date(transaction_date):
+        return f"bad date format: {transaction_date}"
+    if (post_date or '').strip() and not parses_as_date(post_date):
+        return f"bad post date format: {post_date}"
+    if not (amount or '').strip():
+        return "missing amount"
+    if not AMOUNT_PATTERN.match(amount.replace('$', '').replace(',', '')):
+        return f"bad amount: {amount}"
+    return None
+
+
+# ============================================================================
+# Stages
+# ============================================================================
+
+def create_schema():
+    if db.DB_BACKEND == "duckdb":
+        import embedded
+        with db.connection() as conn:
+            embedded.create_schema(conn)
+            conn.commit()
+        return
+    server = db.server_connection()
+    try:
+        with server.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{db.MYSQL_DB}`")
+        server.commit()
+    finally:
+        server.close()
+    with db.connection() as conn:
+        with conn.cursor() as cursor:
+            seed = not db.table_exists(cursor, "category_groups")
+    # Every table in models.py, as on DuckDB
+    Base.metadata.create_all(db.get_engine())
+    if seed:
+        import embedded
+        with db.connection() as conn:
+            embedded.seed_category_groups(conn)
+            conn.commit()
+
+
+def _init_worker():
+    # Nothing pooled may be shared with the parent process
+    db.dispose_engines()
+
+
+def parse_worker(path):
+    """(rows, seconds) for one file"""
+    started = time.perf_counter()
+    rows = parse_file(path)
+    return rows, time.perf_counter() - started
+
+
+def load_worker(path, digest):
+    """Parse and insert one file; returns (row count, parse seconds, insert seconds)"""
+    rows, parse_seconds = parse_worker(path)
+    started = time.perf_counter()
+    with db.connection() as conn:
+        save_file(conn, path, digest, rows, parse_seconds + time.perf_counter() - started)
+    return len(rows), parse_seconds, time.perf_counter() - started
+
+
+def load_files(files, workers):
+    """Load every file that has no checkpoint yet. Returns the stage stats."""
+    stats = {"files": 0, "rows": 0, "skipped": 0, "failed": 0, "parse": 0.0, "insert": 0.0}
+
+    with db.connection() as conn:
+        done = loaded_hashes(conn)
+    pending = {}
+    for path in files:
+        digest = file_hash(path)
+        if digest in done or digest in pending:
+            stats["skipped"] += 1
+        else:
+            pending[digest] = path
+    if stats["skipped"]:
+        print(f"  - {stats['skipped']} file(s) skipped (already loaded, or same contents as another file)")
+    if not pending:
+        return stats
+
+    # Only one process may write an embedded DuckDB file
+    workers_insert = db.DB_BACKEND != "duckdb"
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                             initializer=_init_worker) as pool:
+        if workers_insert:
+            futures = {pool.submit(load_worker, path, digest): (path, digest) for digest, path in pending.items()}
+        else:
+            futures = {pool.submit(parse_worker, path): (path, digest) for digest, path in pending.items()}
+
+        with nullcontext() if workers_insert else db.connection() as conn:
+            for future in as_completed(futures):
+                path, digest = futures[future]
+                name = os.path.basename(path)
+                try:
+                    if workers_insert:
+                        row_count, parse_seconds, insert_seconds = future.result()
+                    else:
+                        rows, parse_seconds = future.result()
+                        started = time.perf_counter()
+                        save_file(conn, path, digest, rows, parse_seconds)
+                        row_count, insert_seconds = len(rows), time.perf_counter() - started
+                except Exception as e:
+                    if conn is not None:
+                        conn.rollback()
+                    stats["failed"] += 1
+                    print(f"✗ {name}: {e}")
+                    continue
+                stats["files"] += 1
+                stats["rows"] += row_count
+                stats["parse"] += parse_seconds
+                stats["insert"] += insert_seconds
+                print(f"✓ {name}: {row_count} rows")
+    return stats
+
+
+def adopt_watermark(cursor):
+    """Mark the rows an older transform covered by its watermark, once"""
+    cursor.execute("SELECT state_value FROM maintenance_state WHERE state_key = %s", (TRANSFORMED_KEY,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    cursor.execute("""
+        UPDATE transactions_staging SET transformed_at = CURRENT_TIMESTAMP
+        WHERE transformed_at IS NULL AND staging_id <= %s
+    """, (int(row[0]),))
+    cursor.execute("DELETE FROM maintenance_state WHERE state_key = %s", (TRANSFORMED_KEY,))
+
+
+def transform(chunk_size=TRANSFORM_CHUNK):
+    """Move staging rows that were not transformed yet into transactions.
+
+    Returns (rows inserted, rows rejected); rejected rows are logged to
+    staging_errors with the reason and are not retried.
+    """
+    inserted = rejected = 0
+    with db.connection() as conn:
+        with conn.cursor() as cursor:
+            adopt_watermark(cursor)
+            conn.commit()
+
+            while True:
+                cursor.execute("""
+                    SELECT staging_id, transaction_date, post_date, amount
+                    FROM transactions_staging
+                    WHERE transformed_at IS NULL
+                    ORDER BY staging_id
+                    LIMIT %s
+                """, (chunk_size,))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                good_ids = []
+                errors = []
+                for staging_id, transaction_date, post_date, amount in rows:
+                    problem = transform_problem(transaction_date, post_date, amount)
+                    if problem is None:
+                        good_ids.append(staging_id)
+                    else:
+                        errors.append({"staging_id": staging_id,
+                                       "error_message": f"Failed validation: {problem}"[:500]})
+                if good_ids:
+                    cursor.execute(TRANSFORM_SQL.format(ids=", ".join(["%s"] * len(good_ids))),
+                                   [db.REPORTING_CURRENCY] + good_ids)
+                    inserted += cursor.rowcount
+                if errors:
+                    db.bulk_insert(conn, StagingError.__table__, errors)
+                    rejected += len(errors)
+                # Marked in the same transaction as the insert
+                ids = [row[0] for row in rows]
+                cursor.execute(f"""
+                    UPDATE transactions_staging SET transformed_at = CURRENT_TIMESTAMP
+                    WHERE staging_id IN ({', '.join(['%s'] * len(ids))})
+                """, ids)
+                conn.commit()
+
+            # Every file loaded before this point is now in transactions
+            cursor.execute("""
+                UPDATE pipeline_files SET stage = 'transformed', transformed_at = CURRENT_TIMESTAMP
+                WHERE stage = 'loaded'
+            """)
+            conn.commit()
+    return inserted, rejected
+
+
+def update_recurring():
+    """Fold new transactions into recurring_merchants (recurring.py).
+    Returns the rows folded in, or None without DatabaseMySQL/06_recurring_merchants.sql"""
+    import recurring
+    with db.connection() as conn:
+        with conn.cursor() as cursor:
+            if not db.table_exists(cursor, "recurring_merchants"):
+                return None
+        return recurring.update_recurring(conn)
+
+
+def print_status():
+    with db.connection() as conn:
+        with conn.cursor(DictCursor) as cursor:
+            cursor.execute("""
+                SELECT file_path, stage, row_count, load_seconds, loaded_at, transformed_at
+                FROM pipeline_files ORDER BY loaded_at, file_path
+            """)
+            rows = cursor.fetchall()
+    print(f"{'file':<50} {'stage':<12} {'rows':>8} {'loaded at':>20}")
+    print("-" * 94)
+    for row in rows:
+        print(f"{os.path.basename(row['file_path'])[:50]:<50} {row['stage']:<12} "
+              f"{row['row_count']:>8} {str(row['loaded_at'])[:19]:>20}")
+    print(f"\n✓ {len(rows)} file(s)")
+
+
+def print_summary(timings, load_stats):
+    print("\n" + "-" * 70)
+    print(f"{'stage':<12} {'files':>7} {'rows':>10} {'wall s':>9} {'parse s':>9} {'insert s':>9}")
+    print("-" * 70)
+    for stage in STAGES:
+        if stage not in timings:
+            continue
+        seconds, files, rows = timings[stage]
+        line = f"{stage:<12} {files if files is not None else '-':>7} {rows if rows is not None else '-':>10} {seconds:>9.2f}"
+        if stage == "load":
+            line += f" {load_stats['parse']:>9.2f} {load_stats['insert']:>9.2f}"
+        print(line)
+    print(f"{'total':<12} {'':>7} {'':>10} {sum(t[0] for t in timings.values()):>9.2f}")
+    print("  (parse/insert are summed over the worker processes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import bank statement CSVs (resumable, parallel)")
+    parser.add_argument("paths", nargs="*", help="CSV files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="parallel processes for loading")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated subset of {', '.join(STAGES)} (default: all)")
+    parser.add_argument("--status", action="store_true", help="list imported files and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    files = find_files(args.paths)
+    if "load" in stages and not files:
+        parser.error("no CSV files found (pass files, a directory or a glob, or use --stages transform)")
+
+    print("=" * 70)
+    print(f"STATEMENT PIPELINE: {len(files)} file(s), {args.workers} worker(s), backend {db.DB_BACKEND}")
+    print("=" * 70)
+
+    timings = {}
+    load_stats = {"failed": 0, "parse": 0.0, "insert": 0.0}
+    try:
+        if "schema" in stages:
+            started = time.perf_counter()
+            create_schema()
+            timings["schema"] = (time.perf_counter() - started, None, None)
+            print("✓ Schema ready")
+        if "load" in stages:
+            started = time.perf_counter()
+            load_stats = load_files(files, args.workers)
+            timings["load"] = (time.perf_counter() - started, load_stats["files"], load_stats["rows"])
+        if "transform" in stages:
+            started = time.perf_counter()
+            rows, rejected = transform()
+            timings["transform"] = (time.perf_counter() - started, None, rows)
+            print(f"✓ Transformed {rows} rows")
+            if rejected:
+                print(f"  - {rejected} row(s) with a bad date or amount logged to staging_errors")
+            folded = update_recurring()
+            if folded is not None:
+                print(f"✓ Folded {folded} transaction(s) into recurring_merchants")
+    except KeyboardInterrupt:
+        print("\n✗ Interrupted - run the same command again to resume")
+        exit(1)
+    except Exception as e:
+        print(f"✗ Pipeline failed: {e}")
+        print("  Fix the problem and run the same command again to resume")
+        exit(1)
+    finally:
+        if timings:
+            print_summary(timings, load_stats)
+
+    if load_stats["failed"]:
+        print(f"\n✗ {load_stats['failed']} file(s) failed, run again to retry them")
+        exit(1)
+    print("\n" + "=" * 70)
+    print("✓ PIPELINE COMPLETE")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
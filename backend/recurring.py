@@ -0,0 +1,315 @@
+"""
+recurring.py - Incremental recurring-charge / subscription detector
+
+WHAT THIS DOES:
+  Finds payments that repeat on a schedule (rent, streaming, insurance,
+  paychecks) in the transactions table:
+  - Groups charges by customer + normalized merchant
+    (classifier.normalize_merchant: "NETFLIX.COM 866-579-7172 CA" -> "netflix com")
+  - Keeps running statistics per merchant in recurring_merchants
+    (DatabaseMySQL/06_recurring_merchants.sql): last date, mean/variance of
+    the days between charges, mean/variance of the amounts
+  - update_recurring() only reads transactions it hasn't folded in yet
+    (watermark.TransactionsWatermark, saved as 'recurring_scanned_through'),
+    so each run costs as much as the new data, not the whole history. A
+    transaction committed after one with a higher id (two transforms at
+    once) is still read, exactly once.
+  - get_recurring() flags merchants with enough charges, a regular interval
+    and a stable amount; it only reads, so /recurring can use the replica
+
+  pipeline.py runs update_recurring() after each transform. After
+  DatabaseMySQL/03_transform_to_transactions.sql, run this file.
+
+  Charges that arrive out of order (an older statement uploaded later)
+  re-estimate the interval from the merchant's latest RECENT_DATES charge
+  dates (recurring_merchants.recent_dates,
+  DatabaseMySQL/13_recurring_recent_dates.sql). Charges in date order keep
+  using the O(1) running update. After such a backfill the interval mean
+  and spread only cover those last RECENT_DATES charges (three years of a
+  monthly bill); intervals older than that are dropped from the
+  statistics. Occurrences, first date and the amount statistics still
+  cover the full history.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/recurring.py
+
+EXPECTED OUTPUT:
+  ✓ Folded 1234 new transaction(s) into recurring_merchants
+"""
+
+import bisect
+import datetime
+import math
+from collections import defaultdict
+
+import pymysql
+
+import db
+from classifier import normalize_merchant
+from db import bulk_upsert
+from models import RecurringMerchant
+from watermark import TransactionsWatermark
+
+# Watermark in maintenance_state (watermark.Watermark.state())
+SCANNED_KEY = "recurring_scanned_through"
+# Runs of ids read ahead of a gap that fit in maintenance_state.state_value;
+# with more gaps than this a batch stops at the settled id
+MAX_PENDING_RUNS = 8
+
+# New transactions read (and committed) per batch
+BATCH_SIZE = 10000
+# Merchants loaded per IN (...) lookup
+LOOKUP_CHUNK = 500
+# Charge dates kept per merchant, to re-estimate the interval after a backfill
+RECENT_DATES = 36
+
+# What counts as "recurring"
+MIN_OCCURRENCES = 3
+INTERVAL_TOLERANCE_DAYS = 3       # absolute slack on the interval std-dev ...
+INTERVAL_TOLERANCE_RATIO = 0.2    # ... or 20% of the mean interval, whichever is larger
+AMOUNT_TOLERANCE = 1.00           # absolute slack on the amount std-dev ...
+AMOUNT_TOLERANCE_RATIO = 0.15     # ... or 15% of the mean amount, whichever is larger
+
+# Named cadences (days); anything else is reported as "every N days"
+CADENCES = (
+    ('weekly', 7),
+    ('biweekly', 14),
+    ('monthly', 30.44),
+    ('quarterly', 91.31),
+    ('yearly', 365.25),
+)
+CADENCE_TOLERANCE_RATIO = 0.25
+
+
+class MerchantStats:
+    """Running statistics for one (customer, merchant)"""
+
+    __slots__ = ('customer_id', 'merchant_key', 'sample_description', 'occurrences',
+                 'first_date', 'last_date', 'last_amount', 'interval_count', 'interval_mean',
+                 'interval_m2', 'amount_mean', 'amount_m2', 'recent_dates')
+
+    def __init__(self, customer_id, merchant_key):
+        self.customer_id = customer_id
+        self.merchant_key = merchant_key
+        self.sample_description = None
+        self.occurrences = 0
+        self.first_date = None
+        self.last_date = None
+        self.last_amount = None
+        self.interval_count = 0
+        self.interval_mean = 0.0
+        self.interval_m2 = 0.0
+        self.amount_mean = 0.0
+        self.amount_m2 = 0.0
+        self.recent_dates = []      # sorted, at most RECENT_DATES
+
+    @classmethod
+    def from_row(cls, row):
+        stats = cls(row['customer_id'], row['merchant_key'])
+        for name in cls.__slots__[2:]:
+            setattr(stats, name, row[name])
+        stats.recent_dates = [datetime.date.fromisoformat(value)
+                              for value in (row['recent_dates'] or '').split(',') if value]
+        return stats
+
+    def fold(self, date, amount, description):
+        """Add one charge (Welford's online mean/variance)"""
+        amount = float(amount)
+        backfill = False
+        if self.last_date is None:
+            self.first_date = self.last_date = date
+        elif date > self.last_date:
+            self._add_interval((date - self.last_date).days)
+            self.last_date = date
+        elif date < self.last_date:
+            backfill = True
+            self.first_date = min(self.first_date, date)
+
+        bisect.insort(self.recent_dates, date)
+        del self.recent_dates[:-RECENT_DATES]
+        if backfill:
+            self._recount_intervals()
+
+        if date >= self.last_date:
+            self.last_amount = amount
+            self.sample_description = description
+
+        self.occurrences += 1
+        delta = amount - self.amount_mean
+        self.amount_mean += delta / self.occurrences
+        self.amount_m2 += delta * (amount - self.amount_mean)
+
+    def _add_interval(self, gap):
+        self.interval_count += 1
+        delta = gap - self.interval_mean
+        self.interval_mean += delta / self.interval_count
+        self.interval_m2 += delta * (gap - self.interval_mean)
+
+    def _recount_intervals(self):
+        """Interval mean/variance from recent_dates (after an out-of-order charge)"""
+        self.interval_count = 0
+        self.interval_mean = 0.0
+        self.interval_m2 = 0.0
+        for previous, date in zip(self.recent_dates, self.recent_dates[1:]):
+            # Same-day charges add no interval, as in date order
+            if date > previous:
+                self._add_interval((date - previous).days)
+
+    def as_row(self):
+        row = {name: getattr(self, name) for name in self.__slots__}
+        row['recent_dates'] = ','.join(date.isoformat() for date in self.recent_dates)
+        return row
+
+    def interval_std(self):
+        return math.sqrt(self.interval_m2 / (self.interval_count - 1)) if self.interval_count > 1 else 0.0
+
+    def amount_std(self):
+        return math.sqrt(self.amount_m2 / (self.occurrences - 1)) if self.occurrences > 1 else 0.0
+
+
+def cadence_name(interval_days):
+    for name, days in CADENCES:
+        if abs(interval_days - days) <= days * CADENCE_TOLERANCE_RATIO:
+            return name
+    return f"every {round(interval_days)} days"
+
+
+def classify(stats, today=None):
+    """Describe a merchant as recurring, or return None if it isn't"""
+    if stats.occurrences < MIN_OCCURRENCES or stats.interval_count < MIN_OCCURRENCES - 1:
+        return None
+    interval = stats.interval_mean
+    if interval < 1:
+        return None
+    if stats.interval_std() > max(INTERVAL_TOLERANCE_DAYS, interval * INTERVAL_TOLERANCE_RATIO):
+        return None
+    if stats.amount_std() > max(AMOUNT_TOLERANCE, abs(stats.amount_mean) * AMOUNT_TOLERANCE_RATIO):
+        return None
+
+    today = today or datetime.date.today()
+    days_since = (today - stats.last_date).days
+    return {
+        'customerId': stats.customer_id,
+        'merchant': stats.merchant_key,
+        'description': stats.sample_description,
+        'cadence': cadence_name(interval),
+        'intervalDays': round(interval, 1),
+        'amount': round(stats.amount_mean, 2),
+        'amountStdDev': round(stats.amount_std(), 2),
+        'lastAmount': float(stats.last_amount) if stats.last_amount is not None else None,
+        'monthlyCost': round(stats.amount_mean * CADENCES[2][1] / interval, 2),
+        'occurrences': stats.occurrences,
+        'firstDate': stats.first_date,
+        'lastDate': stats.last_date,
+        'nextExpectedDate': stats.last_date + datetime.timedelta(days=round(interval)),
+        # Missed more than one expected charge -> probably cancelled
+        'active': days_since <= 2 * interval + INTERVAL_TOLERANCE_DAYS,
+    }
+
+
+def _get_watermark(cursor):
+    cursor.execute("SELECT state_value FROM maintenance_state WHERE state_key = %s", (SCANNED_KEY,))
+    row = cursor.fetchone()
+    watermark = TransactionsWatermark()
+    watermark.load_state(row['state_value'] if row else None)
+    return watermark
+
+
+def _load_stats(cursor, keys):
+    stats = {}
+    keys = list(keys)
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[start:start + LOOKUP_CHUNK]
+        placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+        cursor.execute(
+            f"SELECT * FROM recurring_merchants WHERE (customer_id, merchant_key) IN ({placeholders})",
+            [value for key in chunk for value in key]
+        )
+        for row in cursor.fetchall():
+            stats[(row['customer_id'], row['merchant_key'])] = MerchantStats.from_row(row)
+    return stats
+
+
+def _save_stats(conn, stats):
+    bulk_upsert(conn, RecurringMerchant.__table__, [s.as_row() for s in stats])
+
+
+def update_recurring(conn, batch_size=BATCH_SIZE):
+    """Fold transactions added since the last run into recurring_merchants.
+
+    Each batch commits its merchant stats together with the watermark, so an
+    interrupted run picks up exactly where it stopped. Returns rows processed.
+    """
+    processed = 0
+    while True:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            watermark = _get_watermark(cursor)
+            window = watermark.window(cursor)
+            if window.condition is None:
+                break
+            read_through = window.max_id
+            if len(watermark.pending) + len(window.young_runs) > MAX_PENDING_RUNS:
+                read_through = window.settled_id
+            cursor.execute(f"""
+                SELECT transaction_id, COALESCE(customer_id, 0) as customer_id,
+                       transaction_date, description, amount
+                FROM transactions
+                WHERE {window.condition} AND transaction_id <= %(read_through)s
+                ORDER BY transaction_id
+                LIMIT %(batch_size)s
+            """, {**window.params, 'read_through': read_through, 'batch_size': batch_size})
+            rows = cursor.fetchall()
+            if len(rows) == batch_size:
+                read_through = rows[-1]['transaction_id']
+
+            charges = defaultdict(list)
+            for row in rows:
+                merchant = normalize_merchant(row['description'])
+                if merchant and row['transaction_date'] and row['amount'] is not None:
+                    charges[(row['customer_id'], merchant)].append(row)
+
+            stats = _load_stats(cursor, charges.keys())
+            for key, merchant_rows in charges.items():
+                merchant_stats = stats.get(key)
+                if merchant_stats is None:
+                    merchant_stats = stats[key] = MerchantStats(*key)
+                merchant_rows.sort(key=lambda r: (r['transaction_date'], r['transaction_id']))
+                for row in merchant_rows:
+                    merchant_stats.fold(row['transaction_date'], row['amount'], row['description'])
+
+            if stats:
+                _save_stats(conn, stats.values())
+            watermark.advance(window, read_through)
+            cursor.execute("""
+                INSERT INTO maintenance_state (state_key, state_value) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE state_value = VALUES(state_value)
+            """, (SCANNED_KEY, watermark.state()))
+        conn.commit()
+
+        processed += len(rows)
+        if len(rows) < batch_size:
+            break
+    return processed
+
+
+def get_recurring(cursor, customer_id=None, include_inactive=False, today=None):
+    """Recurring merchants, most expensive per month first"""
+    sql = "SELECT * FROM recurring_merchants WHERE occurrences >= %s"
+    params = [MIN_OCCURRENCES]
+    if customer_id is not None:
+        sql += " AND customer_id = %s"
+        params.append(customer_id)
+    cursor.execute(sql, params)
+
+    results = []
+    for row in cursor.fetchall():
+        result = classify(MerchantStats.from_row(row), today)
+        if result and (include_inactive or result['active']):
+            results.append(result)
+    results.sort(key=lambda r: abs(r['monthlyCost']), reverse=True)
+    return results
+
+
+if __name__ == "__main__":
+    with db.connection() as conn:
+        print(f"✓ Folded {update_recurring(conn)} new transaction(s) into recurring_merchants")
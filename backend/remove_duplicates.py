@@ -1,42 +1,57 @@
 """
-remove_duplicates.py - Remove duplicate rows from transactions table
+remove_duplicates.py - Remove duplicate and near-duplicate rows from transactions table
 
 What it does:
  - Connects to fintrack.transactions
  - Counts rows before
- - Runs a DELETE that removes rows where all key columns match and transaction_id is greater (keeps the lowest id)
+ - Streams the table sorted by (customer_id, amount, transaction_date) and
+   compares each row only with rows of the same customer and amount within a
+   few days (see near_duplicates.py). Catches:
+     * exact duplicates (same dates, description and amount)
+     * the same charge exported twice by overlapping statements with a
+       slightly different description or a date that moved between
+       transaction date and post date
+ - Rows from the same statement (same upload or pipeline file,
+   transactions.batch_id) are never matched with each other, not even exact
+   copies, so two identical coffees on one statement stay. Rows from
+   different files are matched even when one transform run moved them all.
+   Rows transformed before DatabaseMySQL/17_transaction_batches.sql have no
+   batch_id; for those the transform run (created_at) stands in.
+ - Deletes the later copy (keeps the first one seen), in batches
  - Commits and reports how many rows were removed and final count
 
 How to run:
+ .\.venv\Scripts\python.exe backend/remove_duplicates.py --dry-run     (only list matches)
  .\.venv\Scripts\python.exe backend/remove_duplicates.py
+ .\.venv\Scripts\python.exe backend/remove_duplicates.py --threshold 0.8 --window-days 2
 
 NOTE: This is destructive. If you want a backup first, export the table or create a copy.
+      DatabaseMySQL/07_duplicate_indexes.sql adds the index that makes the sorted scan fast.
 """
 
+import argparse
+
 import pymysql
 
-MYSQL_USER = "root"
-MYSQL_PASSWORD = "ABGdbgcoldstone67@"
-MYSQL_HOST = "localhost"
-MYSQL_DATABASE = "fintrack"
-
-delete_sql = """
-DELETE t1 FROM transactions t1
-INNER JOIN transactions t2
-  ON t1.transaction_date <=> t2.transaction_date
-  AND t1.post_date <=> t2.post_date
-  AND t1.description <=> t2.description
-  AND t1.amount <=> t2.amount
-  AND t1.transaction_type <=> t2.transaction_type
-  AND t1.memo <=> t2.memo
-  AND t1.customer_id <=> t2.customer_id
-  AND t1.category_id <=> t2.category_id
-WHERE t1.transaction_id > t2.transaction_id
-"""
+from db import get_engine
+from near_duplicates import (
+    SIMILARITY_THRESHOLD, TRANSACTION_SCAN_SQL, WINDOW_DAYS, find_duplicates_sorted, transaction_record
+)
+
+DELETE_BATCH = 1000
+FETCH_BATCH = 10000
+
+parser = argparse.ArgumentParser(description="Remove duplicate and near-duplicate transactions")
+parser.add_argument("--dry-run", action="store_true", help="list matches without deleting")
+parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                    help="description similarity (0-1) needed to call two rows duplicates")
+parser.add_argument("--window-days", type=int, default=WINDOW_DAYS,
+                    help="max days between the two rows' first dates (they must also share a date)")
+args = parser.parse_args()
 
 print("Connecting to database...")
 try:
-    conn = pymysql.connect(host=MYSQL_HOST, user=MYSQL_USER, password=MYSQL_PASSWORD, database=MYSQL_DATABASE)
+    conn = get_engine().raw_connection()
     cursor = conn.cursor()
 except Exception as e:
     print(f"Connection failed: {e}")
@@ -46,16 +61,49 @@ cursor.execute("SELECT COUNT(*) FROM transactions")
 before = cursor.fetchone()[0]
 print(f"Rows before: {before}")
 
-print("Running duplicate removal SQL...")
+
+def stream_records(connection):
+    """Rows in block order, fetched in chunks from an unbuffered cursor"""
+    with connection.cursor(pymysql.cursors.SSCursor) as stream:
+        stream.execute(TRANSACTION_SCAN_SQL)
+        while True:
+            rows = stream.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                yield transaction_record(*row)
+
+
+print("Scanning for duplicates...")
+duplicate_ids = []
+# The unbuffered scan needs its own connection while this one deletes
+scan_conn = get_engine().raw_connection()
+try:
+    for kept, duplicate, score in find_duplicates_sorted(stream_records(scan_conn), args.window_days, args.threshold):
+        duplicate_ids.append(duplicate.id)
+        if args.dry_run:
+            print(f"  {duplicate.id} duplicates {kept.id} (similarity {score:.2f}): "
+                  f"{duplicate.description!r} ~ {kept.description!r}")
+finally:
+    scan_conn.close()
+print(f"Duplicates found: {len(duplicate_ids)}")
+
+if args.dry_run:
+    cursor.close()
+    conn.close()
+    print("Dry run, nothing deleted.")
+    raise SystemExit(0)
+
+print("Removing duplicates...")
 try:
-    deleted = cursor.execute(delete_sql)
-    conn.commit()
-    # cursor.rowcount may be -1 in some drivers, so try to get affected_rows from connection if available
-    try:
-        affected = cursor.rowcount
-    except Exception:
-        affected = deleted
-    print(f"Rows deleted (cursor.rowcount): {affected}")
+    deleted = 0
+    for start in range(0, len(duplicate_ids), DELETE_BATCH):
+        chunk = duplicate_ids[start:start + DELETE_BATCH]
+        deleted += cursor.execute(
+            f"DELETE FROM transactions WHERE transaction_id IN ({', '.join(['%s'] * len(chunk))})", chunk
+        )
+        conn.commit()
+    print(f"Rows deleted: {deleted}")
 except Exception as e:
     print(f"Delete failed: {e}")
     conn.rollback()
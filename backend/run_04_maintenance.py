@@ -0,0 +1,470 @@
+"""
+run_04_maintenance.py - Partition upkeep and cold-data archival
+
+WHAT THIS DOES:
+  Incremental maintenance job for the transactions tables. Safe to run on a
+  schedule (e.g. nightly with Task Scheduler or cron):
+  - Splits the catch-all partition of transactions into monthly partitions
+    and keeps a few empty months ahead of today
+  - Archives monthly partitions older than the retention window to a
+    compressed file, then drops the partition
+  - Archives staging rows that the pipeline (pipeline.py) has already
+    transformed and that are older than the staging retention to
+    compressed files. Their totals go to staging_rollup
+    (DatabaseMySQL/18_staging_rollup.sql) in the same transaction that
+    deletes them, so the dashboards' totals, trends and daily expenses
+    don't change; /transactions and search only list the rows still in
+    staging. Rows are archived in chunks of STAGING_CHUNK ids, one file each
+  - Restores any archive file back into its table (a staging archive also
+    takes its rows out of staging_rollup)
+
+  Only new work is touched on every run: staging rows above the last archived
+  id, partitions that crossed the retention line, and the empty future
+  partition. Nothing rewrites the whole table.
+
+  The partitions are for archival (a month is dropped, not deleted row by
+  row) and for queries that filter on transaction_date. No endpoint gets
+  partition pruning from them: the endpoints read transactions_staging, and
+  remove_duplicates.py / recurring.py read all of transactions.
+
+  Requires DatabaseMySQL/04_partition_transactions.sql to have been run once.
+
+HOW TO RUN:
+  .\.venv\Scripts\python.exe backend/run_04_maintenance.py
+  .\.venv\Scripts\python.exe backend/run_04_maintenance.py --retention-months 36
+  .\.venv\Scripts\python.exe backend/run_04_maintenance.py --list
+  .\.venv\Scripts\python.exe backend/run_04_maintenance.py --restore archive/transactions_p202301.csv.gz
+
+EXPECTED OUTPUT:
+  ✓ Partitions up to date (p202501 .. p202602)
+  ✓ Nothing to archive in transactions (retention: 24 months)
+  ✓ Archived 233 staging rows to archive/transactions_staging_1_233.csv.gz
+"""
+
+import argparse
+import csv
+import datetime
+import gzip
+import os
+
+import pymysql
+from sqlalchemy import String
+
+from db import MYSQL_DB, MYSQL_HOST, bulk_insert, get_engine, table_exists
+from models import Base
+
+# Archive files live next to the project, outside the backend folder
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(backend_dir)
+ARCHIVE_DIR = os.path.join(project_root, "archive")
+
+# Defaults (can be overridden on the command line)
+RETENTION_MONTHS = 24          # keep this many months of transactions online
+FUTURE_MONTHS = 3              # empty monthly partitions to keep ahead of today
+STAGING_RETENTION_DAYS = 365   # keep a year of staging rows listed in /transactions and search
+STAGING_CHUNK = 20000          # staging ids per archive file (and per DELETE transaction)
+BATCH_SIZE = 5000              # rows per INSERT batch when restoring
+
+# How NULL is written in archive files, so it stays different from ''
+NULL = "\\N"
+
+# Watermark written by this script
+STAGING_ARCHIVED_KEY = "staging_archived_through"
+
+# Totals of the staging rows of one archive chunk. A plain SELECT casts the
+# amounts as leniently as the dashboards' queries do, so the rollup adds up
+# to exactly what they counted. Categories keep their exact spelling
+# (utf8mb4_bin), like MONTHLY_ROLLUP_SQL.
+STAGING_ROLLUP_SQL = """
+    SELECT
+        post_date,
+        category COLLATE utf8mb4_bin as category,
+        LOWER(type) as type,
+        UPPER(currency) as currency,
+        SUM(CAST(amount AS DECIMAL(12,2))) as total,
+        SUM(ABS(CAST(amount AS DECIMAL(12,2)))) as abs_total,
+        COUNT(*) as row_count
+    FROM transactions_staging
+    WHERE staging_id BETWEEN %s AND %s
+    GROUP BY post_date, category, type, currency
+"""
+STAGING_ROLLUP_COLUMNS = ('post_date', 'category', 'type', 'currency', 'total', 'abs_total', 'row_count')
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def month_start(d):
+    return datetime.date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    month_index = d.year * 12 + (d.month - 1) + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(d):
+    """p202510 holds October 2025"""
+    return f"p{d.year:04d}{d.month:02d}"
+
+
+def partition_month(name):
+    """Inverse of partition_name(); None for p_future or anything else"""
+    if len(name) != 7 or not name[1:].isdigit():
+        return None
+    return datetime.date(int(name[1:5]), int(name[5:7]), 1)
+
+
+def partition_clause(d):
+    return f"PARTITION {partition_name(d)} VALUES LESS THAN ('{add_months(d, 1).isoformat()}')"
+
+
+def list_partitions(cursor):
+    """Monthly partitions of transactions, oldest first, as (name, month) pairs"""
+    cursor.execute("""
+        SELECT PARTITION_NAME
+        FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'transactions'
+        AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (MYSQL_DB,))
+    names = [row[0] for row in cursor.fetchall()]
+    return names, [(n, partition_month(n)) for n in names if partition_month(n)]
+
+
+def get_state(cursor, key, default=0):
+    cursor.execute("SELECT state_value FROM maintenance_state WHERE state_key = %s", (key,))
+    row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else default
+
+
+def set_state(cursor, key, value):
+    cursor.execute("""
+        INSERT INTO maintenance_state (state_key, state_value) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE state_value = VALUES(state_value)
+    """, (key, str(value)))
+
+
+def write_archive(conn, select_sql, params, file_path):
+    """Stream a SELECT into a gzip CSV without loading it into memory"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    row_count = 0
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(select_sql, params)
+        with gzip.open(tmp_path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([col[0] for col in cursor.description])
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                writer.writerows([NULL if value is None else value for value in row] for row in rows)
+                row_count += len(rows)
+    # Only a complete file ever gets the final name
+    os.replace(tmp_path, file_path)
+    return row_count
+
+
+def restored_value(column, value):
+    """An archive CSV field as the value to insert into column ('' is
+    only kept in text columns; a date or a number can't be '')"""
+    if value == NULL:
+        return None
+    if value == '' and not isinstance(column.type, String):
+        return None
+    return value
+
+
+def log_archive(cursor, source_table, archive_key, file_path, row_count):
+    cursor.execute("""
+        INSERT INTO archive_log (source_table, archive_key, file_path, row_count)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE file_path = VALUES(file_path),
+            row_count = VALUES(row_count), archived_at = CURRENT_TIMESTAMP, restored_at = NULL
+    """, (source_table, archive_key, file_path, row_count))
+
+
+# ============================================================================
+# Job steps
+# ============================================================================
+
+def ensure_partitions(conn, future_months=FUTURE_MONTHS):
+    """Split p_future so every month up to today + future_months has its own partition.
+
+    REORGANIZE only rewrites p_future. After the first run it is empty, so
+    adding next month's partition is a metadata-only change.
+    """
+    with conn.cursor() as cursor:
+        names, monthly = list_partitions(cursor)
+        if 'p_future' not in names:
+            print("✗ transactions is not partitioned - run DatabaseMySQL/04_partition_transactions.sql first")
+            return False
+
+        if monthly:
+            first_new = add_months(monthly[-1][1], 1)
+        else:
+            # First run: start at the oldest month that has data
+            cursor.execute("SELECT MIN(transaction_date) FROM transactions")
+            oldest = cursor.fetchone()[0]
+            first_new = month_start(oldest or datetime.date.today())
+
+        last_new = add_months(month_start(datetime.date.today()), future_months)
+        new_months = []
+        current = first_new
+        while current <= last_new:
+            new_months.append(current)
+            current = add_months(current, 1)
+
+        if not new_months:
+            print(f"✓ Partitions up to date ({monthly[0][0]} .. {monthly[-1][0]})")
+            return True
+
+        clauses = [partition_clause(m) for m in new_months]
+        clauses.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(
+            "ALTER TABLE transactions REORGANIZE PARTITION p_future INTO (\n    "
+            + ",\n    ".join(clauses) + "\n)"
+        )
+        print(f"✓ Added {len(new_months)} partition(s): "
+              f"{partition_name(new_months[0])} .. {partition_name(new_months[-1])}")
+    return True
+
+
+def archive_partitions(conn, retention_months=RETENTION_MONTHS):
+    """Archive and drop monthly partitions older than the retention window"""
+    cutoff = add_months(month_start(datetime.date.today()), -retention_months)
+    with conn.cursor() as cursor:
+        _, monthly = list_partitions(cursor)
+
+    # Never drop the last monthly partition, it anchors the range
+    expired = [(name, month) for name, month in monthly[:-1] if month < cutoff]
+    if not expired:
+        print(f"✓ Nothing to archive in transactions (retention: {retention_months} months)")
+        return 0
+
+    total = 0
+    for name, _ in expired:
+        file_path = os.path.join(ARCHIVE_DIR, f"transactions_{name}.csv.gz")
+        # PARTITION (...) reads only that month, no index or table scan
+        row_count = write_archive(conn, f"SELECT * FROM transactions PARTITION ({name})", None, file_path)
+        with conn.cursor() as cursor:
+            log_archive(cursor, 'transactions', name, file_path, row_count)
+            conn.commit()
+            cursor.execute(f"ALTER TABLE transactions DROP PARTITION {name}")
+        total += row_count
+        print(f"✓ Archived partition {name} ({row_count} rows) to {os.path.relpath(file_path, project_root)}")
+    return total
+
+
+def archive_staging(conn, retention_days=STAGING_RETENTION_DAYS):
+    """Archive staging rows that were transformed and are past retention,
+    keeping their totals in staging_rollup.
+
+    Works on the id range (last archived, retention cutoff], stopping below
+    the first row the transform hasn't reached, so each run only reads rows
+    it has never seen before. The newest staging row is never archived:
+    the API's watermarks take a smaller MAX(staging_id) for a truncated
+    table, and MySQL before 8.0 would hand its id out again after a restart.
+    """
+    with conn.cursor() as cursor:
+        if not table_exists(cursor, 'staging_rollup'):
+            print("✗ staging_rollup is missing - run DatabaseMySQL/18_staging_rollup.sql "
+                  "to archive transactions_staging")
+            return 0
+        archived_through = get_state(cursor, STAGING_ARCHIVED_KEY)
+
+        # staging_id grows with loaded_at, so the cutoff is a single id
+        cursor.execute(f"""
+            SELECT MAX(staging_id) FROM transactions_staging
+            WHERE staging_id > %s
+            AND staging_id < (SELECT MAX(staging_id) FROM transactions_staging)
+            AND loaded_at < NOW() - INTERVAL {int(retention_days)} DAY
+        """, (archived_through,))
+        upper = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(staging_id) FROM transactions_staging WHERE transformed_at IS NULL")
+        untransformed = cursor.fetchone()[0]
+        if upper and untransformed is not None:
+            upper = min(upper, untransformed - 1)
+
+    if not upper or upper <= archived_through:
+        print(f"✓ Nothing to archive in transactions_staging (retention: {retention_days} days)")
+        return 0
+
+    total = 0
+    for first in range(archived_through + 1, upper + 1, STAGING_CHUNK):
+        last = min(first + STAGING_CHUNK - 1, upper)
+        total += archive_staging_chunk(conn, first, last)
+    return total
+
+
+def archive_staging_chunk(conn, first, last):
+    """Archive the staging ids first..last to one file"""
+    archive_key = f"{first}_{last}"
+    file_path = os.path.join(ARCHIVE_DIR, f"transactions_staging_{archive_key}.csv.gz")
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM transactions_staging WHERE staging_id BETWEEN %s AND %s",
+                       (first, last))
+        if not cursor.fetchone()[0]:
+            set_state(cursor, STAGING_ARCHIVED_KEY, last)
+            conn.commit()
+            return 0
+
+    row_count = write_archive(conn, """
+        SELECT * FROM transactions_staging
+        WHERE staging_id BETWEEN %s AND %s
+        ORDER BY staging_id
+    """, (first, last), file_path)
+
+    # Totals, delete and watermark commit together: the rows are counted
+    # either in staging or in staging_rollup, never in both or neither
+    with conn.cursor() as cursor:
+        cursor.execute(STAGING_ROLLUP_SQL, (first, last))
+        rollup = [dict(zip(STAGING_ROLLUP_COLUMNS, row), archive_key=archive_key) for row in cursor.fetchall()]
+        bulk_insert(conn, Base.metadata.tables['staging_rollup'], rollup)
+        log_archive(cursor, 'transactions_staging', archive_key, file_path, row_count)
+        # Error rows point at staging rows; drop the links before deleting
+        cursor.execute("""
+            UPDATE staging_errors SET staging_id = NULL
+            WHERE staging_id BETWEEN %s AND %s
+        """, (first, last))
+        cursor.execute("DELETE FROM transactions_staging WHERE staging_id BETWEEN %s AND %s", (first, last))
+        set_state(cursor, STAGING_ARCHIVED_KEY, last)
+        conn.commit()
+
+    print(f"✓ Archived {row_count} staging rows to {os.path.relpath(file_path, project_root)}")
+    return row_count
+
+
+def restore_archive(conn, file_path):
+    """Load an archive file back into the table it came from"""
+    file_path = os.path.abspath(file_path)
+    base_name = os.path.basename(file_path)
+    if base_name.startswith("transactions_staging_"):
+        table = "transactions_staging"
+        archive_key = base_name[len("transactions_staging_"):].split(".")[0]
+    elif base_name.startswith("transactions_"):
+        table = "transactions"
+        archive_key = base_name[len("transactions_"):].split(".")[0]
+    else:
+        print(f"✗ Not an archive file: {file_path}")
+        return 0
+
+    if table == "transactions":
+        restore_partition(conn, archive_key)
+
+    row_count = 0
+    with gzip.open(file_path, 'rt', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        targets = [Base.metadata.tables[table].columns[name] for name in columns]
+        # INSERT IGNORE keeps the original ids and makes re-running a restore harmless
+        batch = []
+        for row in reader:
+            batch.append({column.name: restored_value(column, value) for column, value in zip(targets, row)})
+            if len(batch) >= BATCH_SIZE:
+                bulk_insert(conn, Base.metadata.tables[table], batch, ignore=True)
+                row_count += len(batch)
+                batch = []
+        if batch:
+            bulk_insert(conn, Base.metadata.tables[table], batch, ignore=True)
+            row_count += len(batch)
+
+        with conn.cursor() as cursor:
+            if table == "transactions_staging":
+                # The rows count in staging again; committed together with them
+                cursor.execute("DELETE FROM staging_rollup WHERE archive_key = %s", (archive_key,))
+            cursor.execute("""
+                UPDATE archive_log SET restored_at = CURRENT_TIMESTAMP
+                WHERE source_table = %s AND archive_key = %s
+            """, (table, archive_key))
+        conn.commit()
+
+    print(f"✓ Restored {row_count} rows into {table} from {base_name}")
+    return row_count
+
+
+def restore_partition(conn, name):
+    """Re-create a dropped monthly partition below the current oldest one.
+
+    Without this the rows would still be accepted (they fall into the oldest
+    partition), but that partition would then hold more than one month.
+    """
+    month = partition_month(name)
+    with conn.cursor() as cursor:
+        names, monthly = list_partitions(cursor)
+        if not month or name in names or not monthly or month >= monthly[0][1]:
+            return
+        oldest_name, oldest_month = monthly[0]
+        clauses = []
+        current = month
+        while current < oldest_month:
+            clauses.append(partition_clause(current))
+            current = add_months(current, 1)
+        clauses.append(partition_clause(oldest_month))
+        cursor.execute(
+            f"ALTER TABLE transactions REORGANIZE PARTITION {oldest_name} INTO (\n    "
+            + ",\n    ".join(clauses) + "\n)"
+        )
+    print(f"✓ Re-created partition {name}")
+
+
+def print_archives(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT source_table, archive_key, row_count, archived_at, restored_at, file_path
+            FROM archive_log ORDER BY archived_at
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        print("No archives yet")
+        return
+    for table, key, count, archived_at, restored_at, path in rows:
+        status = f"restored {restored_at}" if restored_at else "archived"
+        print(f"  {table:<22} {key:<16} {count:>8} rows  {archived_at}  {status}")
+        print(f"      {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition upkeep and cold-data archival")
+    parser.add_argument("--retention-months", type=int, default=RETENTION_MONTHS,
+                        help="months of transactions to keep online")
+    parser.add_argument("--staging-retention-days", type=int, default=STAGING_RETENTION_DAYS,
+                        help="days to keep transformed staging rows")
+    parser.add_argument("--future-months", type=int, default=FUTURE_MONTHS,
+                        help="empty monthly partitions to keep ahead of today")
+    parser.add_argument("--restore", metavar="FILE", help="restore an archive file and exit")
+    parser.add_argument("--list", action="store_true", help="list archive files and exit")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("STEP 4: Partition Maintenance & Archival")
+    print("=" * 70)
+
+    try:
+        conn = get_engine().raw_connection()
+        print(f"✓ Connected to MySQL: {MYSQL_HOST}/{MYSQL_DB}")
+    except Exception as e:
+        print(f"✗ Connection failed: {e}")
+        exit(1)
+
+    try:
+        if args.list:
+            print_archives(conn)
+        elif args.restore:
+            restore_archive(conn, args.restore)
+        else:
+            archive_staging(conn, args.staging_retention_days)
+            if ensure_partitions(conn, args.future_months):
+                archive_partitions(conn, args.retention_months)
+    except Exception as e:
+        print(f"✗ Maintenance failed: {e}")
+        conn.rollback()
+        exit(1)
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 70)
+    print("✓ MAINTENANCE COMPLETE")
+    print("=" * 70)
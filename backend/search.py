@@ -0,0 +1,119 @@
+"""
+search.py - Description/memo search backed by a MySQL FULLTEXT index
+
+WHAT THIS DOES:
+  Turns the text a user types into a MATCH ... AGAINST query in BOOLEAN MODE
+  over transactions_staging (description, memo), using the index from
+  DatabaseMySQL/08_search_index.sql:
+  - every word must match:            "whole foods" -> +whole* +foods*
+  - words match as prefixes:          "netfl"       -> +netfl*
+  - results are ranked by relevance, newest first on ties
+  - paginated with page / page_size
+  - at least one word must be MIN_TOKEN_SIZE long: shorter words are not
+    in the index and would need a full scan, so such queries are rejected
+    with ValueError
+  - shorter words next to a long one are prefixes of a word too
+    ("bp" matches "SHELL BP 123", not "SUBPAR"), checked with LIKE 'bp%' /
+    '% bp%' on the rows the index found for the long words
+
+  The index does all the work, so a query only reads the matching rows of
+  one page instead of scanning the table.
+
+  The embedded DuckDB backend has no FULLTEXT index; there every word is a
+  case-insensitive prefix match on a word of description/memo, and rows
+  whose description matches more words rank first.
+"""
+
+import re
+
+from db import REPORTING_CURRENCY, dialect_of
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (default 3)
+MIN_TOKEN_SIZE = 3
+MAX_TERMS = 8
+MAX_PAGE_SIZE = 200
+
+# Words as the full-text parser sees them; also drops BOOLEAN MODE
+# operators (+ - < > ( ) ~ * " @) since user input is plain text
+WORD = re.compile(r'\w+')
+
+RESULT_COLUMNS = """
+    staging_id as id,
+    description as name,
+    description,
+    category as merchant,
+    category,
+    CAST(amount AS DECIMAL(12,2)) as amount,
+    COALESCE(currency, %s) as currency,
+    post_date as date,
+    type,
+    memo
+"""
+
+
+def boolean_query(text):
+    """'Whole Foods #10' -> ('+whole* +foods*', ['10'])  short words are returned separately"""
+    terms = WORD.findall(text.lower())[:MAX_TERMS]
+    indexed = [t for t in terms if len(t) >= MIN_TOKEN_SIZE]
+    short = [t for t in terms if len(t) < MIN_TOKEN_SIZE]
+    return ' '.join(f'+{t}*' for t in indexed), short
+
+
+def _fulltext_query(text):
+    """WHERE clause, params and score expression using MATCH ... AGAINST"""
+    against, short_terms = boolean_query(text)
+
+    if not against:
+        return [], [], "0", []
+    where = ["MATCH(description, memo) AGAINST (%s IN BOOLEAN MODE)"]
+    params = [against]
+    score = "MATCH(description, memo) AGAINST (%s IN BOOLEAN MODE)"
+    for term in short_terms:
+        # Too short for the index: only checked on the rows the index found,
+        # as the start of a word like the indexed terms
+        where.append("(description LIKE %s OR description LIKE %s OR memo LIKE %s OR memo LIKE %s)")
+        params.extend([f"{term}%", f"% {term}%"] * 2)
+    return where, params, score, [against]
+
+
+def prefix_patterns(text):
+    """'Whole Foods' -> ['\\bwhole', '\\bfoods']  (regular expressions for the scan)"""
+    return [rf'\b{t}' for t in WORD.findall(text.lower())[:MAX_TERMS]]
+
+
+def _scan_query(text):
+    """WHERE clause, params and score expression for backends without FULLTEXT"""
+    patterns = prefix_patterns(text)
+    where = ["regexp_matches(concat_ws(' ', description, memo), %s, 'i')"] * len(patterns)
+    score = " + ".join(["CAST(regexp_matches(description, %s, 'i') AS INTEGER)"] * len(patterns)) or "0"
+    return where, patterns, score, patterns
+
+
+def search_transactions(cursor, text, page=1, page_size=50):
+    """Return (total matches, rows for the page)"""
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    terms = WORD.findall(text)[:MAX_TERMS]
+    if terms and max(len(term) for term in terms) < MIN_TOKEN_SIZE:
+        raise ValueError(f"Search for at least one word of {MIN_TOKEN_SIZE} or more characters")
+    if dialect_of(cursor) == "duckdb":
+        where, params, score, score_params = _scan_query(text)
+    else:
+        where, params, score, score_params = _fulltext_query(text)
+    if not where:
+        return 0, []
+
+    where_sql = " AND ".join(where)
+    cursor.execute(f"SELECT COUNT(*) as total FROM transactions_staging WHERE {where_sql}", params)
+    total = cursor.fetchone()['total']
+    if total == 0:
+        return 0, []
+
+    cursor.execute(f"""
+        SELECT {RESULT_COLUMNS}, {score} as score
+        FROM transactions_staging
+        WHERE {where_sql}
+        ORDER BY score DESC, staging_id DESC
+        LIMIT %s OFFSET %s
+    """, [REPORTING_CURRENCY] + score_params + params + [page_size, (page - 1) * page_size])
+    return total, cursor.fetchall()
@@ -0,0 +1,120 @@
+"""
+serialization.py - Fast JSON encoding and compression for large responses
+
+WHAT THIS DOES:
+  FastAPI's default path for a list of DictCursor rows is slow on big
+  responses: every Decimal is walked by jsonable_encoder, then encoded by the
+  stdlib json module, and the result is sent uncompressed. This module gives
+  the endpoints a faster path:
+  - db.connection(decimal_as_float=True) (db.FAST_CONVERSIONS) makes pymysql
+    return DECIMAL columns as float directly from the wire, so there is no
+    per-field Decimal -> float loop
+  - rows_payload() turns tuple-cursor rows into either the usual list of
+    objects or a compact {"columns": [...], "rows": [[...]]} format
+  - dumps() uses orjson when installed (native date/datetime support),
+    falling back to the stdlib json module
+  - fast_json_response() compresses with brotli or gzip, whichever the
+    client's Accept-Encoding header prefers
+
+  Run bench_serialization.py to see bytes and CPU time per 100k-row response.
+"""
+
+import datetime
+import decimal
+import gzip
+import json
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used instead
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+# Fast settings: most of the size win for a fraction of the CPU of the max levels
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Response formats accepted by the list endpoints (?format=...)
+FORMAT_OBJECTS = "objects"   # [{"id": 1, "amount": -5.5, ...}, ...]  (default)
+FORMAT_COLUMNS = "columns"   # {"columns": ["id", "amount", ...], "rows": [[1, -5.5, ...], ...]}
+
+
+def _default(obj):
+    """Types the JSON encoders don't handle on their own"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def rows_payload(cursor, rows, fmt=FORMAT_OBJECTS):
+    """Shape tuple-cursor rows for the response"""
+    return columns_payload([col[0] for col in cursor.description], rows, fmt)
+
+
+def columns_payload(columns, rows, fmt=FORMAT_OBJECTS):
+    """Same as rows_payload, for rows that did not come from a cursor"""
+    columns = list(columns)
+    if fmt == FORMAT_COLUMNS:
+        return {"columns": columns, "rows": rows}
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header"""
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        candidates = supported if name == '*' else [name]
+        for candidate in candidates:
+            if candidate not in supported or q <= 0:
+                continue
+            # Ties go to the earlier entry in `supported` (brotli first)
+            if q > best_q or (q == best_q and supported.index(candidate) < supported.index(best)):
+                best, best_q = candidate, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def fast_json_response(request, payload, status_code=200):
+    """Encode payload and compress it according to the request's Accept-Encoding"""
+    body = dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoding = choose_encoding(request.headers.get('accept-encoding', ''))
+        if encoding:
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
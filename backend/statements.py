@@ -0,0 +1,46 @@
+"""
+statements.py - Parse bank statement CSVs into transactions_staging rows
+
+WHAT THIS DOES:
+  Maps the column names different banks use ("Transaction Date", "date",
+  "Amount", ...) onto the transactions_staging columns. Values stay text,
+  exactly as in the file; run the transform to clean them up.
+
+  Used by /upload (api_upload.py) and by the pipeline (pipeline.py).
+"""
+
+import csv
+import io
+
+# transactions_staging columns, in the order parse_row returns them
+COLUMNS = ('transaction_date', 'post_date', 'description', 'category', 'type', 'amount', 'memo', 'currency')
+
+
+def parse_row(row):
+    """csv.DictReader row -> tuple in COLUMNS order"""
+    transaction_date = row.get('transaction_date') or row.get('Transaction Date') or row.get('date') or row.get('Date')
+    post_date = row.get('post_date') or row.get('Post Date') or row.get('date') or row.get('Date')
+    description = row.get('description') or row.get('Description')
+    category = row.get('category') or row.get('Category')
+    trans_type = row.get('type') or row.get('Type') or 'expense'
+    amount = row.get('amount') or row.get('Amount') or '0'
+    memo = row.get('memo') or row.get('Memo') or ''
+    # ISO code like 'EUR'; None = the reporting currency (see fx.py)
+    currency = (row.get('currency') or row.get('Currency') or '').strip().upper() or None
+    return (transaction_date, post_date, description, category, trans_type, amount, memo, currency)
+
+
+def parse_text(text):
+    """Whole CSV text -> list of row tuples"""
+    return [parse_row(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def parse_file(path):
+    """CSV file -> list of row tuples (a UTF-8 BOM from Excel exports is skipped)"""
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        return [parse_row(row) for row in csv.DictReader(f)]
+
+
+def as_dicts(rows):
+    """Row tuples -> dicts for db.bulk_insert"""
+    return [dict(zip(COLUMNS, row)) for row in rows]
@@ -0,0 +1,146 @@
+"""
+sync_embedded.py - Copy the MySQL database into the embedded DuckDB file
+
+WHAT THIS DOES:
+  Builds the DuckDB file used when FINTRACK_BACKEND=duckdb (see embedded.py):
+  - Creates every table from models.py
+  - Copies each table from MySQL in one consistent snapshot, streaming
+    BATCH_SIZE rows at a time and inserting them as whole columns
+  - Auto-increment ids continue after the highest copied id
+  - Writes to a temporary file and swaps it in at the end, so a failed sync
+    never leaves a half-copied database behind
+
+  With --init no MySQL server is needed: it creates an empty database with
+  the category groups from DatabaseMySQL/05_category_groups.sql, ready for
+  /upload.
+
+HOW TO RUN:
+  .\\.venv\\Scripts\\python.exe backend/sync_embedded.py                (copy from MySQL)
+  .\\.venv\\Scripts\\python.exe backend/sync_embedded.py --init         (empty database)
+  .\\.venv\\Scripts\\python.exe backend/sync_embedded.py --path C:\\data\\fintrack.duckdb
+
+  Stop the API first: only one process can have the DuckDB file open for writing.
+  Then start the API with FINTRACK_BACKEND=duckdb in .env.
+"""
+
+import argparse
+import os
+import time
+
+import pymysql
+
+import embedded
+from db import DUCKDB_PATH, MYSQL_DB, MYSQL_HOST, get_engine
+from models import Base
+
+BATCH_SIZE = 50000
+
+
+def mysql_tables(cursor):
+    """{table: [columns]} for the model tables that exist in MySQL"""
+    cursor.execute("SHOW TABLES")
+    existing = {row[0] for row in cursor.fetchall()}
+    tables = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        cursor.execute(f"SHOW COLUMNS FROM {table.name}")
+        present = {row[0] for row in cursor.fetchall()}
+        tables[table.name] = [c.name for c in table.columns if c.name in present]
+    return tables
+
+
+def start_ids(cursor, tables):
+    """First free auto-increment id per table"""
+    ids = {}
+    for table in Base.metadata.sorted_tables:
+        column = table.autoincrement_column
+        if column is not None and table.name in tables:
+            cursor.execute(f"SELECT COALESCE(MAX({column.name}), 0) + 1 FROM {table.name}")
+            ids[table.name] = cursor.fetchone()[0]
+    return ids
+
+
+def copy_table(source, target, table, columns, batch_size=BATCH_SIZE):
+    copied = 0
+    with source.cursor(pymysql.cursors.SSCursor) as stream:
+        stream.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        while True:
+            rows = stream.fetchmany(batch_size)
+            if not rows:
+                break
+            copied += embedded.insert_columns(target, table, columns, rows)
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the MySQL database into the embedded DuckDB file")
+    parser.add_argument("--path", default=DUCKDB_PATH, help="DuckDB file to create (default: DUCKDB_PATH)")
+    parser.add_argument("--init", action="store_true", help="create an empty database instead of copying MySQL")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per fetch / insert")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Sync MySQL -> embedded DuckDB")
+    print("=" * 70)
+
+    path = os.path.abspath(args.path)
+    tmp_path = path + ".tmp"
+    for stale in (tmp_path, tmp_path + ".wal"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    started = time.perf_counter()
+    source = None
+    target = embedded.connect(tmp_path)
+    try:
+        if args.init:
+            # Also seeds category_groups
+            embedded.create_schema(target)
+            target.commit()
+            print("✓ Created empty database with category groups")
+        else:
+            try:
+                source = get_engine().raw_connection()
+                print(f"✓ Connected to MySQL: {MYSQL_HOST}/{MYSQL_DB}")
+            except Exception as e:
+                print(f"✗ Connection failed: {e}")
+                exit(1)
+
+            with source.cursor() as cursor:
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+                tables = mysql_tables(cursor)
+                embedded.create_schema(target, start_ids(cursor, tables), seed=False)
+
+            for table in Base.metadata.sorted_tables:
+                if table.name not in tables:
+                    print(f"  - {table.name}: not in MySQL, left empty")
+                    continue
+                table_started = time.perf_counter()
+                copied = copy_table(source, target, table.name, tables[table.name], args.batch_size)
+                print(f"✓ {table.name}: {copied} rows in {time.perf_counter() - table_started:.2f}s")
+
+            if "category_groups" not in tables:
+                embedded.seed_category_groups(target)
+                print(f"✓ category_groups: seeded from {os.path.basename(embedded.CATEGORY_GROUPS_SQL)}")
+            target.commit()
+    except Exception as e:
+        print(f"✗ Sync failed: {e}")
+        exit(1)
+    finally:
+        target.close()
+        embedded.close_databases()
+        if source is not None:
+            source.close()
+
+    # Swap the finished file in (DuckDB checkpoints on close, so there is no WAL left)
+    os.replace(tmp_path, path)
+    print(f"✓ Wrote {path} in {time.perf_counter() - started:.2f}s")
+
+    print("\n" + "=" * 70)
+    print("Set FINTRACK_BACKEND=duckdb in .env and restart the API to use it")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# The backend modules import each other by name (python api_upload.py is run
+# from backend/), so the tests do the same.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import db  # noqa: E402
+import embedded  # noqa: E402
+import pipeline  # noqa: E402
+
+
+@pytest.fixture
+def duckdb_backend(tmp_path, monkeypatch):
+    """A fresh embedded database with the full schema"""
+    monkeypatch.setattr(db, 'DB_BACKEND', 'duckdb')
+    monkeypatch.setattr(db, 'DUCKDB_PATH', str(tmp_path / 'test.duckdb'))
+    pipeline.create_schema()
+    yield db.DUCKDB_PATH
+    embedded.close_databases()
@@ -0,0 +1,41 @@
+"""Monthly analytics without a usable category_groups table"""
+
+import pytest
+from fastapi.testclient import TestClient
+from pymysql.cursors import DictCursor
+
+import analytics
+import api_upload
+import db
+
+
+@pytest.fixture
+def groups(duckdb_backend, monkeypatch):
+    monkeypatch.setattr(analytics, '_category_groups', None)
+    analytics.monthly_rollup.reset()
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        seeded = analytics.load_category_groups(cursor, refresh=True)
+    return seeded
+
+
+def reload(statement):
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        cursor.execute(statement)
+        conn.commit()
+        return analytics.load_category_groups(cursor, refresh=True)
+
+
+def test_builtin_groups_match_the_seed(groups):
+    assert len(groups['categories']) == len(analytics.BUILTIN_CATEGORY_GROUPS)
+    assert reload("DELETE FROM category_groups") == groups
+
+
+def test_monthly_works_without_the_table(groups):
+    assert reload("DROP TABLE category_groups") == groups
+    client = TestClient(api_upload.app)
+    csv = "Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n01/02/2024,01/03/2024,RENT,Housing,Sale,-900,\n"
+    assert client.post('/upload', files={'file': ('a.csv', csv)}).status_code == 200
+    response = client.get('/analytics/monthly')
+    assert response.status_code == 200
+    [housing] = response.json()['categoryBreakdown']
+    assert (housing['category'], housing['color'], housing['recommended']) == ('Housing', '#3b82f6', 30)
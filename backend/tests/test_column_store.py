@@ -0,0 +1,94 @@
+"""The in-memory column store must answer exactly like the SQL it replaces"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import analytics
+import api_upload
+import db
+import embedded
+import pipeline
+from column_store import ColumnStore
+
+ROWS = [
+    # transaction_date, post_date, description, category, type, amount
+    ('01/02/2024', '01/03/2024', 'COFFEE', 'Food', 'Sale', '-3.50'),
+    ('01/05/2024', '01/05/2024', 'GROCER', 'food', 'Sale', '-40.00'),
+    ('01/07/2024', '01/08/2024', 'KIOSK', '', 'Sale', '-2.00'),
+    ('01/09/2024', '01/09/2024', 'ATM', None, 'Sale', '-20.00'),
+    ('02/01/2024', '02/01/2024', 'RENT', 'Housing', 'Sale', '-1000.00'),
+    ('02/02/2024', '02/02/2024', 'PAYCHECK', None, 'Payment', '2500.00'),
+    ('02/03/2024', '02/03/2024', 'ODD', 'Fees', None, '-1.00'),
+    ('02/04/2024', '', 'PENDING', 'Food', 'Sale', '-9.99'),
+]
+
+PATHS = [
+    '/transactions',
+    '/transactions?category=food',
+    '/transactions?category=',
+    '/transactions?type=sale',
+    '/transactions?start=2024-01-05&end=2024-02-02',
+    '/analytics/daily',
+    '/analytics/monthly',
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_BACKEND', 'duckdb')
+    monkeypatch.setattr(db, 'DUCKDB_PATH', str(tmp_path / 'test.duckdb'))
+    monkeypatch.setattr(analytics, '_category_groups', None)
+    analytics.monthly_rollup.reset()
+    pipeline.create_schema()
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO transactions_staging (transaction_date, post_date, description, category, type, amount)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, ROWS)
+        conn.commit()
+    yield TestClient(api_upload.app)
+    embedded.close_databases()
+
+
+def responses(client, monkeypatch, store):
+    monkeypatch.setattr(api_upload, 'column_store', store)
+    analytics.monthly_rollup.reset()
+    return {path: client.get(path).json() for path in PATHS}
+
+
+def test_column_store_matches_sql(client, monkeypatch):
+    from_sql = responses(client, monkeypatch, ColumnStore(budget_mb=0))
+    from_columns = responses(client, monkeypatch, ColumnStore(budget_mb=64))
+    for path in PATHS:
+        assert from_columns[path] == from_sql[path], path
+
+
+def test_empty_category_is_not_uncategorized(client, monkeypatch):
+    responses(client, monkeypatch, ColumnStore(budget_mb=64))
+    monthly = client.get('/analytics/monthly').json()
+    assert monthly == responses(client, monkeypatch, ColumnStore(budget_mb=0))['/analytics/monthly']
+    assert [row['description'] for row in client.get('/transactions?category=').json()] == ['KIOSK']
+
+
+def test_customer_over_budget_reads_the_database(client, monkeypatch):
+    store = ColumnStore(budget_mb=64)
+    store.budget = 100      # bytes: nothing fits
+    from_sql = responses(client, monkeypatch, ColumnStore(budget_mb=0))
+    assert responses(client, monkeypatch, store) == from_sql
+    assert store.customers == {} and store.oversized == {0}
+
+
+def test_upload_appends_and_monthly_stays_incremental(client, monkeypatch):
+    store = ColumnStore(budget_mb=64)
+    responses(client, monkeypatch, store)
+    loaded = store.customers[0].length
+    csv = ("Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n"
+           "02/05/2024,02/06/2024,GROCER,FOOD,Sale,-12.25,\n"
+           "03/01/2024,03/01/2024,RENT,Housing,Sale,-1000.00,\n")
+    assert client.post('/upload', files={'file': ('march.csv', csv)}).status_code == 200
+    # Appended by the upload, and grouped into the monthly totals right away
+    assert store.customers[0].length == loaded + 2
+    assert store.customers[0].unmerged == []
+
+    monthly = client.get('/analytics/monthly').json()
+    assert monthly == responses(client, monkeypatch, ColumnStore(budget_mb=0))['/analytics/monthly']
@@ -0,0 +1,71 @@
+"""Bulk writes return the rows they wrote, in batches on MySQL"""
+
+import datetime
+
+import db
+from models import FxRate, MaintenanceState
+
+DAY = datetime.date(2024, 3, 1)
+
+
+def states(cursor):
+    cursor.execute("SELECT state_key, state_value FROM maintenance_state ORDER BY state_key")
+    return cursor.fetchall()
+
+
+def test_bulk_insert_counts_inserted_rows(duckdb_backend):
+    rows = [{'state_key': f'key{i}', 'state_value': str(i)} for i in range(5)]
+    with db.connection() as conn, conn.cursor() as cursor:
+        assert db.bulk_insert(conn, MaintenanceState.__table__, rows) == 5
+        assert db.bulk_insert(conn, MaintenanceState.__table__, []) == 0
+        # Existing keys are skipped and not counted
+        more = [{'state_key': 'key0', 'state_value': 'new'}, {'state_key': 'key5', 'state_value': '5'}]
+        assert db.bulk_insert(conn, MaintenanceState.__table__, more, ignore=True) == 1
+        conn.commit()
+        assert states(cursor)[0] == ('key0', '0')
+        assert len(states(cursor)) == 6
+
+
+def test_bulk_upsert_updates_existing_rows(duckdb_backend):
+    rate = {'rate_date': DAY, 'currency': 'EUR', 'rate': '0.9', 'source': 'first'}
+    with db.connection() as conn, conn.cursor() as cursor:
+        assert db.bulk_upsert(conn, FxRate.__table__, [rate]) == 1
+        rows = [dict(rate, rate='0.95', source='second'), dict(rate, currency='GBP', rate='0.8')]
+        assert db.bulk_upsert(conn, FxRate.__table__, rows, update_columns=['rate']) == 2
+        conn.commit()
+        cursor.execute("SELECT currency, rate, source FROM fx_rates ORDER BY currency")
+        assert [(currency, float(rate), source) for currency, rate, source in cursor.fetchall()] == [
+            ('EUR', 0.95, 'first'), ('GBP', 0.8, 'first')]
+
+
+class RecordingConnection:
+    """Collects the executemany batches the MySQL path sends"""
+
+    def __init__(self):
+        self.batches = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def executemany(self, sql, rows):
+        self.batches.append((sql, len(rows)))
+        return len(rows)
+
+
+def test_mysql_path_sends_compiled_batches():
+    conn = RecordingConnection()
+    rows = [{'state_key': f'key{i}', 'state_value': str(i)} for i in range(5)]
+    assert db.bulk_insert(conn, MaintenanceState.__table__, rows, batch_size=2, ignore=True) == 5
+    assert [size for _, size in conn.batches] == [2, 2, 1]
+    sql = conn.batches[0][0]
+    assert sql.startswith('INSERT IGNORE INTO maintenance_state') and '%(state_value)s' in sql
+
+    conn = RecordingConnection()
+    assert db.bulk_upsert(conn, MaintenanceState.__table__, rows) == 5
+    assert 'ON DUPLICATE KEY UPDATE state_value = VALUES(state_value)' in conn.batches[0][0]
@@ -0,0 +1,38 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from fx import NO_DATE, RateTable, day_number
+
+JAN_1 = day_number(datetime.date(2024, 1, 1))
+
+
+def table():
+    return RateTable([
+        (datetime.date(2024, 1, 2), 'EUR', '0.90'),
+        (datetime.date(2024, 1, 5), 'EUR', '0.80'),
+        (datetime.date(2024, 1, 2), 'JPY', '150'),
+    ])
+
+
+def test_same_currency_is_untouched():
+    assert table().factors('EUR', [JAN_1], target='EUR').tolist() == [1.0]
+
+
+def test_rates_carry_forward_over_missing_days():
+    days = np.array([JAN_1 + 1, JAN_1 + 3, JAN_1 + 4])   # Jan 2, Jan 4 (no rate), Jan 5
+    assert table().factors('EUR', days, target='USD') == pytest.approx([1 / 0.9, 1 / 0.9, 1 / 0.8])
+
+
+def test_cross_rates_go_through_usd():
+    assert table().factors('JPY', [JAN_1 + 1], target='EUR') == pytest.approx([0.9 / 150])
+
+
+def test_days_outside_the_table_use_the_nearest_rate():
+    days = np.array([JAN_1 - 30, JAN_1 + 30, NO_DATE])
+    assert table().factors('EUR', days, target='USD') == pytest.approx([1 / 0.9, 1 / 0.8, 1 / 0.8])
+
+
+def test_unknown_currency_is_not_converted():
+    assert table().factors('GBP', [JAN_1], target='USD').tolist() == [1.0]
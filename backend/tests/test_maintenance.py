@@ -0,0 +1,110 @@
+"""Archiving staging rows must not change a dashboard total, and restoring must not either"""
+
+import glob
+
+import pytest
+from fastapi.testclient import TestClient
+
+import analytics
+import api_upload
+import db
+import embedded
+import pipeline
+import run_04_maintenance
+from column_store import ColumnStore
+
+ROWS = [
+    # transaction_date, post_date, description, category, type, amount
+    ('01/02/2024', '01/03/2024', 'COFFEE', 'Food', 'Sale', '-3.50'),
+    ('01/05/2024', '01/05/2024', 'GROCER', 'food', 'Sale', '-40.00'),
+    ('01/07/2024', '01/08/2024', 'KIOSK', '', 'Sale', '-2.00'),
+    ('01/09/2024', '01/09/2024', 'ATM', None, 'Sale', '-20.00'),
+    ('02/01/2024', '02/01/2024', 'RENT', 'Housing', 'Sale', '-1000.00'),
+    ('02/02/2024', '02/02/2024', 'PAYCHECK', None, 'Payment', '2500.00'),
+    ('02/03/2024', '02/03/2024', 'ODD', 'Fees', None, '-1.00'),
+    ('02/04/2024', '', 'PENDING', 'Food', 'Sale', '-9.99'),
+    ('02/05/2024', '02/05/2024', 'BAD AMOUNT', 'Food', 'Sale', 'n/a'),
+    ('03/01/2024', '03/01/2024', 'NEWEST', 'Food', 'Sale', '-5.00'),
+]
+
+PATHS = ['/analytics/daily', '/analytics/monthly']
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_BACKEND', 'duckdb')
+    monkeypatch.setattr(db, 'DUCKDB_PATH', str(tmp_path / 'test.duckdb'))
+    monkeypatch.setattr(run_04_maintenance, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    monkeypatch.setattr(run_04_maintenance, 'STAGING_CHUNK', 4)
+    # archive_log's upsert needs MySQL (DuckDB can't pick one of its two unique keys)
+    monkeypatch.setattr(run_04_maintenance, 'log_archive', lambda cursor, *args: None)
+    monkeypatch.setattr(analytics, '_category_groups', None)
+    pipeline.create_schema()
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO transactions_staging (transaction_date, post_date, description, category, type, amount)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, ROWS)
+        conn.commit()
+    pipeline.transform()
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("UPDATE transactions_staging SET loaded_at = '2020-01-01'")
+        conn.commit()
+    yield TestClient(api_upload.app)
+    embedded.close_databases()
+
+
+def responses(client, monkeypatch, store):
+    """Dashboard responses of a freshly started API"""
+    monkeypatch.setattr(api_upload, 'column_store', store)
+    analytics.monthly_rollup.reset()
+    return {path: client.get(path).json() for path in PATHS}
+
+
+def staging_count():
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM transactions_staging")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.parametrize('budget_mb', [0, 64])
+def test_archive_and_restore_keep_the_totals(client, monkeypatch, budget_mb):
+    before = responses(client, monkeypatch, ColumnStore(budget_mb=budget_mb))
+
+    with db.connection() as conn:
+        archived = run_04_maintenance.archive_staging(conn, retention_days=30)
+    # Everything but the newest row, in chunks of STAGING_CHUNK ids
+    assert archived == len(ROWS) - 1
+    assert staging_count() == 1
+    files = sorted(glob.glob(f"{run_04_maintenance.ARCHIVE_DIR}/transactions_staging_*.csv.gz"))
+    assert len(files) == 3
+    assert responses(client, monkeypatch, ColumnStore(budget_mb=budget_mb)) == before
+
+    with db.connection() as conn:
+        for file_path in files:
+            run_04_maintenance.restore_archive(conn, file_path)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM staging_rollup")
+            assert cursor.fetchone()[0] == 0
+    assert staging_count() == len(ROWS)
+    assert responses(client, monkeypatch, ColumnStore(budget_mb=budget_mb)) == before
+
+
+def test_a_running_api_keeps_its_totals_across_archival(client, monkeypatch):
+    store = ColumnStore(budget_mb=64)
+    before = responses(client, monkeypatch, store)
+    with db.connection() as conn:
+        run_04_maintenance.archive_staging(conn, retention_days=30)
+    assert {path: client.get(path).json() for path in PATHS} == before
+
+
+def test_untransformed_and_recent_rows_stay(client):
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("UPDATE transactions_staging SET transformed_at = NULL WHERE description = 'RENT'")
+        cursor.execute("UPDATE transactions_staging SET loaded_at = CURRENT_TIMESTAMP WHERE description = 'ODD'")
+        conn.commit()
+        # Stops below the first untransformed row (the 5th)
+        assert run_04_maintenance.archive_staging(conn, retention_days=30) == 4
+        # Nothing new is past the cutoff or transformed yet
+        assert run_04_maintenance.archive_staging(conn, retention_days=30) == 0
+    assert staging_count() == len(ROWS) - 4
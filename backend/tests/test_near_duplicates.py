@@ -0,0 +1,103 @@
+import datetime
+
+import db
+import pipeline
+from near_duplicates import (
+    TRANSACTION_SCAN_SQL, DuplicateIndex, date_spellings, find_duplicates_sorted, make_record, parse_amount_cents,
+    parse_date, similarity, transaction_record,
+)
+
+HEADER = "Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n"
+COFFEE = "03/04/2024,03/05/2024,BLUE BOTTLE COFFEE,Food & Drink,Sale,-5.50,\n"
+
+
+def record(record_id, batch, transaction_date, post_date, description, amount='-5.50'):
+    return make_record(record_id, batch, 0, amount, transaction_date, post_date, description)
+
+
+def test_pending_and_posted_are_duplicates():
+    pending = record(1, 'march', '03/01/2024', '03/01/2024', 'SQ *BLUE BOTTLE')
+    posted = record(2, 'april', '03/01/2024', '03/03/2024', 'SQ *BLUE BOTTLE 0231')
+    assert similarity(pending, posted) is not None
+
+
+def test_date_moved_from_transaction_to_post_date():
+    a = record(1, 'march', '03/01/2024', '03/03/2024', 'BLUE BOTTLE COFFEE')
+    b = record(2, 'april', '03/03/2024', '03/04/2024', 'BLUE BOTTLE COFFEE')
+    assert similarity(a, b) == 1.0
+
+
+def test_repeat_purchase_in_another_statement_is_kept():
+    monday = record(1, 'march', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    wednesday = record(2, 'april', '03/06/2024', '03/07/2024', 'BLUE BOTTLE COFFEE')
+    assert similarity(monday, wednesday) is None
+
+
+def test_identical_rows_of_one_statement_are_kept():
+    first = record(1, 'march', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    second = record(2, 'march', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    assert similarity(first, second) is None
+
+
+def test_identical_rows_of_two_statements_are_exact_duplicates():
+    first = record(1, 'march', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    second = record(2, 'april', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    assert similarity(first, second) == 1.0
+
+
+def test_different_merchants_are_kept():
+    a = record(1, 'march', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE')
+    b = record(2, 'april', '03/04/2024', '03/05/2024', 'SHELL OIL 5712')
+    assert similarity(a, b) is None
+
+
+def test_amounts_block_by_cents():
+    assert parse_amount_cents('-5.5') == parse_amount_cents('-5.50') == -550
+    assert parse_amount_cents('$1,234.56') == 123456
+    assert parse_amount_cents('(100)') == -10000
+    assert parse_amount_cents('abc') is None
+
+
+def test_date_spellings_parse_back():
+    date = datetime.date(2024, 3, 4)
+    spellings = date_spellings(date)
+    assert {'03/04/2024', '3/4/2024', '2024-03-04'} <= spellings
+    assert {parse_date(spelling) for spelling in spellings} == {date}
+
+
+def test_duplicate_index_matches_only_its_block():
+    index = DuplicateIndex()
+    index.add(record(1, 'existing', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE'))
+    same = record('u1', 'upload', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE', amount='-5.5')
+    other_amount = record('u2', 'upload', '03/04/2024', '03/05/2024', 'BLUE BOTTLE COFFEE', amount='-6.50')
+    assert index.match(same)[1] == 1.0
+    assert index.match(other_amount) is None
+
+
+def test_find_duplicates_sorted():
+    records = [
+        record(1, 'a', '03/01/2024', '03/01/2024', 'SQ *BLUE BOTTLE'),
+        record(2, 'b', '03/01/2024', '03/03/2024', 'SQ *BLUE BOTTLE 0231'),
+        record(3, 'b', '03/08/2024', '03/09/2024', 'SQ *BLUE BOTTLE 0231'),
+    ]
+    assert [(kept.id, duplicate.id) for kept, duplicate, _ in find_duplicates_sorted(records)] == [(1, 2)]
+
+
+def test_overlapping_files_transformed_together_are_compared(duckdb_backend, tmp_path):
+    # March lists two identical coffees; the overlapping April download has one of them again
+    march = tmp_path / 'march.csv'
+    march.write_text(HEADER + COFFEE + COFFEE + "03/10/2024,03/11/2024,SHELL OIL 5712,Gas,Sale,-40.00,\n")
+    april = tmp_path / 'april.csv'
+    april.write_text(HEADER + COFFEE + "04/02/2024,04/03/2024,SHELL OIL 5712,Gas,Sale,-38.00,\n")
+    pipeline.load_files([str(march), str(april)], workers=1)
+    assert pipeline.transform() == (5, 0)
+
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(DISTINCT created_at), COUNT(DISTINCT batch_id) FROM transactions")
+        assert cursor.fetchone() == (1, 2)
+        cursor.execute(TRANSACTION_SCAN_SQL)
+        records = [transaction_record(*row) for row in cursor.fetchall()]
+    duplicates = list(find_duplicates_sorted(records))
+    assert len(duplicates) == 1
+    kept, duplicate, score = duplicates[0]
+    assert score == 1.0 and kept.batch != duplicate.batch
@@ -0,0 +1,57 @@
+"""Schema stage and resuming an interrupted import"""
+
+from pymysql.cursors import DictCursor
+
+import db
+import pipeline
+from analytics import BUILTIN_CATEGORY_GROUPS
+from models import Base
+
+HEADER = "Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n"
+
+
+def statement(path, *descriptions):
+    path.write_text(HEADER + "".join(f"03/0{i + 1}/2024,03/0{i + 1}/2024,{description},Shopping,Sale,-{i + 1}.00,\n"
+                                     for i, description in enumerate(descriptions)))
+    return str(path)
+
+
+def count(cursor, table):
+    cursor.execute(f"SELECT COUNT(*) as found FROM {table}")
+    return cursor.fetchone()['found']
+
+
+def test_schema_has_every_model_table_and_groups(duckdb_backend):
+    pipeline.create_schema()    # a second run changes nothing
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        for table in Base.metadata.tables:
+            assert db.table_exists(cursor, table), table
+        assert count(cursor, 'category_groups') == len(BUILTIN_CATEGORY_GROUPS)
+
+
+def test_load_resumes_from_the_file_checkpoints(duckdb_backend, tmp_path):
+    march = statement(tmp_path / 'march.csv', 'AMAZON', 'TARGET')
+    april = statement(tmp_path / 'april.csv', 'COSTCO')
+    assert pipeline.load_files([march], workers=1)['rows'] == 2
+    assert pipeline.transform() == (2, 0)
+
+    # Run again after adding a file: only the new one is loaded and transformed
+    stats = pipeline.load_files([march, april], workers=1)
+    assert (stats['files'], stats['rows'], stats['skipped']) == (1, 1, 1)
+    assert pipeline.transform() == (1, 0)
+    assert pipeline.transform() == (0, 0)
+
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        assert count(cursor, 'transactions_staging') == count(cursor, 'transactions') == 3
+        cursor.execute("SELECT stage, row_count FROM pipeline_files ORDER BY row_count")
+        assert cursor.fetchall() == [{'stage': 'transformed', 'row_count': 1}, {'stage': 'transformed', 'row_count': 2}]
+
+
+def test_transform_skips_rows_marked_before_a_crash(duckdb_backend, tmp_path):
+    pipeline.load_files([statement(tmp_path / 'march.csv', 'AMAZON', 'TARGET', 'COSTCO')], workers=1)
+    # Chunks of one row: pretend the run stopped after the first chunk
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("UPDATE transactions_staging SET transformed_at = CURRENT_TIMESTAMP "
+                       "WHERE staging_id = (SELECT MIN(staging_id) FROM transactions_staging)")
+        conn.commit()
+    assert pipeline.transform(chunk_size=1) == (2, 0)
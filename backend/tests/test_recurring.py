@@ -0,0 +1,110 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from pymysql.cursors import DictCursor
+
+import api_upload
+import db
+from recurring import RECENT_DATES, SCANNED_KEY, MerchantStats, classify, update_recurring
+
+TODAY = datetime.date(2024, 7, 1)
+
+
+def monthly(months, day=5):
+    return [datetime.date(2024, month, day) for month in months]
+
+
+def fold_all(dates, stats=None):
+    stats = stats or MerchantStats(0, 'netflix com')
+    for date in dates:
+        stats.fold(date, '-15.49', 'NETFLIX.COM')
+    return stats
+
+
+def test_in_order_charges_are_monthly():
+    stats = fold_all(monthly([1, 2, 3, 4, 5, 6]))
+    result = classify(stats, TODAY)
+    assert result['cadence'] == 'monthly'
+    assert result['occurrences'] == 6
+    assert result['firstDate'] == datetime.date(2024, 1, 5)
+    assert result['lastDate'] == datetime.date(2024, 6, 5)
+
+
+def test_backfilled_charges_add_intervals():
+    # April-June uploaded first, then the January-March statement
+    stats = fold_all(monthly([4, 5, 6]))
+    stats = fold_all(monthly([1, 2, 3]), stats)
+    in_order = fold_all(monthly([1, 2, 3, 4, 5, 6]))
+
+    assert stats.interval_count == in_order.interval_count == 5
+    assert stats.interval_mean == pytest.approx(in_order.interval_mean)
+    assert stats.interval_std() == pytest.approx(in_order.interval_std())
+    assert stats.first_date == datetime.date(2024, 1, 5)
+    assert stats.last_date == datetime.date(2024, 6, 5)
+    assert classify(stats, TODAY)['cadence'] == 'monthly'
+
+
+def test_backfill_survives_a_save():
+    stats = fold_all(monthly([4, 5, 6]))
+    row = {'customer_id': 0, 'merchant_key': 'netflix com', **stats.as_row()}
+    stats = fold_all(monthly([3]), MerchantStats.from_row(row))
+    assert stats.interval_count == 3
+    assert stats.recent_dates == monthly([3, 4, 5, 6])
+
+
+def test_recent_dates_are_bounded():
+    start = datetime.date(2020, 1, 1)
+    stats = fold_all([start + datetime.timedelta(days=7 * i) for i in range(RECENT_DATES + 10)])
+    assert len(stats.recent_dates) == RECENT_DATES
+    assert stats.recent_dates == sorted(stats.recent_dates)
+    assert classify(stats, stats.last_date)['cadence'] == 'weekly'
+
+
+def test_irregular_charges_are_not_recurring():
+    stats = fold_all([datetime.date(2024, 1, 1), datetime.date(2024, 1, 4), datetime.date(2024, 3, 20),
+                      datetime.date(2024, 4, 1)])
+    assert classify(stats, TODAY) is None
+
+
+def add_charges(cursor, charges, age_seconds=3600):
+    """charges: (transaction_id, month) pairs of a monthly Netflix bill"""
+    cursor.executemany(f"""
+        INSERT INTO transactions (transaction_id, transaction_date, description, amount, created_at)
+        VALUES (%s, %s, 'NETFLIX.COM', -15.49, CURRENT_TIMESTAMP - INTERVAL {age_seconds} SECOND)
+    """, [(transaction_id, datetime.date(2024, month, 5)) for transaction_id, month in charges])
+
+
+def netflix(cursor):
+    cursor.execute("SELECT occurrences, interval_count FROM recurring_merchants WHERE merchant_key = 'netflix com'")
+    return cursor.fetchone()
+
+
+def test_transaction_committed_out_of_order_is_folded_once(duckdb_backend):
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        add_charges(cursor, [(1, 1), (2, 2), (3, 3)])
+        # id 4 is still in flight when id 5 commits
+        add_charges(cursor, [(5, 5)], age_seconds=0)
+        conn.commit()
+        assert update_recurring(conn, batch_size=2) == 4
+        assert netflix(cursor) == {'occurrences': 4, 'interval_count': 3}
+
+        add_charges(cursor, [(4, 4)], age_seconds=0)
+        conn.commit()
+        assert update_recurring(conn) == 1
+        assert update_recurring(conn) == 0
+        assert netflix(cursor)['occurrences'] == 5
+
+
+def test_get_recurring_endpoint_only_reads(duckdb_backend):
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        add_charges(cursor, [(1, 1), (2, 2), (3, 3), (4, 4)])
+        conn.commit()
+        response = TestClient(api_upload.app).get('/recurring', params={'include_inactive': True})
+        assert response.status_code == 200 and response.json() == []
+        cursor.execute("SELECT COUNT(*) as found FROM maintenance_state WHERE state_key = %s", (SCANNED_KEY,))
+        assert cursor.fetchone()['found'] == 0
+
+        update_recurring(conn)
+    response = TestClient(api_upload.app).get('/recurring', params={'include_inactive': True})
+    assert [row['merchant'] for row in response.json()] == ['netflix com']
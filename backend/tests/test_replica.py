@@ -0,0 +1,84 @@
+"""Reads go to the replica only while it is fresh enough for the client"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_upload
+import db
+import pipeline
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A replica whose status check returns replica.result"""
+    monkeypatch.setattr(db, 'DB_BACKEND', 'mysql')
+    monkeypatch.setattr(db, 'REPLICA_HOST', 'replica.local')
+    monkeypatch.setattr(api_upload, 'REPLICA_HOST', 'replica.local')
+    monitor = db.ReplicaMonitor()
+    monitor.result = (0.0, None)
+    monitor.checks = 0
+
+    def check():
+        monitor.checks += 1
+        return monitor.result
+    monitor._check = check
+    monkeypatch.setattr(db, 'replica_monitor', monitor)
+    monkeypatch.setattr(api_upload, 'replica_monitor', monitor)
+    return monitor
+
+
+def test_fresh_replica_is_used(replica):
+    replica.result = (db.REPLICA_MAX_LAG, None)
+    assert db.use_replica()
+
+
+@pytest.mark.parametrize('result', [(db.REPLICA_MAX_LAG + 1, 'behind'), (None, 'replication is stopped')])
+def test_lagging_or_stopped_replica_falls_back_to_primary(replica, result):
+    replica.result = result
+    assert not db.use_replica()
+
+
+def test_recent_write_reads_from_primary(replica):
+    replica.result = (2.0, None)
+    assert not db.use_replica(last_write=time.time())
+    assert db.use_replica(last_write=time.time() - 10)
+
+
+def test_status_is_checked_once_per_interval(replica):
+    for _ in range(5):
+        db.use_replica()
+    assert replica.checks == 1
+    replica.checked_at -= db.LAG_CHECK_INTERVAL
+    db.use_replica()
+    assert replica.checks == 2
+
+
+def test_status_endpoint_follows_the_write_cookie(replica):
+    client = TestClient(api_upload.app)
+    assert client.get('/database/status').json()['readsFrom'] == 'replica'
+    client.cookies.set(api_upload.LAST_WRITE_COOKIE, f"{time.time():.3f}")
+    assert client.get('/database/status').json()['readsFrom'] == 'primary'
+
+
+def test_cors_allows_credentials_for_listed_origins_only():
+    client = TestClient(api_upload.app)
+    preflight = {'Access-Control-Request-Method': 'GET'}
+    allowed = client.options('/transactions', headers={'Origin': db.CORS_ORIGINS[0], **preflight})
+    assert allowed.headers['access-control-allow-origin'] == db.CORS_ORIGINS[0]
+    assert allowed.headers['access-control-allow-credentials'] == 'true'
+    refused = client.options('/transactions', headers={'Origin': 'https://evil.example', **preflight})
+    assert 'access-control-allow-origin' not in refused.headers
+
+
+def test_upload_sets_the_write_cookie(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_BACKEND', 'duckdb')
+    monkeypatch.setattr(db, 'DUCKDB_PATH', str(tmp_path / 'test.duckdb'))
+    pipeline.create_schema()
+    client = TestClient(api_upload.app)
+    csv = "Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n01/02/2024,01/03/2024,COFFEE,Food,Sale,-3.50,\n"
+    before = time.time()
+    response = client.post('/upload', files={'file': ('a.csv', csv)})
+    assert response.status_code == 200
+    assert float(response.cookies[api_upload.LAST_WRITE_COOKIE]) >= before - 1
@@ -0,0 +1,36 @@
+"""Search terms match as word prefixes; short words never scan the table"""
+
+import pytest
+from fastapi.testclient import TestClient
+from pymysql.cursors import DictCursor
+
+import api_upload
+import db
+from search import _fulltext_query, boolean_query, search_transactions
+
+
+def test_boolean_query_keeps_short_words_apart():
+    assert boolean_query('Whole Foods #10') == ('+whole* +foods*', ['10'])
+
+
+def test_short_words_are_word_prefixes_on_mysql():
+    where, params, _, _ = _fulltext_query('shell bp')
+    assert params == ['+shell*', 'bp%', '% bp%', 'bp%', '% bp%']
+    assert len(where) == 2 and 'LIKE' in where[1]
+
+
+def test_only_short_words_are_rejected(duckdb_backend):
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        with pytest.raises(ValueError):
+            search_transactions(cursor, 'bp 10')
+    response = TestClient(api_upload.app).get('/transactions/search', params={'q': 'bp 10'})
+    assert response.status_code == 400
+
+
+def test_short_word_matches_the_start_of_a_word(duckdb_backend):
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        cursor.executemany("INSERT INTO transactions_staging (description, amount) VALUES (%s, '-40.00')",
+                           [('SHELL BP 5712',), ('SHELL SUBPAR',), ('CHEVRON',)])
+        conn.commit()
+        total, rows = search_transactions(cursor, 'shell bp')
+    assert total == 1 and rows[0]['description'] == 'SHELL BP 5712'
@@ -0,0 +1,98 @@
+"""JSON encoding and Accept-Encoding negotiation of the large responses"""
+
+import datetime
+import decimal
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import api_upload
+import serialization
+from serialization import FORMAT_COLUMNS, choose_encoding, columns_payload, dumps, fast_json_response
+
+try:
+    import brotli
+except ImportError:  # optional, like in serialization.py
+    brotli = None
+needs_brotli = pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+
+
+def request(accept_encoding=None):
+    headers = [(b'accept-encoding', accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({'type': 'http', 'headers': headers})
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('', None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('gzip, deflate, br', 'br'),            # a tie goes to brotli
+    ('br;q=0.5, gzip', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('*', 'br'),
+    ('GZIP;q=0.8, deflate', 'gzip'),
+])
+def test_choose_encoding(header, expected, monkeypatch):
+    # Only whether brotli is available matters here
+    monkeypatch.setattr(serialization, 'brotli', brotli or object())
+    assert choose_encoding(header) == expected
+
+
+def test_without_brotli_gzip_is_used(monkeypatch):
+    monkeypatch.setattr(serialization, 'brotli', None)
+    assert choose_encoding('br') is None
+    assert choose_encoding('br, gzip') == 'gzip'
+    assert choose_encoding('*') == 'gzip'
+
+
+def test_stdlib_fallback_encodes_like_orjson(monkeypatch):
+    payload = {'amount': decimal.Decimal('-12.50'), 'date': datetime.date(2024, 1, 2),
+               'at': datetime.datetime(2024, 1, 2, 3, 4, 5), 'name': 'Café'}
+    fast = json.loads(dumps(payload))
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert json.loads(dumps(payload)) == fast == {
+        'amount': -12.5, 'date': '2024-01-02', 'at': '2024-01-02T03:04:05', 'name': 'Café'}
+
+
+def test_columns_payload():
+    rows = [(1, 'A'), (2, 'B')]
+    assert columns_payload(('id', 'name'), rows) == [{'id': 1, 'name': 'A'}, {'id': 2, 'name': 'B'}]
+    assert columns_payload(('id', 'name'), rows, FORMAT_COLUMNS) == {'columns': ['id', 'name'], 'rows': rows}
+
+
+def test_small_responses_are_not_compressed():
+    response = fast_json_response(request('gzip'), {'ok': True})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert json.loads(response.body) == {'ok': True}
+
+
+@pytest.mark.parametrize('header, encoding, decompress', [
+    ('gzip', 'gzip', gzip.decompress),
+    pytest.param('br, gzip', 'br', lambda body: brotli.decompress(body), marks=needs_brotli),
+    (None, None, lambda body: body),
+])
+def test_large_responses_are_compressed(header, encoding, decompress):
+    payload = [{'id': i, 'description': f'ROW {i}'} for i in range(200)]
+    response = fast_json_response(request(header), payload)
+    assert response.headers.get('content-encoding') == encoding
+    assert json.loads(decompress(response.body)) == payload
+
+
+def test_endpoint_negotiates(duckdb_backend):
+    client = TestClient(api_upload.app)
+    lines = ["Transaction Date,Post Date,Description,Category,Type,Amount,Memo"]
+    lines += [f"01/{day:02d}/2024,01/{day:02d}/2024,SHOP {day},Shopping,Sale,-{day}.25," for day in range(1, 29)]
+    assert client.post('/upload', files={'file': ('a.csv', "\n".join(lines) + "\n")}).status_code == 200
+
+    plain = client.get('/transactions', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    for header, encoding in (('gzip', 'gzip'), ('br', 'br') if brotli else ('gzip', 'gzip')):
+        response = client.get('/transactions', headers={'Accept-Encoding': header})
+        assert response.headers['content-encoding'] == encoding
+        assert response.json() == plain.json()
+    columns = client.get('/transactions?format=columns').json()
+    assert columns['columns'][:2] == ['id', 'name'] and len(columns['rows']) == 28
@@ -0,0 +1,79 @@
+"""Chunked uploads: retries, idempotency-key replays and finished sessions change nothing"""
+
+from fastapi.testclient import TestClient
+
+import api_upload
+import db
+
+HEADER = "Transaction Date,Post Date,Description,Category,Type,Amount,Memo\n"
+COFFEE = "03/04/2024,03/05/2024,BLUE BOTTLE COFFEE,Food & Drink,Sale,-5.50,\n"
+GAS = "03/10/2024,03/11/2024,SHELL OIL 5712,Gas,Sale,-40.00,\n"
+
+
+def staging_rows():
+    with db.connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM transactions_staging")
+        return cursor.fetchone()[0]
+
+
+def start(client, key='statement-1', total_chunks=2):
+    response = client.post('/upload/sessions', params={'total_chunks': total_chunks},
+                           headers={'Idempotency-Key': key})
+    assert response.status_code == 200
+    return response.json()
+
+
+def put(client, upload_id, index, text):
+    return client.put(f'/upload/sessions/{upload_id}/chunks/{index}', content=text.encode())
+
+
+def test_chunks_in_order_and_retried(duckdb_backend):
+    client = TestClient(api_upload.app)
+    upload_id = start(client)['uploadId']
+
+    response = put(client, upload_id, 1, GAS)
+    assert response.status_code == 409 and response.json()['detail']['nextChunk'] == 0
+
+    assert put(client, upload_id, 0, HEADER + COFFEE).json()['nextChunk'] == 1
+    # A retry of a committed chunk (e.g. the response got lost) imports nothing
+    retry = put(client, upload_id, 0, HEADER + COFFEE).json()
+    assert (retry['nextChunk'], retry['imported']) == (1, 1)
+    assert staging_rows() == 1
+
+    # The same row again in the next chunk is part of the same statement, so it is kept
+    done = put(client, upload_id, 1, COFFEE + GAS).json()
+    assert (done['complete'], done['imported'], done['duplicates']) == (True, 3, 0)
+    assert staging_rows() == 3
+
+
+def test_same_idempotency_key_resumes_the_session(duckdb_backend):
+    client = TestClient(api_upload.app)
+    first = start(client)
+    put(client, first['uploadId'], 0, HEADER + COFFEE)
+
+    again = start(client)
+    assert (again['uploadId'], again['nextChunk']) == (first['uploadId'], 1)
+    response = client.post('/upload/sessions', params={'total_chunks': 3}, headers={'Idempotency-Key': 'statement-1'})
+    assert response.status_code == 409
+
+
+def test_plain_upload_replay_returns_the_first_result(duckdb_backend):
+    client = TestClient(api_upload.app)
+    upload = {'files': {'file': ('march.csv', HEADER + COFFEE + GAS)}, 'headers': {'Idempotency-Key': 'march'}}
+    first = client.post('/upload', **upload).json()
+    replay = client.post('/upload', **upload).json()
+    assert first == replay and first['imported'] == 2
+    assert staging_rows() == 2
+
+
+def test_completed_session_is_a_no_op(duckdb_backend):
+    client = TestClient(api_upload.app)
+    upload_id = start(client, total_chunks=1)['uploadId']
+    finished = put(client, upload_id, 0, HEADER + COFFEE + GAS).json()
+    assert finished['complete']
+
+    for index, text in ((0, HEADER + COFFEE + GAS), (0, HEADER + "not, a, statement\n"), (5, GAS)):
+        response = put(client, upload_id, index, text)
+        assert response.status_code == 200 and response.json() == finished
+    assert start(client, total_chunks=1) == finished
+    assert staging_rows() == 2
@@ -0,0 +1,68 @@
+"""Incremental staging reads: no row missed, none read twice"""
+
+from pymysql.cursors import DictCursor
+
+import db
+from watermark import StagingWatermark, id_runs
+
+
+def insert(cursor, ids, age_seconds=0):
+    cursor.executemany(f"""
+        INSERT INTO transactions_staging (staging_id, description, amount, loaded_at)
+        VALUES (%s, 'ROW', '-1.00', CURRENT_TIMESTAMP - INTERVAL {age_seconds} SECOND)
+    """, [(staging_id,) for staging_id in ids])
+
+
+def read(cursor, watermark):
+    window = watermark.window(cursor)
+    ids = []
+    if window.condition:
+        cursor.execute(f"SELECT staging_id FROM transactions_staging WHERE {window.condition} ORDER BY staging_id",
+                       window.params)
+        ids = [row['staging_id'] for row in cursor.fetchall()]
+    watermark.advance(window)
+    return window, ids
+
+
+def test_id_runs():
+    assert id_runs([]) == []
+    assert id_runs([3, 4, 5, 7, 9, 10]) == [(3, 5), (7, 7), (9, 10)]
+
+
+def test_gap_holds_back_without_growing_the_query(duckdb_backend):
+    watermark = StagingWatermark()
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        insert(cursor, range(1, 6), age_seconds=3600)
+        assert read(cursor, watermark)[1] == [1, 2, 3, 4, 5]
+        assert (watermark.through, watermark.pending) == (5, [])
+
+        # id 6 is still in flight; a big load behind it commits first
+        insert(cursor, range(7, 1007))
+        assert read(cursor, watermark)[1] == list(range(7, 1007))
+        assert (watermark.through, watermark.pending) == (5, [(7, 1006)])
+
+        insert(cursor, [1007])
+        window, ids = read(cursor, watermark)
+        assert ids == [1007]
+        assert len(window.params) == 4
+        assert watermark.pending == [(7, 1007)]
+
+        # The late row is read once, then nothing is pending
+        insert(cursor, [6])
+        assert read(cursor, watermark)[1] == [6]
+        assert (watermark.through, watermark.pending) == (1007, [])
+        assert read(cursor, watermark)[1] == []
+
+
+def test_rolled_back_gap_is_passed_once_it_is_old(duckdb_backend):
+    watermark = StagingWatermark()
+    with db.connection() as conn, conn.cursor(DictCursor) as cursor:
+        insert(cursor, [1, 2, 4, 5, 8])
+        assert read(cursor, watermark)[1] == [1, 2, 4, 5, 8]
+        assert (watermark.through, watermark.pending) == (2, [(4, 5), (8, 8)])
+
+        cursor.execute("UPDATE transactions_staging SET loaded_at = CURRENT_TIMESTAMP - INTERVAL 3600 SECOND "
+                       "WHERE staging_id <= 5")
+        insert(cursor, [9])
+        assert read(cursor, watermark)[1] == [9]
+        assert (watermark.through, watermark.pending) == (5, [(8, 9)])
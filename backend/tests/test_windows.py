@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+from windows import TOTAL, WindowedMetrics
+
+
+def metrics(amounts, first_day=None):
+    """{month_key: {series: amount}} -> WindowedMetrics"""
+    windows = WindowedMetrics()
+    for month_key, series in amounts.items():
+        for name, amount in series.items():
+            windows.add(month_key, name, amount, first_day)
+    return windows
+
+
+def test_window_sum_is_a_prefix_difference():
+    windows = metrics({'2024-01': {'food': -10.0}, '2024-02': {'food': -20.0}, '2024-04': {'rent': -1000.0}})
+    assert windows.months == ['2024-01', '2024-02', '2024-03', '2024-04']
+    assert windows.window_sum('food', 1, 2) == -30.0
+    assert windows.window_sum('food', 3, 3) == -20.0
+    assert windows.window_sum(TOTAL, 3, 12) == -1030.0
+    assert windows.window_sum('food', 9, 1) == 0.0
+    assert windows.moving_average('food', 3) == pytest.approx(20 / 3)
+
+
+def test_backfilled_month_shifts_the_axis():
+    windows = metrics({'2024-03': {'food': -30.0}})
+    windows.add('2023-12', 'food', -12.0)
+    assert windows.months == ['2023-12', '2024-01', '2024-02', '2024-03']
+    assert windows.window_sum('food', 3, 4) == -42.0
+    assert windows.window_sum('food', 0, 1) == -12.0
+
+
+def test_this_month_is_the_calendar_month():
+    windows = metrics({'2024-03': {'food': -31.0}, '2024-04': {'food': -30.0}})
+    snapshot = windows.snapshot(datetime.date(2024, 4, 10))
+    assert snapshot['month'] == '2024-04'
+    assert snapshot['thisMonthTotal'] == 30.0
+    assert snapshot['lastMonthTotal'] == 31.0
+
+    # No data this month or last month: zeros, not the last months with data
+    snapshot = windows.snapshot(datetime.date(2024, 7, 1))
+    assert snapshot['month'] == '2024-07'
+    assert snapshot['thisMonthTotal'] == snapshot['lastMonthTotal'] == snapshot['differenceAmount'] == 0.0
+
+
+def test_daily_average_starts_at_the_first_data_day():
+    windows = WindowedMetrics()
+    windows.add('2024-03', 'food', -31.0, datetime.date(2024, 3, 15))
+    windows.add('2024-04', 'food', -30.0, datetime.date(2024, 4, 2))
+    snapshot = windows.snapshot(datetime.date(2024, 4, 10))
+    # March 15-31 and April 1-10
+    assert snapshot['dailyAverage'] == pytest.approx(61 / 27)
+    assert snapshot['dailyAverageChange'] == pytest.approx(30 / 10 - 31 / 17)
+
+
+def test_empty():
+    snapshot = WindowedMetrics().snapshot(datetime.date(2024, 4, 10))
+    assert snapshot['thisMonthTotal'] == snapshot['dailyAverage'] == 0.0
+    assert snapshot['averages'] == {}
@@ -0,0 +1,217 @@
+"""
+uploads.py - CSV upload import and resumable chunked uploads
+
+WHAT THIS DOES:
+  import_rows() is what /upload does with a parsed file: skip rows that are
+  already in transactions_staging (exact or near duplicates) and insert the
+  rest.
+
+  Chunked uploads (upload_sessions, DatabaseMySQL/10_upload_sessions.sql)
+  let a client send a large file in pieces over a flaky connection:
+  1. POST /upload/sessions with an Idempotency-Key header and total_chunks
+     -> uploadId and nextChunk (0 for a new upload)
+  2. PUT /upload/sessions/{uploadId}/chunks/{n} for n = nextChunk, ...
+     Chunk 0 starts with the CSV header line; every chunk ends on a line
+     boundary. Each chunk's rows are committed together with chunks_done,
+     so a chunk is imported exactly once. The rows are stored with the
+     upload id, so later chunks don't treat earlier ones as an older
+     statement in the duplicate check. (A plain /upload gets an upload id
+     of its own, which remove_duplicates.py uses the same way.)
+  3. After a failure, POST the same Idempotency-Key again (or GET the
+     session) and continue at nextChunk.
+
+  Chunks that were already committed, and anything sent for a finished
+  upload, are answered from the session row without parsing or querying
+  staging.
+"""
+
+import datetime
+import uuid
+
+from pymysql.cursors import DictCursor
+
+from db import bulk_insert
+from models import TransactionStaging
+from near_duplicates import WINDOW_DAYS, DuplicateIndex, date_spellings, make_record
+from statements import as_dicts, parse_text
+
+# Date spellings per candidate lookup when checking an upload for duplicates
+CANDIDATE_CHUNK = 1000
+
+OPEN = 'open'
+COMPLETE = 'complete'
+
+SESSION_COLUMNS = """
+    upload_id, idempotency_key, file_name, header, total_chunks, chunks_done, status,
+    inserted_count, skipped_count, near_duplicate_count
+"""
+
+
+class ChunkOutOfOrder(Exception):
+    """A chunk arrived before the ones in front of it were committed"""
+
+    def __init__(self, next_chunk):
+        super().__init__(f"Expected chunk {next_chunk}")
+        self.next_chunk = next_chunk
+
+
+def load_candidates(cursor, index, records):
+    """Add the staging rows that can duplicate records to index
+
+    Only transaction dates within WINDOW_DAYS of a date in records are read
+    (idx_staging_transaction_date), in every spelling a statement may use.
+    Of those, rows are kept if their amount in cents matches one of
+    records, however it is written ('-5.5' and '-5.50' are the same).
+    """
+    days = sorted({ordinal + offset for record in records for ordinal in record.dates
+                   for offset in range(-WINDOW_DAYS, WINDOW_DAYS + 1)})
+    spellings = sorted({spelling for day in days for spelling in date_spellings(datetime.date.fromordinal(day))})
+    amounts = {record.amount_cents for record in records}
+    for start in range(0, len(spellings), CANDIDATE_CHUNK):
+        chunk = spellings[start:start + CANDIDATE_CHUNK]
+        cursor.execute(f"""
+            SELECT staging_id, transaction_date, post_date, description, amount, upload_id
+            FROM transactions_staging
+            WHERE transaction_date IN ({', '.join(['%s'] * len(chunk))})
+        """, chunk)
+        for existing in cursor.fetchall():
+            record = make_record(existing['staging_id'], existing['upload_id'] or 'existing', 0, existing['amount'],
+                                 existing['transaction_date'], existing['post_date'], existing['description'])
+            if record.amount_cents in amounts:
+                index.add(record)
+
+
+def import_rows(conn, parsed_rows, upload_id=None):
+    """Insert the parsed rows that aren't duplicates. Does not commit.
+
+    upload_id marks the rows as part of a chunked upload (see above); a
+    plain upload gets a new one. Returns (inserted, skipped, near_duplicates).
+    """
+    upload_id = upload_id or uuid.uuid4().hex
+    skipped_count = 0
+    near_duplicate_count = 0
+    with conn.cursor(DictCursor) as cursor:
+        # Load the only rows that can be duplicates (see load_candidates).
+        # Everything else is matched in memory, no query per row.
+        records = [make_record(f"upload-{i}", upload_id, 0, row[5], row[0], row[1], row[2])
+                   for i, row in enumerate(parsed_rows)]
+        index = DuplicateIndex()
+        load_candidates(cursor, index, records)
+
+        new_rows = []
+        for row, record in zip(parsed_rows, records):
+            match = index.match(record)
+            if match:
+                # Skip this transaction as it already exists
+                if match[1] == 1.0:
+                    skipped_count += 1
+                else:
+                    near_duplicate_count += 1
+                continue
+            index.add(record)
+            new_rows.append(row)
+
+    # Insert transactions into staging table (multi-row batches)
+    new_rows = as_dicts(new_rows)
+    for row in new_rows:
+        row['upload_id'] = upload_id
+    bulk_insert(conn, TransactionStaging.__table__, new_rows)
+    return len(new_rows), skipped_count, near_duplicate_count
+
+
+def result_message(inserted_count, skipped_count, near_duplicate_count):
+    message = f"CSV uploaded successfully. {inserted_count} transactions imported."
+    if skipped_count > 0:
+        message += f" {skipped_count} duplicate(s) skipped."
+    if near_duplicate_count > 0:
+        message += f" {near_duplicate_count} near-duplicate(s) skipped (same amount, similar description and date)."
+    return message
+
+
+# ============================================================================
+# Chunked upload sessions
+# ============================================================================
+
+def get_session(cursor, upload_id=None, idempotency_key=None):
+    """One session row (dict cursor) by id or by idempotency key, or None"""
+    column, value = ('upload_id', upload_id) if upload_id is not None else ('idempotency_key', idempotency_key)
+    cursor.execute(f"SELECT {SESSION_COLUMNS} FROM upload_sessions WHERE {column} = %s", (value,))
+    return cursor.fetchone()
+
+
+def open_session(conn, idempotency_key, total_chunks, file_name=None):
+    """The session for idempotency_key, created if it is new"""
+    with conn.cursor(DictCursor) as cursor:
+        session = get_session(cursor, idempotency_key=idempotency_key)
+        if session is None:
+            # IGNORE: a concurrent request with the same key may get there first
+            cursor.execute("""
+                INSERT IGNORE INTO upload_sessions (upload_id, idempotency_key, file_name, total_chunks)
+                VALUES (%s, %s, %s, %s)
+            """, (uuid.uuid4().hex, idempotency_key, file_name, total_chunks))
+            conn.commit()
+            session = get_session(cursor, idempotency_key=idempotency_key)
+    if session['total_chunks'] != total_chunks:
+        raise ValueError(f"Idempotency-Key {idempotency_key!r} belongs to an upload of "
+                         f"{session['total_chunks']} chunk(s)")
+    return session
+
+
+def is_done(session, index):
+    """True if chunk index needs no work (already committed, or upload finished)"""
+    return session['status'] == COMPLETE or index < session['chunks_done']
+
+
+def save_chunk(conn, session, index, text):
+    """Import chunk index of session and commit it; returns the updated session.
+
+    Raises ChunkOutOfOrder if earlier chunks are missing and ValueError for
+    a chunk number past the end.
+    """
+    if is_done(session, index):
+        return session
+    if index >= session['total_chunks']:
+        raise ValueError(f"Chunk {index} is past the last chunk ({session['total_chunks'] - 1})")
+    if index != session['chunks_done']:
+        raise ChunkOutOfOrder(session['chunks_done'])
+
+    header = session['header']
+    if index == 0:
+        header, _, text = text.partition('\n')
+        header = header.rstrip('\r')
+    inserted, skipped, near_duplicates = import_rows(conn, parse_text(header + '\n' + text), session['upload_id'])
+
+    status = COMPLETE if index + 1 == session['total_chunks'] else OPEN
+    with conn.cursor(DictCursor) as cursor:
+        # Only counts if nobody committed this chunk in the meantime (a retry
+        # racing the original request); MySQL holds the row lock until commit
+        cursor.execute("""
+            UPDATE upload_sessions
+            SET chunks_done = %s, status = %s, header = %s,
+                inserted_count = inserted_count + %s,
+                skipped_count = skipped_count + %s,
+                near_duplicate_count = near_duplicate_count + %s
+            WHERE upload_id = %s AND chunks_done = %s
+        """, (index + 1, status, header, inserted, skipped, near_duplicates, session['upload_id'], index))
+        if cursor.rowcount != 1:
+            conn.rollback()
+        else:
+            conn.commit()
+        return get_session(cursor, upload_id=session['upload_id'])
+
+
+def session_payload(session):
+    """API response for a session"""
+    counts = (session['inserted_count'], session['skipped_count'], session['near_duplicate_count'])
+    return {
+        "success": True,
+        "uploadId": session['upload_id'],
+        "totalChunks": session['total_chunks'],
+        "nextChunk": session['chunks_done'],
+        "complete": session['status'] == COMPLETE,
+        "imported": counts[0],
+        "duplicates": counts[1],
+        "nearDuplicates": counts[2],
+        "message": result_message(*counts) if session['status'] == COMPLETE
+                   else f"{session['chunks_done']} of {session['total_chunks']} chunk(s) received."
+    }
@@ -5,22 +5,12 @@ HOW TO RUN:
   .\.venv\Scripts\python.exe backend/view_transactions.py
 """
 
-import pymysql
+from db import get_engine
 from tabulate import tabulate
 
-# MySQL connection
-MYSQL_USER = "root"
-MYSQL_PASSWORD = "ABGdbgcoldstone67@"
-MYSQL_HOST = "localhost"
-MYSQL_DATABASE = "fintrack"
-
+# MySQL connection (settings from the environment / .env, see db.py)
 try:
-    conn = pymysql.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE
-    )
+    conn = get_engine().raw_connection()
     cursor = conn.cursor()
 except Exception as e:
     print(f"✗ Connection failed: {e}")
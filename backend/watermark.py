@@ -0,0 +1,166 @@
+"""
+watermark.py - Incremental reads of a growing table that miss no rows
+
+WHAT THIS DOES:
+  The API's in-process caches (analytics.MonthlyRollup and
+  column_store.ColumnStore) only read staging rows they haven't seen, and
+  the recurring-charge detector (recurring.py) only reads new
+  transactions. A plain "staging_id > last MAX(staging_id)" watermark
+  loses rows: two uploads (or two pipeline workers) take ids 10 and 11,
+  the one with 11 commits first, a reader sees MAX = 11 and moves past 10
+  before it is committed. Row 10 is then never read.
+
+  Watermark holds back at the first missing id instead
+  (StagingWatermark for transactions_staging, TransactionsWatermark for
+  transactions):
+  - `through` is the highest id below which nothing can still appear
+  - rows above it that were already read are kept in `pending` as runs of
+    consecutive ids and left out of the next read with NOT BETWEEN, so
+    nothing is counted twice. A 100k-row load behind one rolled-back id
+    is a single run (two parameters), not 100k
+  - a missing id stops counting as "maybe in flight" once a committed row
+    with a HIGHER id is older than COMMIT_GRACE_SECONDS (ids are handed
+    out in order, so the transaction holding the missing id would have
+    been open longer than that). Rolled-back inserts leave such gaps for
+    good; they only delay the watermark, never block it.
+
+  In the usual case (no gaps) this is the old range read plus two lookups
+  on the primary key over the new ids only, and `pending` stays empty.
+
+  A reader that keeps its position in the database instead of in memory
+  (recurring.py) saves state() and restores it with load_state(), and
+  reads in batches with advance(window, read_through=last id read).
+
+HOW TO USE:
+  window = watermark.window(cursor)            # DictCursor
+  if window.condition:
+      cursor.execute(f"SELECT ... WHERE {window.condition}", window.params)
+      ...
+  watermark.advance(window)
+
+  The lookups and the read must run in one transaction (the default for
+  db.connection()), so they all see the same committed rows.
+"""
+
+from collections import namedtuple
+
+# Longest time an insert may stay uncommitted
+COMMIT_GRACE_SECONDS = 300
+
+# max_id: MAX(id) now; condition / params: the rows to read (None if
+# nothing is new); young_runs: (first, last) runs of the ids above
+# settled_id (may still have gaps below them); settled_id: every id up to
+# it is committed or never will be
+Window = namedtuple('Window', 'max_id condition params young_runs settled_id')
+
+
+def id_runs(ids):
+    """Sorted ids -> [(first, last), ...], one pair per run of consecutive ids"""
+    runs = []
+    for row_id in ids:
+        if runs and row_id == runs[-1][1] + 1:
+            runs[-1][1] = row_id
+        else:
+            runs.append([row_id, row_id])
+    return [tuple(run) for run in runs]
+
+
+class Watermark:
+    """How far an incremental reader got through a table"""
+
+    # Set by the subclasses: the table, its AUTO_INCREMENT id and its insert time
+    table = id_column = time_column = None
+
+    def __init__(self, grace_seconds=COMMIT_GRACE_SECONDS):
+        self.grace_seconds = int(grace_seconds)
+        self.reset()
+
+    def reset(self):
+        self.through = 0        # every id <= through was read or will never exist
+        self.pending = []       # sorted (first, last) runs of ids > through that were read already
+
+    def window(self, cursor):
+        """What to read next (cursor must be a DictCursor)"""
+        max_id = self.max_id(cursor)
+        if max_id <= self.through:
+            return Window(max_id, None, {}, (), self.through)
+
+        settled_id = self.settled_id(cursor, max_id)
+        young_runs = ()
+        if settled_id < max_id:
+            cursor.execute(f"""
+                SELECT {self.id_column} as row_id FROM {self.table}
+                WHERE {self.id_column} > %s AND {self.id_column} <= %s
+                ORDER BY {self.id_column}
+            """, (settled_id, max_id))
+            young_runs = id_runs(row['row_id'] for row in cursor.fetchall())
+
+        condition = f"{self.id_column} > %(after_id)s AND {self.id_column} <= %(through_id)s"
+        params = {'after_id': self.through, 'through_id': max_id}
+        for i, (first, last) in enumerate(self.pending):
+            condition += f" AND {self.id_column} NOT BETWEEN %(read_{i}_first)s AND %(read_{i}_last)s"
+            params[f'read_{i}_first'] = first
+            params[f'read_{i}_last'] = last
+        return Window(max_id, condition, params, young_runs, settled_id)
+
+    def max_id(self, cursor):
+        cursor.execute(f"SELECT COALESCE(MAX({self.id_column}), 0) as max_id FROM {self.table}")
+        return cursor.fetchone()['max_id']
+
+    def settled_id(self, cursor, max_id):
+        """Newest id up to max_id that is older than the grace period (at
+        least `through`); nothing below it is still in flight"""
+        cursor.execute(f"""
+            SELECT COALESCE(MAX({self.id_column}), 0) as settled_id
+            FROM {self.table}
+            WHERE {self.id_column} > %s AND {self.id_column} <= %s
+            AND ({self.time_column} IS NULL
+                 OR {self.time_column} < CURRENT_TIMESTAMP - INTERVAL {self.grace_seconds} SECOND)
+        """, (self.through, max_id))
+        return max(cursor.fetchone()['settled_id'], self.through)
+
+    def advance(self, window, read_through=None):
+        """Record that the rows of window were read (only those up to
+        read_through, if the read stopped early)"""
+        if window.condition is None:
+            return
+        through = window.settled_id
+        young_runs = window.young_runs
+        if read_through is not None:
+            through = max(min(through, read_through), self.through)
+            young_runs = [(first, min(last, read_through)) for first, last in young_runs if first <= read_through]
+        pending = []
+        # Every young id was either read now or is pending already
+        for first, last in sorted(self.pending + list(young_runs)):
+            if last <= through:
+                continue
+            first = max(first, through + 1)
+            if not pending and first == through + 1:
+                through = last          # nothing missing below this run any more
+            elif pending and first <= pending[-1][1] + 1:
+                pending[-1] = (pending[-1][0], max(pending[-1][1], last))
+            else:
+                pending.append((first, last))
+        self.through = through
+        self.pending = pending
+
+    def state(self):
+        """through and pending as one string, e.g. '1200;1205-1210' (for maintenance_state)"""
+        return ';'.join([str(self.through)] + [f"{first}-{last}" for first, last in self.pending])
+
+    def load_state(self, value):
+        """Inverse of state(); a plain id (an old-style watermark) has nothing pending"""
+        self.reset()
+        if value:
+            through, *runs = value.split(';')
+            self.through = int(through)
+            self.pending = [tuple(int(part) for part in run.split('-')) for run in runs]
+
+
+class StagingWatermark(Watermark):
+    table, id_column, time_column = 'transactions_staging', 'staging_id', 'loaded_at'
+
+
+class TransactionsWatermark(Watermark):
+    table, id_column, time_column = 'transactions', 'transaction_id', 'created_at'
+
@@ -0,0 +1,194 @@
+"""
+windows.py - Month-over-month deltas and moving averages from prefix sums
+
+WHAT THIS DOES:
+  Keeps one running prefix sum per series (each category, plus the total)
+  over a dense month axis. With prefix sums, the total of ANY run of months
+  is a single subtraction:
+
+      sum(months i..j) = prefix[j + 1] - prefix[i]
+
+  so previous-month deltas, 3/6/12-month moving averages and true daily
+  averages (spending / calendar days) cost O(1) per series per request.
+
+  "This month" and "last month" are the calendar months of today, with
+  zeros when they have no data. Daily averages count days from the first
+  day with data, not from the start of its month.
+
+  New data is added with add(). Amounts for the newest month (the usual case)
+  update one prefix entry; a back-filled older month updates the entries
+  after it, which is still only a handful of months.
+"""
+
+import calendar
+import datetime
+
+# Series key for "all categories together"
+TOTAL = '__total__'
+
+# Moving-average window sizes, in months
+WINDOWS = (3, 6, 12)
+
+
+def month_key_of(d):
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def next_month_key(month_key):
+    year, month = int(month_key[:4]), int(month_key[5:7])
+    return f"{year + 1:04d}-01" if month == 12 else f"{year:04d}-{month + 1:02d}"
+
+
+def previous_month_key(month_key):
+    year, month = int(month_key[:4]), int(month_key[5:7])
+    return f"{year - 1:04d}-12" if month == 1 else f"{year:04d}-{month - 1:02d}"
+
+
+def days_in_month(month_key):
+    return calendar.monthrange(int(month_key[:4]), int(month_key[5:7]))[1]
+
+
+def first_day_of(month_key):
+    return datetime.date(int(month_key[:4]), int(month_key[5:7]), 1)
+
+
+class WindowedMetrics:
+    """Prefix sums per series over a dense month axis"""
+
+    def __init__(self):
+        self.months = []        # dense, sorted 'YYYY-MM' keys
+        self.index = {}         # month key -> position in self.months
+        self.prefix = {}        # series -> prefix sums, len(self.months) + 1
+        self.day_prefix = [0]   # calendar days, same shape as each prefix
+        self.first_day = None   # earliest date with data
+
+    # ------------------------------------------------------------------ write
+
+    def add(self, month_key, series, amount, first_day=None):
+        """Add an amount to one series (and the total) for one month
+
+        first_day is the earliest date the amount covers, for daily averages.
+        """
+        self._cover(month_key)
+        if first_day is not None and (self.first_day is None or first_day < self.first_day):
+            self.first_day = first_day
+        start = self.index[month_key] + 1
+        for key in (series, TOTAL):
+            prefix = self.prefix.get(key)
+            if prefix is None:
+                prefix = self.prefix[key] = [0.0] * (len(self.months) + 1)
+            for j in range(start, len(prefix)):
+                prefix[j] += amount
+
+    def _cover(self, month_key):
+        """Make sure the month axis reaches month_key (no gaps)"""
+        if month_key in self.index:
+            return
+        if not self.months or month_key > self.months[-1]:
+            # Common case: a new month at the end, extend every prefix
+            current = next_month_key(self.months[-1]) if self.months else month_key
+            while True:
+                self.index[current] = len(self.months)
+                self.months.append(current)
+                self.day_prefix.append(self.day_prefix[-1] + days_in_month(current))
+                for prefix in self.prefix.values():
+                    prefix.append(prefix[-1])
+                if current == month_key:
+                    break
+                current = next_month_key(current)
+            return
+
+        # Rare case: data older than anything seen so far, shift everything
+        added = []
+        current = month_key
+        while current != self.months[0]:
+            added.append(current)
+            current = next_month_key(current)
+        self.months = added + self.months
+        self.index = {key: i for i, key in enumerate(self.months)}
+        self.day_prefix = [0]
+        for key in self.months:
+            self.day_prefix.append(self.day_prefix[-1] + days_in_month(key))
+        for key, prefix in self.prefix.items():
+            self.prefix[key] = [0.0] * len(added) + prefix
+
+    # ------------------------------------------------------------------- read
+
+    def position(self, month_key):
+        """Position of any month on the axis (< 0 or past the end if it has no data)"""
+        if not self.months:
+            return -1
+        first = self.months[0]
+        return (int(month_key[:4]) - int(first[:4])) * 12 + int(month_key[5:7]) - int(first[5:7])
+
+    def window_sum(self, series, end, size):
+        """Signed total of `size` months ending at position `end` (inclusive)"""
+        prefix = self.prefix.get(series)
+        if prefix is None or end < 0:
+            return 0.0
+        # Months past the end of the axis have no data
+        high = min(end + 1, len(prefix) - 1)
+        low = max(0, end + 1 - size)
+        return prefix[high] - prefix[low] if high > low else 0.0
+
+    def window_days(self, end, size, today):
+        """Calendar days in the window, from the first day with data up to today"""
+        if end < 0:
+            return 0
+        days = self.day_prefix[end + 1] - self.day_prefix[max(0, end + 1 - size)]
+        if self.months[end] == month_key_of(today):
+            days -= days_in_month(self.months[end]) - today.day
+        if self.first_day is not None and end + 1 - size <= 0:
+            days -= max((self.first_day - first_day_of(self.months[0])).days, 0)
+        return max(days, 0)
+
+    def month_days(self, month_key, today):
+        """Days of one calendar month that count for its daily average"""
+        first = first_day_of(month_key)
+        last = today if month_key == month_key_of(today) else first.replace(day=days_in_month(month_key))
+        if self.first_day is not None and self.first_day > first:
+            first = self.first_day
+        return max((last - first).days + 1, 0)
+
+    def moving_average(self, series, size, end=None):
+        """Average monthly spending over the last `size` months (fewer if history is shorter)"""
+        end = len(self.months) - 1 if end is None else end
+        months = min(size, end + 1)
+        return abs(self.window_sum(series, end, size)) / months if months > 0 else 0.0
+
+    def daily_average(self, series, end, size, today):
+        days = self.window_days(end, size, today)
+        return abs(self.window_sum(series, end, size)) / days if days > 0 else 0.0
+
+    def snapshot(self, today=None):
+        """Everything /analytics/monthly needs, O(1) per series"""
+        today = today or datetime.date.today()
+        latest = len(self.months) - 1
+        current = month_key_of(today)
+        previous = previous_month_key(current)
+
+        this_month = abs(self.window_sum(TOTAL, self.position(current), 1))
+        last_month = abs(self.window_sum(TOTAL, self.position(previous), 1))
+        difference = this_month - last_month
+        this_days = self.month_days(current, today)
+        last_days = self.month_days(previous, today)
+        daily_change = (
+            (this_month / this_days if this_days > 0 else 0.0)
+            - (last_month / last_days if last_days > 0 else 0.0)
+        )
+
+        averages = {
+            series: {size: self.moving_average(series, size) for size in WINDOWS}
+            for series in self.prefix
+        }
+        return {
+            'month': current,
+            'thisMonthTotal': this_month,
+            'lastMonthTotal': last_month,
+            'differenceAmount': difference,
+            'differencePercent': (difference / last_month * 100) if last_month else 0.0,
+            # Whole history: spending per calendar day, not per transaction
+            'dailyAverage': self.daily_average(TOTAL, latest, len(self.months), today),
+            'dailyAverageChange': daily_change,
+            'averages': averages,
+        }